@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比较逐个用 pytz 转换发布时间与 NumPy 整列换算并分类的耗时
+
+用法:
+    python benchmarks/event_times.py [行数]
+"""
+
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.date_range import CHINA_TZ
+from src.core.event_times import convert_timestamps
+from src.core.ics_writer import event_sort_key
+
+
+def make_timestamps(count):
+    """生成模拟的发布时间戳：整点/半点、00:00 和 12:02 这类非常见时间混合"""
+    base = 1577808000  # 2020-01-01 00:00 北京时间
+    minutes = [0, 0, 30, 45, 2, 17]
+    return [
+        base + random.randrange(3650) * 86400 + random.randrange(24) * 3600 + random.choice(minutes) * 60
+        for _ in range(count)
+    ]
+
+
+def convert_one_by_one(timestamps):
+    """此前逐个事件转换和判断的方式"""
+    result = []
+    for public_date in timestamps:
+        event_datetime = datetime.fromtimestamp(public_date, tz=CHINA_TZ)
+        is_midnight = event_datetime.hour == 0 and event_datetime.minute == 0 and event_datetime.second == 0
+        is_odd_time = event_datetime.minute not in [0, 15, 30, 45]
+        if is_midnight or is_odd_time:
+            begin, end = event_datetime.date(), None
+        else:
+            begin, end = event_datetime, event_datetime + timedelta(hours=2)
+        result.append((begin, end, event_datetime.strftime('%Y-%m-%d'), event_sort_key(begin, '', CHINA_TZ)))
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    random.seed(42)
+    timestamps = make_timestamps(count)
+
+    started = time.perf_counter()
+    expected = convert_one_by_one(timestamps)
+    print(f"{'逐个 pytz 转换':<20} {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+    started = time.perf_counter()
+    converted = convert_timestamps(timestamps)
+    print(f"{'NumPy 整列换算':<20} {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+    for (begin, end, day, sort_key), event_time in zip(expected, converted):
+        assert (begin, end, day) == (event_time.begin, event_time.end, event_time.day)
+        assert sort_key == event_time.sort_key('')
+    print(f"{count} 个时间戳结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测量日历订阅服务在完整下载、gzip下载和条件请求（304）下的延迟与传输字节数
+
+用法:
+    python benchmarks/feed_server.py [请求次数]
+"""
+
+import sys
+import time
+import threading
+import http.client
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.feed_server import FeedStore, create_server
+
+FEEDS = {
+    '/wsc_events.ics': str(Path(project_root) / "calendar_files" / "wsc_events.ics"),
+}
+
+
+def measure(conn, label, path, headers, count):
+    """在同一个长连接上重复请求，输出平均延迟和每次传输的正文字节数"""
+    body_size = 0
+    status = None
+    started = time.perf_counter()
+    for _ in range(count):
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        body_size = len(body)
+        status = response.status
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} 状态 {status}  {elapsed / count * 1000:7.3f} ms/次  正文 {body_size:6d} 字节")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    store = FeedStore(FEEDS)
+    store.reload()
+    server = create_server(store, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    host, port = server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port)
+    path = next(iter(FEEDS))
+
+    conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader("ETag")
+
+    print(f"请求次数: {count}\n")
+    measure(conn, "完整下载", path, {}, count)
+    measure(conn, "gzip下载", path, {"Accept-Encoding": "gzip"}, count)
+    measure(conn, "条件请求 (If-None-Match)", path, {"Accept-Encoding": "gzip", "If-None-Match": etag}, count)
+
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比较财报/宏观事件使用字典与 __slots__ 记录时的内存占用
+
+用法:
+    python benchmarks/records_memory.py [行数]
+"""
+
+import sys
+import random
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.records import decode_report_rows, decode_macro_events
+
+REPORT_FIELDS = [
+    'id', 'company_name', 'code', 'country', 'calendar_type',
+    'observation_date', 'public_date', 'eps_estimate', 'earnings_estimate'
+]
+
+
+def make_report_items(count):
+    """生成模拟的财报接口 items（列表的列表）"""
+    markets = ['US', 'HK', 'CN']
+    return [
+        [
+            170000 + i, f"公司{i}", f"C{i:05d}.{markets[i % 3]}", markets[i % 3], 'report',
+            '中报', 1755619200 + (i % 365) * 86400, round(random.random(), 3), random.random() * 1e9
+        ]
+        for i in range(count)
+    ]
+
+
+def make_macro_items(count):
+    """生成模拟的宏观接口 items（字典列表）"""
+    return [
+        {
+            'id': 1000000 + i, 'title': f"美国{i % 12 + 1}月CPI年率", 'country': '美国',
+            'importance': i % 3 + 1, 'public_date': 1755088200 + i * 3600,
+            'event': 'CPI', 'quantity': '2.7', 'unit': '%', 'foresight': '',
+            'actual': '2.7', 'forecast': '2.8', 'previous': '2.7',
+            'calendar_key': f"key{i}", 'flag_url': 'https://example.com/us.png'
+        }
+        for i in range(count)
+    ]
+
+
+def measure(label, build):
+    """测量 build() 返回对象在内存中保留的字节数"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36} {current / 1024 / 1024:8.2f} MB  ({current / max(len(result), 1):6.0f} B/行)")
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"行数: {count}\n")
+
+    report_items = make_report_items(count)
+    dict_size = measure("财报: dict(zip(fields, item))",
+                        lambda: [dict(zip(REPORT_FIELDS, item)) for item in report_items if len(item) == len(REPORT_FIELDS)])
+    slots_size = measure("财报: EarningsReport (__slots__)",
+                         lambda: decode_report_rows(REPORT_FIELDS, report_items))
+    print(f"{'节省':<36} {(1 - slots_size / dict_size) * 100:8.1f} %\n")
+
+    macro_items = make_macro_items(count)
+    dict_size = measure("宏观: 原始JSON字典副本",
+                        lambda: [dict(item) for item in macro_items])
+    slots_size = measure("宏观: MacroEvent (__slots__)",
+                         lambda: decode_macro_events(macro_items))
+    print(f"{'节省':<36} {(1 - slots_size / dict_size) * 100:8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
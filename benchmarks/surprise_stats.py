@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比较逐事件解码后用 Python 循环与 NumPy 向量化计算历史偏差统计的耗时
+
+用法:
+    python benchmarks/surprise_stats.py [指标数] [年数]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from src.analysis.surprise import SURPRISE_WINDOW, SurpriseProfiles, indicator_key
+from src.core.event_store import EventStore
+from src.core.feed_index import normalize_country
+from src.core.records import decode_macro_events
+
+
+def make_history(indicators, years):
+    """生成模拟的宏观接口 items：每个指标每月公布一次"""
+    countries = ['美国', '中国', '欧元区', '日本', '英国']
+    items = []
+    for i in range(indicators):
+        for month in range(years * 12):
+            forecast = round(random.uniform(-5, 5), 1)
+            actual = round(forecast + random.gauss(0, 0.3), 1)
+            items.append({
+                'id': i * 1000 + month, 'title': f"{month % 12 + 1}月指标{i}年率", 'country': countries[i % 5],
+                'importance': i % 3 + 1, 'public_date': 315504000 + month * 2629800 + i,
+                'actual': f"{actual}", 'forecast': f"{forecast}", 'unit': '%'
+            })
+    return items
+
+
+def python_profiles(store, window=SURPRISE_WINDOW):
+    """读取完整事件后逐指标循环计算的参考实现"""
+    groups = defaultdict(list)
+    for event in store.query_macro_events():
+        if event.actual and event.forecast:
+            key = indicator_key(normalize_country(event.country), event.title)
+            groups[key].append((event.public_date, float(event.actual) - float(event.forecast)))
+    profiles = {}
+    for key, items in groups.items():
+        items.sort()
+        values = [surprise for _, surprise in items]
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / max(len(values) - 1, 1))
+        recent = values[-window:]
+        profiles[key] = (
+            sum(1 for v in recent if v > 0), sum(1 for v in recent if v < 0),
+            sum(abs(v) for v in values) / len(values), std
+        )
+    return profiles
+
+
+def main():
+    indicators = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EventStore(os.path.join(tmp, "events.sqlite3"))
+        items = make_history(indicators, years)
+        store.upsert_macro_events(decode_macro_events(items))
+        print(f"{indicators} 个指标 x {years} 年 = {len(items)} 次公布")
+
+        started = time.perf_counter()
+        expected = python_profiles(store)
+        print(f"{'解码事件 + Python 循环':<24} {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+        started = time.perf_counter()
+        names, rows = store.macro_history()
+        loaded = time.perf_counter()
+        profiles = SurpriseProfiles.from_history(names, rows)
+        finished = time.perf_counter()
+        print(f"{'SQLite 取数值列':<24} {(loaded - started) * 1000:8.0f} ms")
+        print(f"{'NumPy 向量化统计':<24} {(finished - loaded) * 1000:8.0f} ms")
+
+        # 抽查结果一致
+        for item in items[:100]:
+            profile = profiles.profile(normalize_country(item['country']), item['title'])
+            above, below, mean_abs, std = expected[indicator_key(normalize_country(item['country']), item['title'])]
+            assert (profile['above'], profile['below']) == (above, below)
+            assert math.isclose(profile['mean_abs'], mean_abs, abs_tol=1e-9)
+            assert math.isclose(profile['std'], std, abs_tol=1e-9)
+        print(profiles.describe(normalize_country(items[0]['country']), items[0]['title'], '%'))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
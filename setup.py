@@ -10,5 +10,5 @@ setup(
         for line in open("requirements.txt").readlines()
         if line.strip() and not line.startswith("#")
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.9",
 ) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Persistent SQLite-backed cache with TTL expiry and LRU eviction
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("cache_store")
+
+
+class SQLiteCache:
+    """基于SQLite的持久化键值缓存，支持TTL过期和按最近访问时间的LRU淘汰"""
+
+    def __init__(self, db_path: str, table: str = "cache", ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        """
+        初始化缓存
+
+        db_path: SQLite 数据库文件路径
+        table: 表名，同一数据库文件可容纳多个相互独立的缓存
+        ttl: 条目有效期（秒），None 表示永不过期
+        max_entries: 最大条目数，超出时淘汰最久未访问的条目，None 表示不限制
+        """
+        if not table.isidentifier():
+            raise ValueError(f"非法的缓存表名: {table}")
+
+        self.db_path = db_path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # 分析任务可能在多个线程中访问缓存，统一由锁串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存条目，未命中或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """写入缓存条目（值需可JSON序列化），并按容量淘汰旧条目"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def evict(self):
+        """清理过期条目和超出容量的条目"""
+        with self._lock:
+            self._evict_locked(time.time())
+            self._conn.commit()
+
+    def _evict_locked(self, now: float):
+        """执行淘汰（调用方需持有锁）"""
+        if self.ttl is not None:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+
+        if self.max_entries is not None:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+                logger.info(f"缓存 {self.table} 超出容量，已淘汰 {overflow} 个最久未访问的条目")
+
+    def stats(self) -> Dict[str, int]:
+        """返回本次运行的命中统计和当前条目数"""
+        with self._lock:
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
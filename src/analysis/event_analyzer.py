@@ -3,16 +3,22 @@ Event Analyzer for Financial Calendar Events
 """
 
 import re
+import copy
+import asyncio
+import hashlib
+import textwrap
 import logging
 from typing import Dict, List, Optional, Tuple
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 from datetime import datetime
 import json
-import http.client
-from urllib.parse import quote
+import time
 from pathlib import Path
 
+from src.core.http_client import http_get, HTTP_MAX_RETRIES
+from src.analysis.search_cache import normalize_query
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +26,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger("event_analyzer")
 
+# OpenAI 请求超时（秒），生成分析耗时较长，单独配置
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', '60'))
+
+# 并发分析的默认上限（同时进行的研报搜索+AI分析数）
+ANALYSIS_CONCURRENCY = int(os.environ.get('ANALYSIS_CONCURRENCY', '5'))
+
+# 批量分析：每次请求打包的事件数（1 表示逐个事件分析）和单次请求的最大输出token数
+ANALYSIS_BATCH_SIZE = int(os.environ.get('ANALYSIS_BATCH_SIZE', '1'))
+BATCH_MAX_TOKENS = 16000
+
+# AI分析使用的系统提示词
+ANALYSIS_SYSTEM_PROMPT = """你是一个专业的金融分析师，专注于分析财经事件并提供投资见解。
+请严格按照指定的JSON格式输出分析结果。确保输出的JSON格式正确，每个字段都必须存在且格式符合要求。
+不要在JSON中包含任何额外的文本说明。"""
+
+# 单个事件分析结果的JSON格式说明
+ANALYSIS_RESULT_SCHEMA = """{
+    "related_sectors": {
+        "industries": ["相关行业1", "相关行业2"],
+        "concepts": ["相关概念1", "相关概念2"],
+        "companies": ["相关公司1", "相关公司2"]
+    },
+    "investment_opportunities": [
+        {
+            "type": "机会类型（个股/行业/主题）",
+            "target": "投资标的",
+            "rationale": "投资逻辑"
+        }
+    ],
+    "potential_risks": [
+        {
+            "type": "风险类型",
+            "description": "风险描述",
+            "mitigation": "风险缓解建议"
+        }
+    ],
+    "potential_returns": {
+        "timeframe": "预期时间范围",
+        "upside": "上行空间预估",
+        "catalysts": ["潜在催化剂1", "潜在催化剂2"]
+    }
+}"""
+
+# 提示词版本号，修改 _build_analysis_prompt 或系统提示词后需递增，使旧的缓存分析失效
+PROMPT_VERSION = "1"
+
+# 无法解析AI输出时返回的默认结构（不会写入缓存）
+FALLBACK_ANALYSIS = {
+    "investment_opportunities": [
+        {
+            "type": "未分类",
+            "target": "未指定",
+            "rationale": "无法解析分析结果"
+        }
+    ],
+    "potential_risks": [
+        {
+            "type": "解析错误",
+            "description": "无法正确解析AI的分析结果",
+            "mitigation": "请重试或联系技术支持"
+        }
+    ],
+    "potential_returns": {
+        "timeframe": "未知",
+        "upside": "需要重新分析",
+        "catalysts": ["无法确定"]
+    }
+}
+
 def load_env():
     """从.env文件加载环境变量"""
     env_path = Path('.env')
@@ -40,9 +115,51 @@ def load_env():
         logger.error(f"读取 .env 文件时出错: {e}")
         return False
 
+def _strip_code_fence(text: str) -> str:
+    """去掉AI输出中包裹JSON的 ```json 代码块标记"""
+    text = text.strip()
+    if text.startswith('```json'):
+        text = text[7:]
+    if text.endswith('```'):
+        text = text[:-3]
+    return text.strip()
+
+def _has_required_fields(analysis: Dict) -> bool:
+    """检查分析结果是否包含所有必需字段"""
+    required_fields = ['investment_opportunities', 'potential_risks', 'potential_returns']
+    return isinstance(analysis, dict) and all(field in analysis for field in required_fields)
+
+def is_successful_analysis(analysis: Optional[Dict]) -> bool:
+    """分析是否成功：空结果（未配置密钥或请求出错）和无法解析时的默认结构都视为失败"""
+    return bool(analysis) and analysis != FALLBACK_ANALYSIS
+
+def _batch_result_schema() -> str:
+    """批量分析的输出格式：在单事件格式的基础上增加 event_id 字段并包装为数组"""
+    body = textwrap.indent(ANALYSIS_RESULT_SCHEMA, "    ")
+    body = body.replace("{", '{\n        "event_id": "事件ID（与上文标注的ID一致）",', 1)
+    return "[\n" + body + "\n]"
+
+def analysis_cache_key(event_id, event_summary: str, event_date: datetime, foresight: str = "") -> str:
+    """根据事件ID和标题、日期、前瞻、提示词版本的内容哈希生成缓存键"""
+    content = "\x1f".join([
+        event_summary or "",
+        event_date.strftime("%Y-%m-%d %H:%M:%S"),
+        foresight or "",
+        PROMPT_VERSION
+    ])
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return f"{event_id}:{digest}"
+
 class EventAnalyzer:
-    def __init__(self):
-        """初始化事件分析器"""
+    def __init__(self, cache=None, search_cache=None):
+        """初始化事件分析器
+
+        cache: 可选的持久化分析缓存（SQLiteCache），命中时跳过研报搜索和AI分析
+        search_cache: 可选的研报搜索缓存（SearchCache），合并相同查询并复用搜索结果
+        """
+        self.cache = cache
+        self.search_cache = search_cache
+        
         # 尝试加载 .env 文件
         load_env()
         
@@ -52,126 +169,129 @@ class EventAnalyzer:
         if not self.openai_api_key:
             logger.warning("OpenAI API密钥未设置")
         
-        # 配置OpenAI
-        self.client = OpenAI(api_key=self.openai_api_key)
+        # 配置OpenAI（SDK自带连接池，这里统一设置超时和重试次数）
+        self.client = OpenAI(
+            api_key=self.openai_api_key,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=HTTP_MAX_RETRIES
+        )
+        # 异步客户端在 analyze_many 中按需创建
+        self._async_client = None
 
     def search_related_info(self, event_summary: str, event_date: datetime) -> List[Dict]:
-        """使用 Reportify API 搜索相关研报信息"""
+        """使用 Reportify API 搜索相关研报信息（查询经过规范化和搜索缓存）"""
         try:
-            # 构建搜索查询
             date_str = event_date.strftime("%Y-%m-%d")
             
-            # URL编码查询参数
-            encoded_query = quote(event_summary)
-            current_timestamp = int(datetime.now().timestamp() * 1000)
-            
-            # 构建API URL
-            base_url = "https://api.reportify.cn/reports"
-            params = {
-                "page_num": "1",
-                "page_size": "10",
-                "channel_id": "",
-                "report_types": "7,8,9,10,11,16,19,20,21,22,23,24,25",
-                "query": encoded_query,
-                "rt": str(current_timestamp)
-            }
-            
-            # 构建完整URL
-            url = f"{base_url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-            
-            logger.info(f"搜索查询URL: {url}")
+            # 规范化查询，使同一指标的不同写法共享搜索结果
+            query = normalize_query(event_summary) or event_summary
             
-            # 创建HTTP连接
-            conn = http.client.HTTPSConnection("api.reportify.cn")
-            
-            # 发送请求
-            logger.info("发送搜索请求...")
-            conn.request("GET", f"/reports?{'&'.join(f'{k}={v}' for k, v in params.items())}")
-            
-            # 获取响应
-            response = conn.getresponse()
-            data = response.read()
-            
-            # 解析响应
-            results = json.loads(data.decode('utf-8'))
-            logger.info(f"搜索结果原始数据: {json.dumps(results, ensure_ascii=False, indent=2)}")
-            
-            # 提取研报摘要信息
-            relevant_info = []
-            if "items" in results:
-                for item in results["items"]:
-                    if "summary" in item and item["summary"]:
-                        # 从 labels 中提取行业、概念信息
-                        labels = item.get("labels", {})
-                        industry = labels.get("industry", [])
-                        concept = labels.get("concept", [])
-                        
-                        # 从 companies 中提取公司信息
-                        companies = []
-                        
-                        # 优先从 companies 字段获取（因为这里有完整的股票信息）
-                        if item.get("companies"):
-                            for company in item["companies"]:
-                                if isinstance(company, dict):
-                                    company_name = company.get("name", "")
-                                    stocks = company.get("stocks", [])
-                                    if company_name and stocks:
-                                        # 优先使用 A 股代码
-                                        stock_info = None
-                                        for stock in stocks:
-                                            if isinstance(stock, dict):
-                                                symbol = stock.get("symbol", "")
-                                                if symbol:
-                                                    # 优先级：A股 > 港股 > 美股
-                                                    if symbol.startswith(("SH:", "SZ:")):
-                                                        stock_info = symbol
-                                                        break
-                                                    elif symbol.startswith("HK:") and not stock_info:
-                                                        stock_info = symbol
-                                                    elif symbol.startswith("US:") and not stock_info:
-                                                        stock_info = symbol
-                                        
-                                        if stock_info:
-                                            companies.append(f"{company_name}({stock_info})")
-                                        else:
-                                            companies.append(company_name)
-                                elif isinstance(company, str):
-                                    companies.append(company)
-                        
-                        # 如果没有找到公司信息，尝试从摘要中提取
-                        if not companies:
-                            summary = item.get("summary", "")
-                            company_matches = re.findall(r"【([^】]+)】", summary)
-                            if company_matches:
-                                companies = company_matches
-                        
-                        # 如果还是没有，尝试从 labels 中获取
-                        if not companies and "company" in labels:
-                            companies = labels["company"]
-                        
-                        relevant_info.append({
-                            "title": item.get("title", ""),
-                            "snippet": item.get("summary", ""),
-                            "link": item.get("report_url", ""),
-                            "date": date_str,
-                            "institution": item.get("institution_name", ""),
-                            "author": item.get("author_names", ""),
-                            "industry": industry,
-                            "concept": concept,
-                            "companies": companies
-                        })
+            if self.search_cache is not None:
+                relevant_info = self.search_cache.get_or_fetch(query, lambda: self._fetch_related_info(query))
             else:
-                logger.warning(f"未找到研报结果，完整响应: {results}")
-                
-            return relevant_info
+                relevant_info = self._fetch_related_info(query)
+            
+            # 缓存的搜索结果与事件日期无关，这里补上当前事件的日期
+            return [dict(info, date=date_str) for info in relevant_info]
             
         except Exception as e:
             logger.error(f"搜索相关信息时出错: {e}")
             logger.exception("详细错误信息：")
             return []
-        finally:
-            if 'conn' in locals():
-                conn.close()
+
+    def _fetch_related_info(self, query: str) -> List[Dict]:
+        """请求 Reportify API 并提取研报摘要信息，请求失败时抛出异常"""
+        # rt 取整到小时，同一小时内的相同查询URL一致，便于上游缓存
+        hour_timestamp = int(time.time() // 3600 * 3600 * 1000)
+        
+        # 构建API URL（查询参数由HTTP客户端负责URL编码）
+        base_url = "https://api.reportify.cn/reports"
+        params = {
+            "page_num": "1",
+            "page_size": "10",
+            "channel_id": "",
+            "report_types": "7,8,9,10,11,16,19,20,21,22,23,24,25",
+            "query": query,
+            "rt": str(hour_timestamp)
+        }
+
+        # 通过共享连接池发送请求，复用长连接，避免每个事件重复TLS握手
+        logger.info("发送搜索请求...")
+        response = http_get(base_url, params=params)
+        response.raise_for_status()
+        logger.info(f"搜索查询URL: {response.url}")
+
+        # 解析响应
+        results = response.json()
+        logger.info(f"搜索结果原始数据: {json.dumps(results, ensure_ascii=False, indent=2)}")
+
+        # 提取研报摘要信息
+        relevant_info = []
+        if "items" in results:
+            for item in results["items"]:
+                if "summary" in item and item["summary"]:
+                    # 从 labels 中提取行业、概念信息
+                    labels = item.get("labels", {})
+                    industry = labels.get("industry", [])
+                    concept = labels.get("concept", [])
+
+                    # 从 companies 中提取公司信息
+                    companies = []
+
+                    # 优先从 companies 字段获取（因为这里有完整的股票信息）
+                    if item.get("companies"):
+                        for company in item["companies"]:
+                            if isinstance(company, dict):
+                                company_name = company.get("name", "")
+                                stocks = company.get("stocks", [])
+                                if company_name and stocks:
+                                    # 优先使用 A 股代码
+                                    stock_info = None
+                                    for stock in stocks:
+                                        if isinstance(stock, dict):
+                                            symbol = stock.get("symbol", "")
+                                            if symbol:
+                                                # 优先级：A股 > 港股 > 美股
+                                                if symbol.startswith(("SH:", "SZ:")):
+                                                    stock_info = symbol
+                                                    break
+                                                elif symbol.startswith("HK:") and not stock_info:
+                                                    stock_info = symbol
+                                                elif symbol.startswith("US:") and not stock_info:
+                                                    stock_info = symbol
+
+                                    if stock_info:
+                                        companies.append(f"{company_name}({stock_info})")
+                                    else:
+                                        companies.append(company_name)
+                            elif isinstance(company, str):
+                                companies.append(company)
+
+                    # 如果没有找到公司信息，尝试从摘要中提取
+                    if not companies:
+                        summary = item.get("summary", "")
+                        company_matches = re.findall(r"【([^】]+)】", summary)
+                        if company_matches:
+                            companies = company_matches
+
+                    # 如果还是没有，尝试从 labels 中获取
+                    if not companies and "company" in labels:
+                        companies = labels["company"]
+
+                    relevant_info.append({
+                        "title": item.get("title", ""),
+                        "snippet": item.get("summary", ""),
+                        "link": item.get("report_url", ""),
+                        "institution": item.get("institution_name", ""),
+                        "author": item.get("author_names", ""),
+                        "industry": industry,
+                        "concept": concept,
+                        "companies": companies
+                    })
+        else:
+            logger.warning(f"未找到研报结果，完整响应: {results}")
+
+        return relevant_info
 
     def analyze_investment_opportunity(self, event_summary: str, event_date: datetime, 
                                     related_info: List[Dict]) -> Dict:
@@ -185,76 +305,338 @@ class EventAnalyzer:
             prompt = self._build_analysis_prompt(event_summary, event_date, related_info)
             
             # 调用OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # 使用 gpt-4o-mini 模型
-                messages=[
-                    {"role": "system", "content": """你是一个专业的金融分析师，专注于分析财经事件并提供投资见解。
-请严格按照指定的JSON格式输出分析结果。确保输出的JSON格式正确，每个字段都必须存在且格式符合要求。
-不要在JSON中包含任何额外的文本说明。"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            response = self.client.chat.completions.create(**self._chat_completion_kwargs(prompt))
             
             # 解析响应
-            analysis = response.choices[0].message.content
-            
-            # 将分析结果结构化
-            try:
-                # 清理响应文本，确保它是有效的JSON
-                analysis = analysis.strip()
-                if analysis.startswith('```json'):
-                    analysis = analysis[7:]
-                if analysis.endswith('```'):
-                    analysis = analysis[:-3]
-                analysis = analysis.strip()
-                
-                analysis_dict = json.loads(analysis)
-                
-                # 验证结果格式
-                required_fields = ['investment_opportunities', 'potential_risks', 'potential_returns']
-                if not all(field in analysis_dict for field in required_fields):
-                    raise ValueError("Missing required fields in analysis result")
-                
-                return analysis_dict
-                
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"解析分析结果时出错: {e}")
-                # 返回默认结构
-                return {
-                    "investment_opportunities": [
-                        {
-                            "type": "未分类",
-                            "target": "未指定",
-                            "rationale": "无法解析分析结果"
-                        }
-                    ],
-                    "potential_risks": [
-                        {
-                            "type": "解析错误",
-                            "description": "无法正确解析AI的分析结果",
-                            "mitigation": "请重试或联系技术支持"
-                        }
-                    ],
-                    "potential_returns": {
-                        "timeframe": "未知",
-                        "upside": "需要重新分析",
-                        "catalysts": ["无法确定"]
-                    }
-                }
+            return self._parse_analysis_response(response.choices[0].message.content)
             
         except Exception as e:
             logger.error(f"分析投资机会时出错: {e}")
             return {}
 
+    async def analyze_investment_opportunity_async(self, event_summary: str, event_date: datetime,
+                                                   related_info: List[Dict]) -> Dict:
+        """使用AsyncOpenAI异步分析投资机会（与同步版本的返回约定一致）"""
+        if not self.openai_api_key:
+            logger.error("OpenAI API密钥未设置，无法执行分析")
+            return {}
+        
+        try:
+            prompt = self._build_analysis_prompt(event_summary, event_date, related_info)
+            response = await self._get_async_client().chat.completions.create(
+                **self._chat_completion_kwargs(prompt)
+            )
+            return self._parse_analysis_response(response.choices[0].message.content)
+        
+        except Exception as e:
+            logger.error(f"分析投资机会时出错: {e}")
+            return {}
+
+    def _chat_completion_kwargs(self, prompt: str, max_tokens: int = 1000) -> Dict:
+        """构建 chat.completions.create 的请求参数"""
+        return {
+            "model": "gpt-4o-mini",  # 使用 gpt-4o-mini 模型
+            "messages": [
+                {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens
+        }
+
+    def _parse_analysis_response(self, analysis: str) -> Dict:
+        """将AI返回的文本解析为结构化的分析结果，解析失败时返回默认结构"""
+        try:
+            # 清理响应文本，确保它是有效的JSON
+            analysis = _strip_code_fence(analysis)
+            
+            analysis_dict = json.loads(analysis)
+            
+            # 验证结果格式
+            if not _has_required_fields(analysis_dict):
+                raise ValueError("Missing required fields in analysis result")
+            
+            return analysis_dict
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"解析分析结果时出错: {e}")
+            # 返回默认结构
+            return copy.deepcopy(FALLBACK_ANALYSIS)
+
+    async def analyze_batch_async(self, items: List[Dict],
+                                  semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict]:
+        """在一次请求中分析多个事件，结果按输入顺序返回
+
+        items: 每项包含 event_id、summary、date 和 related_info
+        semaphore: 限制同时进行的AI请求数（默认按 ANALYSIS_CONCURRENCY），只在每次请求期间占用，拆分重试的请求重新获取
+        整批解析失败时对半拆分重试，拆分到单个事件时退回单事件分析；
+        批量结果中缺失或格式不合法的事件单独补充分析。
+        """
+        if not items:
+            return []
+        if not self.openai_api_key:
+            logger.error("OpenAI API密钥未设置，无法执行分析")
+            return [{} for _ in items]
+        semaphore = semaphore or asyncio.Semaphore(max(1, ANALYSIS_CONCURRENCY))
+        if len(items) == 1:
+            item = items[0]
+            async with semaphore:
+                analysis = await self.analyze_investment_opportunity_async(
+                    item['summary'], item['date'], item['related_info']
+                )
+            return [analysis]
+        
+        try:
+            prompt = self._build_batch_analysis_prompt(items)
+            async with semaphore:
+                response = await self._get_async_client().chat.completions.create(
+                    **self._chat_completion_kwargs(prompt, max_tokens=min(1000 * len(items), BATCH_MAX_TOKENS))
+                )
+            parsed = self._parse_batch_response(response.choices[0].message.content)
+        except Exception as e:
+            logger.warning(f"批量分析 {len(items)} 个事件失败，拆分后重试: {e}")
+            middle = len(items) // 2
+            left, right = await asyncio.gather(
+                self.analyze_batch_async(items[:middle], semaphore),
+                self.analyze_batch_async(items[middle:], semaphore)
+            )
+            return left + right
+        
+        # 逐个事件校验，缺失或不合法的事件重新分析
+        missing = [item for item in items if item['event_id'] not in parsed]
+        if missing:
+            logger.warning(f"批量分析结果缺少 {len(missing)}/{len(items)} 个事件，单独重试")
+            if len(missing) == len(items):
+                middle = len(items) // 2
+                left, right = await asyncio.gather(
+                    self.analyze_batch_async(items[:middle], semaphore),
+                    self.analyze_batch_async(items[middle:], semaphore)
+                )
+                retried = left + right
+            else:
+                retried = await self.analyze_batch_async(missing, semaphore)
+            for item, analysis in zip(missing, retried):
+                parsed[item['event_id']] = analysis
+        
+        logger.info(f"批量分析完成: {len(items)} 个事件")
+        return [parsed[item['event_id']] for item in items]
+
+    def _parse_batch_response(self, content: str) -> Dict[str, Dict]:
+        """解析批量分析返回的JSON数组，返回 event_id 到分析结果的映射（仅包含格式合法的事件）"""
+        results = json.loads(_strip_code_fence(content))
+        if isinstance(results, dict):
+            # 兼容模型把数组包在对象里返回的情况
+            results = results.get('results', results.get('events'))
+        if not isinstance(results, list):
+            raise ValueError("批量分析结果不是JSON数组")
+        
+        parsed = {}
+        for result in results:
+            if not isinstance(result, dict) or 'event_id' not in result:
+                continue
+            event_id = str(result.pop('event_id'))
+            if _has_required_fields(result):
+                parsed[event_id] = result
+            else:
+                logger.warning(f"事件 {event_id} 的批量分析结果缺少必需字段")
+        return parsed
+
+    def _get_async_client(self):
+        """获取当前事件循环使用的 AsyncOpenAI 客户端"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.openai_api_key,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=HTTP_MAX_RETRIES
+            )
+        return self._async_client
+
+    def analyze_event(self, event_id, event_summary: str, event_date: datetime,
+                      foresight: str = "") -> Dict:
+        """分析单个事件（优先读取缓存，未命中时搜索研报并调用AI分析）"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = analysis_cache_key(event_id, event_summary, event_date, foresight)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"命中分析缓存: {event_summary}")
+                return cached
+        
+        related_info = self.search_related_info(event_summary, event_date)
+        analysis = self.analyze_investment_opportunity(event_summary, event_date, related_info)
+        
+        # 只缓存成功解析的分析结果，失败结果下次运行时重新分析
+        if cache_key is not None and is_successful_analysis(analysis):
+            self.cache.set(cache_key, analysis)
+        
+        return analysis
+
+    async def analyze_event_async(self, event_id, event_summary: str, event_date: datetime,
+                                  foresight: str = "") -> Dict:
+        """异步分析单个事件（研报搜索在线程池中复用共享连接池，AI分析使用AsyncOpenAI）"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = analysis_cache_key(event_id, event_summary, event_date, foresight)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"命中分析缓存: {event_summary}")
+                return cached
+        
+        loop = asyncio.get_running_loop()
+        related_info = await loop.run_in_executor(None, self.search_related_info, event_summary, event_date)
+        analysis = await self.analyze_investment_opportunity_async(event_summary, event_date, related_info)
+        
+        if cache_key is not None and is_successful_analysis(analysis):
+            self.cache.set(cache_key, analysis)
+        
+        return analysis
+
+    async def analyze_many_async(self, events: List[Dict], concurrency: Optional[int] = None,
+                                 batch_size: Optional[int] = None) -> List[Optional[Dict]]:
+        """并发分析多个事件，结果按输入顺序返回，单个事件失败时对应位置为 None
+
+        events: 事件列表，每项包含 id、summary、date（datetime）和可选的 foresight
+        concurrency: 同时进行的请求数上限，默认为 ANALYSIS_CONCURRENCY
+        batch_size: 每次AI请求打包的事件数，默认为 ANALYSIS_BATCH_SIZE
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or ANALYSIS_CONCURRENCY))
+        batch_size = max(1, batch_size or ANALYSIS_BATCH_SIZE)
+        
+        async def analyze_one(event: Dict) -> Optional[Dict]:
+            async with semaphore:
+                try:
+                    return await self.analyze_event_async(
+                        event.get('id', ''),
+                        event['summary'],
+                        event['date'],
+                        event.get('foresight', '')
+                    )
+                except Exception as e:
+                    logger.error(f"分析事件 {event.get('summary')} 时出错: {e}")
+                    return None
+        
+        try:
+            if batch_size == 1:
+                return await asyncio.gather(*(analyze_one(event) for event in events))
+            return await self._analyze_many_batched(events, semaphore, batch_size)
+        finally:
+            # AsyncOpenAI 的连接绑定在当前事件循环上，结束时关闭
+            if self._async_client is not None:
+                await self._async_client.close()
+                self._async_client = None
+
+    async def _analyze_many_batched(self, events: List[Dict], semaphore: asyncio.Semaphore,
+                                    batch_size: int) -> List[Optional[Dict]]:
+        """批量模式：先读缓存、并发搜索研报，再把未命中的事件按 batch_size 打包分析"""
+        results = [None] * len(events)
+        pending = []
+        for index, event in enumerate(events):
+            cache_key = None
+            if self.cache is not None:
+                cache_key = analysis_cache_key(event.get('id', ''), event['summary'], event['date'],
+                                               event.get('foresight', ''))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"命中分析缓存: {event['summary']}")
+                    results[index] = cached
+                    continue
+            pending.append((index, event, cache_key))
+        
+        loop = asyncio.get_running_loop()
+        
+        async def search(event: Dict) -> List[Dict]:
+            async with semaphore:
+                return await loop.run_in_executor(None, self.search_related_info, event['summary'], event['date'])
+        
+        related = await asyncio.gather(*(search(event) for _, event, _ in pending), return_exceptions=True)
+        
+        items = []
+        seen_ids = set()
+        for (index, event, cache_key), related_info in zip(pending, related):
+            if isinstance(related_info, Exception):
+                logger.error(f"搜索 {event['summary']} 的相关信息时出错: {related_info}")
+                related_info = []
+            # 批量结果按 event_id 对应，缺失或重复的ID用序号代替
+            event_id = str(event.get('id') or f"#{index}")
+            if event_id in seen_ids:
+                event_id = f"#{index}"
+            seen_ids.add(event_id)
+            items.append({
+                'index': index,
+                'event_id': event_id,
+                'summary': event['summary'],
+                'date': event['date'],
+                'related_info': related_info,
+                'cache_key': cache_key
+            })
+        
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        logger.info(f"批量分析 {len(items)} 个事件，共 {len(batches)} 个请求（每批最多 {batch_size} 个）")
+        
+        # 信号量只在每次AI请求期间占用，拆分重试的请求同样受并发上限约束
+        batch_results = await asyncio.gather(
+            *(self.analyze_batch_async(batch, semaphore) for batch in batches), return_exceptions=True
+        )
+        
+        for batch, analyses in zip(batches, batch_results):
+            if isinstance(analyses, Exception):
+                logger.error(f"批量分析出错，{len(batch)} 个事件将使用基本描述: {analyses}")
+                continue
+            for item, analysis in zip(batch, analyses):
+                results[item['index']] = analysis
+                if item['cache_key'] is not None and is_successful_analysis(analysis):
+                    self.cache.set(item['cache_key'], analysis)
+        
+        return results
+
+    def analyze_many(self, events: List[Dict], concurrency: Optional[int] = None,
+                     batch_size: Optional[int] = None) -> List[Optional[Dict]]:
+        """analyze_many_async 的同步入口"""
+        if not events:
+            return []
+        logger.info(f"开始并发分析 {len(events)} 个事件（并发上限 {concurrency or ANALYSIS_CONCURRENCY}）")
+        return asyncio.run(self.analyze_many_async(events, concurrency, batch_size))
+
     def _build_analysis_prompt(self, event_summary: str, event_date: datetime, 
                              related_info: List[Dict]) -> str:
         """构建分析提示词"""
-        prompt = f"""
+        prompt = """
 请分析以下财经事件和相关信息，提供投资见解：
 
-事件信息：
+"""
+        prompt += self._build_event_context(event_summary, event_date, related_info)
+        prompt += f"""
+请提供以下格式的JSON分析结果：
+{ANALYSIS_RESULT_SCHEMA}
+
+请确保在分析中充分利用相关行业、概念和公司信息，并在investment_opportunities中优先考虑这些标的。
+"""
+        return prompt
+
+    def _build_batch_analysis_prompt(self, items: List[Dict]) -> str:
+        """构建一次分析多个事件的提示词，各事件共用同一份输出格式说明"""
+        prompt = f"""
+请分别分析以下 {len(items)} 个财经事件和相关信息，为每个事件提供独立的投资见解：
+"""
+        for item in items:
+            prompt += f"\n### 事件ID: {item['event_id']}\n"
+            prompt += self._build_event_context(item['summary'], item['date'], item['related_info'])
+        
+        prompt += f"""
+请输出一个JSON数组，每个事件对应数组中的一个元素，格式如下：
+{_batch_result_schema()}
+
+要求：
+- 数组必须包含上述全部 {len(items)} 个事件，event_id 与事件标注的ID完全一致
+- 每个事件单独分析，不要混用其他事件的资料
+- 请确保在分析中充分利用相关行业、概念和公司信息，并在investment_opportunities中优先考虑这些标的。
+"""
+        return prompt
+
+    def _build_event_context(self, event_summary: str, event_date: datetime,
+                             related_info: List[Dict]) -> str:
+        """构建提示词中单个事件的事件信息和相关资料部分"""
+        prompt = f"""事件信息：
 - 事件：{event_summary}
 - 日期：{event_date.strftime('%Y-%m-%d')}
 
@@ -290,38 +672,7 @@ class EventAnalyzer:
             prompt += "\n相关公司：\n"
             for company in all_companies:
                 prompt += f"- {company}\n"
-            
-        prompt += """
-请提供以下格式的JSON分析结果：
-{
-    "related_sectors": {
-        "industries": ["相关行业1", "相关行业2"],
-        "concepts": ["相关概念1", "相关概念2"],
-        "companies": ["相关公司1", "相关公司2"]
-    },
-    "investment_opportunities": [
-        {
-            "type": "机会类型（个股/行业/主题）",
-            "target": "投资标的",
-            "rationale": "投资逻辑"
-        }
-    ],
-    "potential_risks": [
-        {
-            "type": "风险类型",
-            "description": "风险描述",
-            "mitigation": "风险缓解建议"
-        }
-    ],
-    "potential_returns": {
-        "timeframe": "预期时间范围",
-        "upside": "上行空间预估",
-        "catalysts": ["潜在催化剂1", "潜在催化剂2"]
-    }
-}
-
-请确保在分析中充分利用相关行业、概念和公司信息，并在investment_opportunities中优先考虑这些标的。
-"""
+        
         return prompt
 
     def format_analysis_for_calendar(self, analysis: Dict) -> str:
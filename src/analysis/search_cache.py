@@ -0,0 +1,114 @@
+"""
+Query normalization and two-level cache for research report searches
+"""
+
+import re
+import logging
+import threading
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("search_cache")
+
+# 标题中与搜索语义无关的片段：待定标记、发布时间、年份/月份/季度等日期限定
+_PENDING_MARK = re.compile(r"[\(（]\s*待定\s*[\)）]")
+_LEADING_TIME = re.compile(r"^\s*\d{1,2}:\d{2}\s+")
+_DATE_QUALIFIERS = re.compile(
+    r"\d{4}\s*年(?:度)?"
+    r"|\d{1,2}\s*(?:至|-|~)\s*\d{1,2}\s*月(?:份)?"
+    r"|\d{1,2}\s*月(?:份)?"
+    r"|(?:第?[一二三四1-4]\s*季度|Q[1-4])"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """将事件标题规范化为搜索查询，使同一指标的不同期次/写法映射到同一个查询"""
+    if not text:
+        return ""
+
+    text = unicodedata.normalize("NFKC", text)
+    text = _PENDING_MARK.sub(" ", text)
+    text = _LEADING_TIME.sub("", text)
+
+    # 去掉国旗等 emoji 和符号
+    text = "".join(
+        ch for ch in text
+        if unicodedata.category(ch) not in ("So", "Sk", "Cs", "Co") and not 0x1F1E6 <= ord(ch) <= 0x1F1FF
+    )
+
+    text = _DATE_QUALIFIERS.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class SearchCache:
+    """研报搜索结果的两级缓存：进程内合并相同查询 + 可选的持久化TTL存储"""
+
+    def __init__(self, store=None):
+        """
+        store: 可选的持久化存储（SQLiteCache），保存规范化查询对应的研报列表
+        """
+        self.store = store
+        self._results: Dict[str, List[Dict]] = {}  # 本次运行内已完成的查询
+        self._inflight: Dict[str, Future] = {}  # 正在进行中的查询
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.coalesced = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, query: str, fetch: Callable[[], List[Dict]]) -> List[Dict]:
+        """返回查询结果；相同查询并发到达时只发出一次请求，其余调用等待同一结果
+
+        fetch 抛出的异常会传递给所有等待方，且不会写入缓存
+        """
+        with self._lock:
+            if query in self._results:
+                self.memory_hits += 1
+                return self._results[query]
+
+            future = self._inflight.get(query)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[query] = future
+            else:
+                self.coalesced += 1
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = self.store.get(query) if self.store is not None else None
+            if result is not None:
+                with self._lock:
+                    self.store_hits += 1
+            else:
+                with self._lock:
+                    self.misses += 1
+                result = fetch()
+                if self.store is not None:
+                    self.store.set(query, result)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[query]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._results[query] = result
+            del self._inflight[query]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """返回本次运行的缓存统计"""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "coalesced": self.coalesced,
+                "store_hits": self.store_hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,149 @@
+"""
+Vectorized actual-vs-consensus surprise statistics over macro event history
+"""
+
+import os
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.analysis.search_cache import normalize_query
+
+logger = logging.getLogger("surprise")
+
+# 历史偏差统计配置
+SURPRISE_WINDOW = int(os.environ.get('SURPRISE_WINDOW', '12'))  # 命中率的滚动窗口（最近N次公布）
+SURPRISE_MIN_SAMPLES = int(os.environ.get('SURPRISE_MIN_SAMPLES', '4'))  # 样本数少于该值时不生成历史偏差概况
+
+# 描述中历史偏差概况行的前缀
+SURPRISE_PREFIX = "📐 历史偏差"
+
+
+def indicator_key(country: str, title: str) -> str:
+    """同一国家、同一指标不同期次的事件映射到同一个键（如 US|cpi年率）"""
+    return f"{country}|{normalize_query(title)}"
+
+
+class SurpriseProfiles:
+    """每个指标的历史偏差统计（偏差 = 公布值 - 预期值）
+
+    所有指标的历史数据按 (指标, 时间) 排序后放在同一组数组中，
+    分组统计用 bincount、滚动窗口用前缀和计算，不逐行循环。
+    """
+
+    def __init__(self, keys: Sequence[str], groups: np.ndarray, timestamps: np.ndarray, actual: np.ndarray,
+                 forecast: np.ndarray, window: int = SURPRISE_WINDOW):
+        """keys 为所有指标键，groups 为每次公布所属指标在 keys 中的位置"""
+        self.window = window
+        actual = np.asarray(actual, dtype=np.float64)
+        forecast = np.asarray(forecast, dtype=np.float64)
+        valid = np.isfinite(actual) & np.isfinite(forecast)
+
+        unique_keys = np.asarray(keys, dtype=str)
+        groups = np.asarray(groups, dtype=np.int64)[valid]
+        timestamps = np.asarray(timestamps, dtype=np.int64)[valid]
+        order = np.lexsort((timestamps, groups))
+        groups = groups[order]
+        surprise = (actual[valid] - forecast[valid])[order]
+
+        group_count = len(unique_keys)
+        count = np.bincount(groups, minlength=group_count)
+        safe_count = np.maximum(count, 1)
+        mean = np.bincount(groups, weights=surprise, minlength=group_count) / safe_count
+        squares = np.bincount(groups, weights=surprise * surprise, minlength=group_count) / safe_count
+        variance = np.maximum(squares - mean * mean, 0.0) * count / np.maximum(count - 1, 1)
+        std = np.sqrt(variance)
+
+        # 每组最后一行的位置，以及每行所在组的第一行位置
+        ends = np.cumsum(count) - 1
+        starts = ends - count + 1
+        positions = np.arange(len(surprise))
+        window_start = np.maximum(positions - window + 1, starts[groups])
+
+        # 滚动窗口内高于/低于预期的次数：前缀和相减
+        above = np.concatenate(([0], np.cumsum(surprise > 0)))
+        below = np.concatenate(([0], np.cumsum(surprise < 0)))
+        self.rolling_count = positions - window_start + 1
+        self.rolling_above = above[positions + 1] - above[window_start]
+        self.rolling_below = below[positions + 1] - below[window_start]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.z_scores = np.where(std[groups] > 0, (surprise - mean[groups]) / std[groups], np.nan)
+
+        self.keys = unique_keys
+        self.index: Dict[str, int] = {key: i for i, key in enumerate(unique_keys.tolist())}
+        self.count = count
+        self.mean = mean
+        self.std = std
+        self.mean_abs = np.bincount(groups, weights=np.abs(surprise), minlength=group_count) / safe_count
+        self.surprise = surprise
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_history(cls, names: List[Tuple[str, str, int]], rows: List[Tuple[int, float, float]],
+                     window: int = SURPRISE_WINDOW) -> 'SurpriseProfiles':
+        """从 EventStore.macro_history 的结果构建
+
+        names: [(国家代码, 标题, 公布次数)]，rows: [(发布时间戳, 公布值, 预期值)]，按标题顺序连续排列。
+        只对不重复的标题做一次规范化，同一指标的不同期次合并为一组。
+        """
+        if not rows:
+            empty = np.array([], dtype=np.float64)
+            return cls([], empty, empty, empty, empty, window)
+        keys, pair_groups = np.unique(
+            np.asarray([indicator_key(country, title) for country, title, _ in names], dtype=str), return_inverse=True
+        )
+        groups = np.repeat(pair_groups.reshape(-1), [count for _, _, count in names])
+        data = np.array(rows, dtype=np.float64)
+        return cls(keys, groups, data[:, 0], data[:, 1], data[:, 2], window)
+
+    def profile(self, country: str, title: str) -> Optional[Dict]:
+        """指标的最新统计，没有历史数据时返回 None"""
+        group = self.index.get(indicator_key(country, title))
+        if group is None or not self.count[group]:
+            return None
+        last = self.ends[group]
+        return {
+            'count': int(self.count[group]),
+            'window': int(self.rolling_count[last]),
+            'above': int(self.rolling_above[last]),
+            'below': int(self.rolling_below[last]),
+            'mean_abs': float(self.mean_abs[group]),
+            'std': float(self.std[group]),
+            'last': float(self.surprise[last]),
+            'last_z': float(self.z_scores[last]),
+        }
+
+    def describe(self, country: str, title: str, unit: str = '',
+                 min_samples: int = SURPRISE_MIN_SAMPLES) -> Optional[str]:
+        """一行历史偏差概况，如 "📐 历史偏差: 近12次 高于预期7次/低于4次, 平均偏差±0.12%, σ 0.15%, 上次 +0.2% (z +1.3)" """
+        profile = self.profile(country, title)
+        if profile is None or profile['count'] < max(min_samples, 1):
+            return None
+        unit = unit or ''
+        line = (
+            f"{SURPRISE_PREFIX}: 近{profile['window']}次 高于预期{profile['above']}次/低于{profile['below']}次, "
+            f"平均偏差±{profile['mean_abs']:.3g}{unit}, σ {profile['std']:.3g}{unit}, 上次 {profile['last']:+.3g}{unit}"
+        )
+        if np.isfinite(profile['last_z']):
+            line += f" (z {profile['last_z']:+.1f})"
+        return line
+
+
+def load_surprise_profiles(store, end_timestamp: Optional[int] = None,
+                           window: int = SURPRISE_WINDOW) -> SurpriseProfiles:
+    """从事件库读取已公布的宏观事件并计算所有指标的历史偏差统计"""
+    started = time.monotonic()
+    names, rows = store.macro_history(end_timestamp)
+    loaded = time.monotonic()
+    profiles = SurpriseProfiles.from_history(names, rows, window)
+    logger.info(
+        f"历史偏差统计: {len(rows)} 次公布, {len(profiles)} 个指标，"
+        f"读取 {(loaded - started) * 1000:.0f} 毫秒, 计算 {(time.monotonic() - loaded) * 1000:.0f} 毫秒"
+    )
+    return profiles
@@ -0,0 +1,115 @@
+"""
+Post-release actuals updater for the macro event calendar
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+
+from src.core import fetch_event_calendar as events
+from src.core.date_range import make_window
+from src.core.ics_writer import patch_event_descriptions
+from src.core.sync_state import SyncState, payload_hash
+
+logger = logging.getLogger("actuals_updater")
+
+# 公布值轮询配置
+ACTUALS_POLL_INTERVAL = float(os.environ.get('ACTUALS_POLL_INTERVAL', '10'))  # 等待公布值时的轮询间隔（秒）
+ACTUALS_IDLE_INTERVAL = float(os.environ.get('ACTUALS_IDLE_INTERVAL', '300'))  # 没有待公布事件时的检查间隔（秒）
+ACTUALS_WATCH_MINUTES = float(os.environ.get('ACTUALS_WATCH_MINUTES', '30'))  # 发布后最多等待公布值的分钟数
+ACTUALS_WINDOW_PADDING = 60  # 请求窗口在发布时间前后各扩展的秒数
+
+
+def find_waiting_events(sync_state: SyncState, now: float) -> Dict[str, Dict]:
+    """返回发布时间已到、仍在等待公布值的事件 {uid: 状态记录}"""
+    watch_seconds = ACTUALS_WATCH_MINUTES * 60
+    return {
+        uid: entry for uid, entry in sync_state.entries.items()
+        if entry.get('public_date') and not entry.get('actual')
+        and now - watch_seconds <= entry['public_date'] <= now
+    }
+
+
+def next_release(sync_state: SyncState, now: float) -> Optional[int]:
+    """返回下一个尚未发布事件的发布时间"""
+    upcoming = [
+        entry['public_date'] for entry in sync_state.entries.values()
+        if entry.get('public_date') and not entry.get('actual') and entry['public_date'] > now
+    ]
+    return min(upcoming) if upcoming else None
+
+
+def idle_delay(sync_state: SyncState, now: float) -> float:
+    """没有等待中的事件时，在下一个事件发布时醒来（最长 ACTUALS_IDLE_INTERVAL 秒，以便发现新事件）"""
+    release = next_release(sync_state, now)
+    if release is None:
+        return ACTUALS_IDLE_INTERVAL
+    return max(1.0, min(ACTUALS_IDLE_INTERVAL, release - now))
+
+
+def update_actuals(now: Optional[float] = None) -> float:
+    """查询刚发布事件的公布值并只修改这些事件的描述，返回距离下次轮询的秒数"""
+    now = now or time.time()
+    sync_state = SyncState.load(events.SYNC_STATE_FILE)
+    if not os.path.exists(events.ICS_FILE):
+        return ACTUALS_IDLE_INTERVAL
+
+    waiting = find_waiting_events(sync_state, now)
+    if not waiting:
+        return idle_delay(sync_state, now)
+
+    # 只请求覆盖这些事件发布时间的窄窗口
+    public_dates = [entry['public_date'] for entry in waiting.values()]
+    window = make_window(min(public_dates) - ACTUALS_WINDOW_PADDING, max(public_dates) + ACTUALS_WINDOW_PADDING)
+    items = events.fetch_calendar_window(window)
+    if items is None:
+        return ACTUALS_POLL_INTERVAL
+
+    released = {
+        f"{item.id or ''}_wscn_macro": item for item in items
+        if item.actual and f"{item.id or ''}_wscn_macro" in waiting
+    }
+    if not released:
+        logger.info(f"{len(waiting)} 个事件已到发布时间，尚未获取到公布值")
+        return ACTUALS_POLL_INTERVAL
+
+    with events.PUBLISH_LOCK:
+        # 获取锁期间全量生成可能已经写入了公布值，重新读取状态
+        sync_state = SyncState.load(events.SYNC_STATE_FILE)
+        released = {uid: item for uid, item in released.items() if uid in find_waiting_events(sync_state, now)}
+        if released:
+            publish_actuals(sync_state, released)
+
+    if len(released) < len(waiting):
+        return ACTUALS_POLL_INTERVAL
+    return idle_delay(sync_state, now)
+
+
+def publish_actuals(sync_state: SyncState, released: Dict) -> List[str]:
+    """将公布值写入对应事件的描述，更新同步状态并上传（调用方需持有 PUBLISH_LOCK）"""
+    transforms = {
+        uid: (lambda description, item=item: events.add_actual_line(description, item))
+        for uid, item in released.items()
+    }
+    patched = patch_event_descriptions(events.ICS_FILE, transforms)
+    if os.path.exists(events.FULL_ICS_FILE):
+        # 筛选目录中的同一事件也写入公布值，筛选订阅与默认日历保持一致
+        patch_event_descriptions(events.FULL_ICS_FILE, transforms)
+
+    for uid, item in released.items():
+        entry = sync_state.entries[uid]
+        # 与全量生成使用相同的哈希，下次全量刷新不会把这些事件视为变化
+        entry['hash'] = payload_hash(item.to_dict())
+        entry['actual'] = item.actual
+    sync_state.pending_upload = True
+    sync_state.save()
+
+    for uid in patched:
+        item = released[uid]
+        logger.info(f"已写入公布值: {item.title} {item.actual}{item.unit or ''}")
+
+    if events.upload_to_cos(events.ICS_FILE, events.COS_OBJECT_KEY):
+        sync_state.mark_uploaded()
+        sync_state.save()
+    return patched
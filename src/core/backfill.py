@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumable parallel backfill of historical events and reports into the event store
+
+用法:
+    python -m src.core.backfill --from 2020-01-01 --to 2025-08-31 [--calendars events,reports]
+                                [--chunk-days 7] [--workers 4] [--rps 2] [--restart]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.common import setup_logging
+from src.core.date_range import parse_date, resolve_date_range, split_windows, window_days
+from src.core.event_store import get_event_store
+from src.core.ics_writer import replace_file
+from src.core.rate_limiter import TokenBucket
+
+# 在导入各日历模块之前配置日志
+setup_logging("backfill.log")
+logger = logging.getLogger("backfill")
+
+# 回填配置
+BACKFILL_STATE_FILE = os.environ.get('BACKFILL_STATE_FILE', os.path.join("calendar_files", "backfill_state.json"))  # 已完成时间段的检查点
+BACKFILL_CHUNK_DAYS = int(os.environ.get('BACKFILL_CHUNK_DAYS', '7'))  # 每个任务覆盖的天数
+BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', '4'))  # 并发请求的线程数
+BACKFILL_REQUESTS_PER_SECOND = float(os.environ.get('BACKFILL_REQUESTS_PER_SECOND', '2'))  # 所有日历合计每秒最多发出的请求数
+BACKFILL_BATCH_ROWS = int(os.environ.get('BACKFILL_BATCH_ROWS', '5000'))  # 累计到该条数时批量写入事件库并保存检查点
+
+CHECKPOINT_VERSION = 1
+
+# 可回填的日历：名称 -> 模块
+CALENDARS = {
+    'events': 'src.core.fetch_event_calendar',
+    'reports': 'src.core.fetch_report_calendar',
+}
+
+
+class Checkpoint:
+    """每个日历已完成（已写入事件库）的时间段，按日期标签记录，与本次回填的总范围无关"""
+
+    def __init__(self, path: str, completed: Optional[Dict[str, Set[str]]] = None):
+        self.path = path
+        self.completed = completed or {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Checkpoint':
+        """读取检查点文件，不存在或损坏时从头开始"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') == CHECKPOINT_VERSION:
+                return cls(path, {name: set(labels) for name, labels in data.get('completed', {}).items()})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"无法读取回填检查点，将从头开始: {e}")
+        return cls(path)
+
+    def is_done(self, calendar: str, label: str) -> bool:
+        return label in self.completed.get(calendar, ())
+
+    def add(self, calendar: str, label: str):
+        self.completed.setdefault(calendar, set()).add(label)
+
+    def save(self):
+        """原子写入检查点文件"""
+        replace_file(self.path, json.dumps({
+            'version': CHECKPOINT_VERSION,
+            'completed': {name: sorted(labels) for name, labels in self.completed.items()},
+        }, ensure_ascii=False, indent=1))
+
+
+class Progress:
+    """回填进度：已完成天数、条数、吞吐量和预计剩余时间"""
+
+    def __init__(self, total_days: int):
+        self.total_days = total_days
+        self.days = 0
+        self.rows = 0
+        self.started = time.monotonic()
+
+    def add(self, days: int, rows: int):
+        self.days += days
+        self.rows += rows
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        days_per_second = self.days / elapsed
+        remaining = self.total_days - self.days
+        eta = _format_duration(remaining / days_per_second) if days_per_second > 0 else "未知"
+        percent = self.days * 100 / self.total_days if self.total_days else 100
+        return (
+            f"{self.days}/{self.total_days} 天 ({percent:.1f}%) | {self.rows} 条 | "
+            f"{days_per_second:.2f} 天/秒, {self.rows / elapsed:.0f} 条/秒 | 预计剩余 {eta}"
+        )
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
+
+
+def make_fetcher(calendar: str, limiter: TokenBucket):
+    """返回获取单个时间段的函数：成功时返回记录列表（可以为空），任何请求失败时返回 None"""
+    # 按需导入，只回填财报时不会加载 openai 等依赖
+    module = importlib.import_module(CALENDARS[calendar])
+    if calendar == 'events':
+        def fetch(chunk):
+            # 与日常运行相同，宏观事件按 MACRO_MAX_WINDOW_DAYS 切分请求
+            items = []
+            for window in split_windows(chunk['start'], chunk['end'], module.MACRO_MAX_WINDOW_DAYS):
+                limiter.acquire()
+                window_items = module.fetch_calendar_window(window)
+                if window_items is None:
+                    return None
+                items.extend(window_items)
+            return items
+    else:
+        def fetch(chunk):
+            windows = split_windows(chunk['start'], chunk['end'], module.REPORT_MAX_WINDOW_DAYS)
+            items, failed_windows, _ = module.fetch_report_windows(windows, limiter)
+            return None if failed_windows else items
+    return fetch
+
+
+def _write_batch(store, batch: List, checkpoint: Checkpoint):
+    """批量写入事件库，成功后再把这些时间段记入检查点"""
+    if not batch:
+        return
+    events = [item for calendar, _, items in batch if calendar == 'events' for item in items]
+    reports = [item for calendar, _, items in batch if calendar == 'reports' for item in items]
+    store.upsert_macro_events(events)
+    store.upsert_reports(reports)
+    for calendar, label, _ in batch:
+        checkpoint.add(calendar, label)
+    checkpoint.save()
+    logger.info(f"已写入事件库: {len(events)} 个宏观事件, {len(reports)} 条财报")
+    batch.clear()
+
+
+def run_backfill(start_timestamp: int, end_timestamp: int, calendars: List[str], chunk_days: int = None,
+                 workers: int = None, requests_per_second: float = None, state_file: str = None,
+                 restart: bool = False) -> bool:
+    """按时间段并发回填历史数据到事件库，返回是否全部成功（中断后再次运行会跳过已完成的时间段）"""
+    store = get_event_store()
+    if store is None:
+        logger.error("未配置事件库（EVENT_STORE_FILE），无法回填")
+        return False
+
+    chunk_days = chunk_days or BACKFILL_CHUNK_DAYS
+    workers = max(1, workers or BACKFILL_WORKERS)
+    requests_per_second = requests_per_second or BACKFILL_REQUESTS_PER_SECOND
+    state_file = state_file or BACKFILL_STATE_FILE
+    checkpoint = Checkpoint(state_file) if restart else Checkpoint.load(state_file)
+
+    chunks = split_windows(start_timestamp, end_timestamp, chunk_days)
+    tasks = [(calendar, chunk) for calendar in calendars for chunk in chunks
+             if not checkpoint.is_done(calendar, chunk['date'])]
+    total_days = sum(window_days(chunk) for _, chunk in tasks)
+    skipped = len(calendars) * len(chunks) - len(tasks)
+    logger.info(
+        f"回填 {', '.join(calendars)}: {len(chunks)} 个时间段 x {len(calendars)} 个日历，"
+        f"跳过已完成的 {skipped} 个，剩余 {len(tasks)} 个（{total_days} 天），"
+        f"{workers} 个线程, 每秒最多 {requests_per_second} 个请求"
+    )
+    if not tasks:
+        return True
+
+    # 所有日历和线程共享同一个令牌桶
+    limiter = TokenBucket(requests_per_second)
+    fetchers = {calendar: make_fetcher(calendar, limiter) for calendar in calendars}
+    progress = Progress(total_days)
+    failed = []
+    batch = []
+    batch_rows = 0
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill")
+    try:
+        pending = {executor.submit(fetchers[calendar], chunk): (calendar, chunk) for calendar, chunk in tasks}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                calendar, chunk = pending.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    logger.error(f"{calendar} {chunk['date']} 回填时发生未预期的错误: {e}")
+                    items = None
+                if items is None:
+                    failed.append(f"{calendar} {chunk['date']}")
+                    progress.add(window_days(chunk), 0)
+                    continue
+
+                batch.append((calendar, chunk['date'], items))
+                batch_rows += len(items)
+                progress.add(window_days(chunk), len(items))
+                logger.info(f"[{calendar} {chunk['date']}] {len(items)} 条 | {progress.summary()}")
+                if batch_rows >= BACKFILL_BATCH_ROWS:
+                    _write_batch(store, batch, checkpoint)
+                    batch_rows = 0
+    except KeyboardInterrupt:
+        logger.warning("回填被中断，保存已完成的时间段，再次运行将从中断处继续")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _write_batch(store, batch, checkpoint)
+        raise
+    executor.shutdown()
+    _write_batch(store, batch, checkpoint)
+
+    logger.info(f"回填完成: {progress.summary()}，耗时 {_format_duration(time.monotonic() - progress.started)}")
+    if failed:
+        logger.error(f"以下 {len(failed)} 个时间段获取失败，再次运行将重试: {', '.join(sorted(failed))}")
+    return not failed
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="并发回填历史宏观事件和财报到本地事件库，可中断后继续")
+    parser.add_argument('--from', dest='start', type=parse_date, required=True, help="开始日期 YYYY-MM-DD")
+    parser.add_argument('--to', dest='end', type=parse_date, required=True, help="结束日期 YYYY-MM-DD（包含当天）")
+    parser.add_argument('--calendars', default=','.join(CALENDARS),
+                        help=f"要回填的日历，逗号分隔（默认 {','.join(CALENDARS)}）")
+    parser.add_argument('--chunk-days', type=int, default=BACKFILL_CHUNK_DAYS,
+                        help=f"每个任务覆盖的天数（默认 {BACKFILL_CHUNK_DAYS}）")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help=f"并发线程数（默认 {BACKFILL_WORKERS}）")
+    parser.add_argument('--rps', type=float, default=BACKFILL_REQUESTS_PER_SECOND,
+                        help=f"所有日历合计每秒最多发出的请求数（默认 {BACKFILL_REQUESTS_PER_SECOND}）")
+    parser.add_argument('--state-file', default=BACKFILL_STATE_FILE, help=f"检查点文件（默认 {BACKFILL_STATE_FILE}）")
+    parser.add_argument('--restart', action='store_true', help="忽略检查点，重新获取所有时间段")
+    args = parser.parse_args(argv)
+
+    calendars = list(dict.fromkeys(name.strip() for name in args.calendars.split(',') if name.strip()))
+    unknown = [name for name in calendars if name not in CALENDARS]
+    if unknown or not calendars:
+        parser.error(f"未知的日历: {', '.join(unknown) or args.calendars}，可选: {', '.join(CALENDARS)}")
+    args.calendars = calendars
+    if args.chunk_days < 1:
+        parser.error("--chunk-days 必须大于0")
+    if args.rps <= 0:
+        parser.error("--rps 必须大于0")
+    try:
+        resolve_date_range(args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    start_timestamp, end_timestamp = resolve_date_range(args.start, args.end)
+    try:
+        success = run_backfill(start_timestamp, end_timestamp, args.calendars, args.chunk_days, args.workers,
+                               args.rps, args.state_file, args.restart)
+    except KeyboardInterrupt:
+        return 130
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
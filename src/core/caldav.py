@@ -0,0 +1,365 @@
+"""
+Read-only CalDAV collections with RFC 6578 sync-collection support
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from src.core.ics_writer import CRLF, DEFAULT_PRODID, iter_event_blocks
+
+logger = logging.getLogger("caldav")
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+CS = "http://calendarserver.org/ns/"
+
+ET.register_namespace("D", DAV)
+ET.register_namespace("C", CALDAV)
+ET.register_namespace("CS", CS)
+
+# CalDAV 根路径（同时作为主体和日历主目录）
+CALDAV_ROOT = "/caldav/"
+
+# 同步令牌前缀；令牌中带有服务启动时间，重启后旧令牌失效，客户端会重新全量同步
+SYNC_TOKEN_PREFIX = "http://ios-calendar/ns/sync/"
+_EPOCH = str(int(time.time()))
+
+CALENDAR_CONTENT_TYPE = "text/calendar; charset=utf-8; component=VEVENT"
+
+# 删除记录（墓碑）保留的版本数；更早的同步令牌视为过期，客户端会重新全量同步
+CALDAV_TOMBSTONE_VERSIONS = int(os.environ.get('CALDAV_TOMBSTONE_VERSIONS', '1000'))
+
+
+def _tag(namespace: str, name: str) -> str:
+    return f"{{{namespace}}}{name}"
+
+
+class InvalidSyncToken(Exception):
+    """客户端提供的同步令牌无效或已过期"""
+
+
+class EventResource:
+    """集合中的单个事件资源"""
+
+    __slots__ = ("uid", "block", "etag", "version")
+
+    def __init__(self, uid: str, block: str, version: int):
+        self.uid = uid
+        self.block = block
+        self.etag = f'"{hashlib.sha256(block.encode("utf-8")).hexdigest()[:32]}"'
+        self.version = version
+
+    def to_ics(self) -> bytes:
+        """包装为只含一个事件的 VCALENDAR"""
+        return (
+            f"BEGIN:VCALENDAR{CRLF}VERSION:2.0{CRLF}PRODID:{DEFAULT_PRODID}{CRLF}"
+            f"{self.block}{CRLF}END:VCALENDAR{CRLF}"
+        ).encode("utf-8")
+
+
+class CalendarCollection:
+    """一个日历集合及其按UID记录的版本日志
+
+    每次日历文件更新时与上一版本逐个事件比较：新增或内容变化的事件记录新的版本号，
+    消失的事件记录删除版本号（墓碑），sync-collection 据此只返回令牌之后的变化。
+    墓碑只保留最近 CALDAV_TOMBSTONE_VERSIONS 个版本，早于 min_version 的令牌不再接受。
+    """
+
+    def __init__(self, name: str, display_name: str):
+        self.name = name
+        self.display_name = display_name
+        self.href = f"{CALDAV_ROOT}{name}/"
+        self.version = 0
+        self.resources: Dict[str, EventResource] = {}
+        self.tombstones: Dict[str, int] = {}  # 已删除的UID -> 删除时的版本号
+        self.min_version = 0  # 仍能增量同步的最早令牌版本
+        self._lock = threading.Lock()
+
+    @property
+    def sync_token(self) -> str:
+        return f"{SYNC_TOKEN_PREFIX}{_EPOCH}-{self.version}"
+
+    def update(self, content: str) -> Tuple[int, int]:
+        """根据新的日历内容更新版本日志，返回 (变化的事件数, 删除的事件数)"""
+        blocks = {uid: block for uid, block in iter_event_blocks(content) if uid}
+        with self._lock:
+            changed = [
+                uid for uid, block in blocks.items()
+                if uid not in self.resources or self.resources[uid].block != block
+            ]
+            removed = [uid for uid in self.resources if uid not in blocks]
+            if not changed and not removed:
+                return 0, 0
+
+            self.version += 1
+            resources = dict(self.resources)
+            for uid in changed:
+                resources[uid] = EventResource(uid, blocks[uid], self.version)
+                self.tombstones.pop(uid, None)
+            for uid in removed:
+                del resources[uid]
+                self.tombstones[uid] = self.version
+            self.resources = resources
+            self._prune_tombstones()
+
+        logger.info(f"{self.name} 版本 {self.version}: 变化 {len(changed)} 个, 删除 {len(removed)} 个")
+        return len(changed), len(removed)
+
+    def _prune_tombstones(self):
+        """丢弃超出保留版本数的墓碑（调用方持有锁）"""
+        floor = self.version - CALDAV_TOMBSTONE_VERSIONS
+        if floor <= self.min_version:
+            return
+        self.min_version = floor
+        self.tombstones = {uid: version for uid, version in self.tombstones.items() if version > floor}
+
+    def resource_href(self, uid: str) -> str:
+        return f"{self.href}{quote(uid, safe='')}.ics"
+
+    def find(self, href: str) -> Optional[EventResource]:
+        """根据资源路径查找事件"""
+        path = unquote(urlsplit(href).path)
+        if not path.startswith(self.href) or not path.endswith(".ics"):
+            return None
+        return self.resources.get(path[len(self.href):-len(".ics")])
+
+    def changes_since(self, token: Optional[str]) -> Tuple[List[EventResource], List[str], str]:
+        """返回令牌之后变化的资源、删除的UID和新令牌；令牌为空时返回全部资源"""
+        with self._lock:
+            resources = self.resources
+            current = self.sync_token
+            if not token:
+                return list(resources.values()), [], current
+
+            if not token.startswith(f"{SYNC_TOKEN_PREFIX}{_EPOCH}-"):
+                raise InvalidSyncToken(token)
+            try:
+                since = int(token.rsplit("-", 1)[1])
+            except ValueError:
+                raise InvalidSyncToken(token)
+            if since > self.version or since < self.min_version:
+                # 更早的删除记录已丢弃，无法计算增量
+                raise InvalidSyncToken(token)
+
+            changed = [resource for resource in resources.values() if resource.version > since]
+            deleted = [uid for uid, version in self.tombstones.items() if version > since]
+            return changed, deleted, current
+
+
+class CalDAVService:
+    """处理 CalDAV 请求（只读），返回 (状态码, 响应头, 响应体)"""
+
+    def __init__(self, collections: Dict[str, CalendarCollection]):
+        self.collections = collections
+
+    # ---- 路由 ----
+
+    def _resolve(self, path: str):
+        """返回 (集合, 资源)；根路径返回 (None, None)，不存在时抛出 KeyError"""
+        path = unquote(urlsplit(path).path)
+        if path.rstrip("/") + "/" == CALDAV_ROOT:
+            return None, None
+        for collection in self.collections.values():
+            if path.rstrip("/") + "/" == collection.href:
+                return collection, None
+            if path.startswith(collection.href):
+                resource = collection.find(path)
+                if resource is None:
+                    raise KeyError(path)
+                return collection, resource
+        raise KeyError(path)
+
+    def handle(self, method: str, path: str, depth: str, body: bytes):
+        try:
+            collection, resource = self._resolve(path)
+        except KeyError:
+            return 404, {}, b""
+
+        if method == "OPTIONS":
+            return 200, {
+                "DAV": "1, 3, calendar-access, sync-collection",
+                "Allow": "OPTIONS, GET, HEAD, PROPFIND, REPORT",
+            }, b""
+        if method in ("GET", "HEAD"):
+            if resource is None:
+                return 405, {"Allow": "OPTIONS, PROPFIND, REPORT"}, b""
+            return 200, {"Content-Type": CALENDAR_CONTENT_TYPE, "ETag": resource.etag}, resource.to_ics()
+
+        try:
+            request = ET.fromstring(body) if body.strip() else None
+        except ET.ParseError:
+            return 400, {}, b""
+
+        if method == "PROPFIND":
+            return self._propfind(collection, resource, depth, request)
+        if method == "REPORT" and collection is not None and request is not None:
+            if request.tag == _tag(DAV, "sync-collection"):
+                return self._sync_collection(collection, request)
+            if request.tag == _tag(CALDAV, "calendar-multiget"):
+                return self._multiget(collection, request)
+            if request.tag == _tag(CALDAV, "calendar-query"):
+                # 不做服务端过滤，返回集合中的全部事件
+                return self._multistatus([
+                    self._resource_response(collection, item, _requested_props(request))
+                    for item in collection.resources.values()
+                ])
+        return 405, {"Allow": "OPTIONS, GET, HEAD, PROPFIND, REPORT"}, b""
+
+    # ---- PROPFIND ----
+
+    def _propfind(self, collection, resource, depth, request):
+        props = _requested_props(request)
+        if resource is not None:
+            return self._multistatus([self._resource_response(collection, resource, props)])
+
+        if collection is None:
+            responses = [self._root_response(props)]
+            if depth == "1":
+                responses += [self._collection_response(item, props) for item in self.collections.values()]
+            return self._multistatus(responses)
+
+        responses = [self._collection_response(collection, props)]
+        if depth == "1":
+            responses += [self._resource_response(collection, item, props) for item in collection.resources.values()]
+        return self._multistatus(responses)
+
+    def _root_response(self, props):
+        values = {
+            _tag(DAV, "resourcetype"): [ET.Element(_tag(DAV, "collection"))],
+            _tag(DAV, "displayname"): "ios-calendar",
+            _tag(DAV, "current-user-principal"): [_href(CALDAV_ROOT)],
+            _tag(CALDAV, "calendar-home-set"): [_href(CALDAV_ROOT)],
+            _tag(DAV, "principal-URL"): [_href(CALDAV_ROOT)],
+        }
+        return _response(CALDAV_ROOT, props, values)
+
+    def _collection_response(self, collection: CalendarCollection, props):
+        components = ET.Element(_tag(CALDAV, "comp"), name="VEVENT")
+        reports = []
+        for namespace, name in ((DAV, "sync-collection"), (CALDAV, "calendar-multiget"), (CALDAV, "calendar-query")):
+            supported = ET.Element(_tag(DAV, "supported-report"))
+            ET.SubElement(ET.SubElement(supported, _tag(DAV, "report")), _tag(namespace, name))
+            reports.append(supported)
+        privilege = ET.Element(_tag(DAV, "privilege"))
+        ET.SubElement(privilege, _tag(DAV, "read"))
+
+        values = {
+            _tag(DAV, "resourcetype"): [ET.Element(_tag(DAV, "collection")), ET.Element(_tag(CALDAV, "calendar"))],
+            _tag(DAV, "displayname"): collection.display_name,
+            _tag(DAV, "sync-token"): collection.sync_token,
+            _tag(CS, "getctag"): collection.sync_token,
+            _tag(CALDAV, "supported-calendar-component-set"): [components],
+            _tag(DAV, "supported-report-set"): reports,
+            _tag(DAV, "current-user-privilege-set"): [privilege],
+            _tag(DAV, "current-user-principal"): [_href(CALDAV_ROOT)],
+        }
+        return _response(collection.href, props, values)
+
+    def _resource_response(self, collection: CalendarCollection, resource: EventResource, props):
+        values = {
+            _tag(DAV, "getetag"): resource.etag,
+            _tag(DAV, "getcontenttype"): CALENDAR_CONTENT_TYPE,
+            _tag(DAV, "resourcetype"): [],
+            _tag(CALDAV, "calendar-data"): lambda: resource.to_ics().decode("utf-8"),
+        }
+        return _response(collection.resource_href(resource.uid), props, values)
+
+    # ---- REPORT ----
+
+    def _sync_collection(self, collection: CalendarCollection, request):
+        token_element = request.find(_tag(DAV, "sync-token"))
+        token = (token_element.text or "").strip() if token_element is not None else ""
+        try:
+            changed, deleted, new_token = collection.changes_since(token)
+        except InvalidSyncToken:
+            error = ET.Element(_tag(DAV, "error"))
+            ET.SubElement(error, _tag(DAV, "valid-sync-token"))
+            return 403, {"Content-Type": "application/xml; charset=utf-8"}, _serialize(error)
+
+        props = _requested_props(request)
+        responses = [self._resource_response(collection, resource, props) for resource in changed]
+        for uid in deleted:
+            response = ET.Element(_tag(DAV, "response"))
+            response.append(_href(collection.resource_href(uid)))
+            ET.SubElement(response, _tag(DAV, "status")).text = "HTTP/1.1 404 Not Found"
+            responses.append(response)
+        return self._multistatus(responses, new_token)
+
+    def _multiget(self, collection: CalendarCollection, request):
+        props = _requested_props(request)
+        responses = []
+        for href in request.findall(_tag(DAV, "href")):
+            resource = collection.find((href.text or "").strip())
+            if resource is not None:
+                responses.append(self._resource_response(collection, resource, props))
+            else:
+                response = ET.Element(_tag(DAV, "response"))
+                response.append(_href((href.text or "").strip()))
+                ET.SubElement(response, _tag(DAV, "status")).text = "HTTP/1.1 404 Not Found"
+                responses.append(response)
+        return self._multistatus(responses)
+
+    def _multistatus(self, responses, sync_token: Optional[str] = None):
+        root = ET.Element(_tag(DAV, "multistatus"))
+        root.extend(responses)
+        if sync_token is not None:
+            ET.SubElement(root, _tag(DAV, "sync-token")).text = sync_token
+        return 207, {"Content-Type": "application/xml; charset=utf-8"}, _serialize(root)
+
+
+def _requested_props(request) -> Optional[List[str]]:
+    """请求中 DAV:prop 列出的属性；没有 prop（allprop）时返回 None"""
+    if request is None:
+        return None
+    prop = request.find(f".//{_tag(DAV, 'prop')}")
+    if prop is None:
+        return None
+    return [child.tag for child in prop]
+
+
+def _href(path: str) -> ET.Element:
+    element = ET.Element(_tag(DAV, "href"))
+    element.text = path
+    return element
+
+
+def _response(href: str, props: Optional[List[str]], values: Dict) -> ET.Element:
+    """构建 DAV:response：找到的属性放在 200 propstat，其余放在 404 propstat"""
+    response = ET.Element(_tag(DAV, "response"))
+    response.append(_href(href))
+
+    if props is None:
+        # allprop 不返回需要计算的大属性（calendar-data）
+        props = [name for name, value in values.items() if not callable(value)]
+
+    found = ET.Element(_tag(DAV, "prop"))
+    missing = ET.Element(_tag(DAV, "prop"))
+    for name in props:
+        if name not in values:
+            ET.SubElement(missing, name)
+            continue
+        value = values[name]
+        if callable(value):
+            value = value()
+        element = ET.SubElement(found, name)
+        if isinstance(value, str):
+            element.text = value
+        else:
+            element.extend(value)
+
+    for prop, status in ((found, "HTTP/1.1 200 OK"), (missing, "HTTP/1.1 404 Not Found")):
+        if len(prop):
+            propstat = ET.SubElement(response, _tag(DAV, "propstat"))
+            propstat.append(prop)
+            ET.SubElement(propstat, _tag(DAV, "status")).text = status
+    return response
+
+
+def _serialize(element: ET.Element) -> bytes:
+    return ET.tostring(element, encoding="utf-8", xml_declaration=True)
@@ -0,0 +1,252 @@
+"""
+Configuration and helpers shared by the calendar pipelines
+"""
+
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from qcloud_cos import CosConfig
+from qcloud_cos import CosS3Client
+
+from src.core.date_range import CHINA_TZ, format_timestamp, resolve_date_range
+
+logger = logging.getLogger("calendar_common")
+
+# 项目根目录
+project_root = str(Path(__file__).parent.parent.parent)
+
+# 检查是否在GitHub Actions环境中运行
+is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
+
+# 腾讯云COS配置（对象键由各日历自行配置）
+COS_SECRET_ID = os.environ.get('COS_SECRET_ID', '')  # 从环境变量获取，也可以直接设置
+COS_SECRET_KEY = os.environ.get('COS_SECRET_KEY', '')  # 从环境变量获取，也可以直接设置
+COS_REGION = os.environ.get('COS_REGION', 'ap-beijing')  # COS存储桶所在地域
+COS_BUCKET = os.environ.get('COS_BUCKET', '')  # 存储桶名称
+COS_ENDPOINT_URL = os.environ.get('COS_ENDPOINT_URL', '')  # 自定义服务地址（可选），如 http://127.0.0.1:9000/bucket 用于本地测试
+COS_SKIP_UNCHANGED = os.environ.get('COS_SKIP_UNCHANGED', 'true').lower() != 'false'  # 内容哈希与COS上的对象一致时跳过上传
+
+COS_CONTENT_ENCODING = os.environ.get('COS_CONTENT_ENCODING', 'identity').lower()  # 上传编码：identity（原始内容）或 gzip（预压缩）
+COS_BROTLI_VARIANT = os.environ.get('COS_BROTLI_VARIANT', 'false').lower() == 'true'  # 另外上传 brotli 预压缩的 <对象键>.br（需要安装 brotli）
+COS_CACHE_CONTROL = os.environ.get('COS_CACHE_CONTROL', '')  # 对象的 Cache-Control 头，如 public, max-age=3600（为空时不设置）
+COS_EXPIRES_SECONDS = int(os.environ.get('COS_EXPIRES_SECONDS', '0'))  # 大于0时设置 Expires 头为上传时间之后的秒数
+
+# 对象的内容哈希保存在自定义元数据中
+COS_HASH_METADATA = 'x-cos-meta-sha256'
+
+# 日历对象的 Content-Type
+ICS_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+_cos_client = None
+_cos_lock = threading.Lock()
+
+
+def _brotli_available() -> bool:
+    """是否安装了 brotli（br 预压缩需要）"""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _resolve_content_encoding(encoding: str) -> str:
+    """检查配置的上传编码，不支持或未安装 brotli 时退回 identity，避免每次上传日历都失败"""
+    if encoding not in ('identity', 'gzip', 'br'):
+        logger.warning(f"不支持的上传编码: {encoding}（可选 identity、gzip、br），将上传原始内容")
+        return 'identity'
+    if encoding == 'br' and not _brotli_available():
+        logger.warning("COS_CONTENT_ENCODING=br 但未安装 brotli（pip install brotli），将上传原始内容")
+        return 'identity'
+    return encoding
+
+
+# 启动时确定实际使用的上传编码
+COS_CONTENT_ENCODING = _resolve_content_encoding(COS_CONTENT_ENCODING)
+
+
+def setup_logging(log_file: str):
+    """配置日志（同一进程内只有第一次调用生效，多个日历共享同一套日志输出）"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    # 确保日志目录存在
+    log_dir = os.path.join(project_root, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(log_dir, log_file)) if not is_github_actions else logging.StreamHandler(),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def get_current_week_timestamps() -> Tuple[int, int]:
+    """获取本周周一至周日的时间戳"""
+    start_timestamp, end_timestamp = resolve_date_range()
+
+    logger.info(f"本周时间范围: {format_timestamp(start_timestamp)} 至 {format_timestamp(end_timestamp)}")
+    logger.info(f"时间戳范围: {start_timestamp} 至 {end_timestamp}")
+
+    return start_timestamp, end_timestamp
+
+
+def get_cos_client() -> CosS3Client:
+    """获取进程内共享的COS客户端"""
+    global _cos_client
+    if _cos_client is None:
+        with _cos_lock:
+            if _cos_client is None:
+                options = {}
+                if COS_ENDPOINT_URL:
+                    # 自定义服务地址（如本地的兼容服务），请求地址为 <服务地址>/<对象键>
+                    endpoint = urlsplit(COS_ENDPOINT_URL)
+                    options = {'Scheme': endpoint.scheme or 'http', 'Domain': endpoint.netloc + endpoint.path.rstrip('/')}
+                config = CosConfig(
+                    Region=COS_REGION,
+                    SecretId=COS_SECRET_ID,
+                    SecretKey=COS_SECRET_KEY,
+                    **options
+                )
+                _cos_client = CosS3Client(config)
+    return _cos_client
+
+
+def cos_configured() -> bool:
+    """COS配置是否完整"""
+    return all([COS_SECRET_ID, COS_SECRET_KEY, COS_BUCKET])
+
+
+def cos_object_url(object_key: str) -> str:
+    """对象的访问URL（如果是公共读取权限的存储桶）"""
+    if COS_ENDPOINT_URL:
+        return f"{COS_ENDPOINT_URL.rstrip('/')}/{object_key}"
+    return f'https://{COS_BUCKET}.cos.{COS_REGION}.myqcloud.com/{object_key}'
+
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    """按 Content-Encoding 预压缩上传内容（gzip 固定 mtime，相同内容压缩结果相同）"""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(body, quality=11)
+    if encoding != 'identity':
+        raise ValueError(f"不支持的上传编码: {encoding}（可选 identity、gzip、br）")
+    return body
+
+
+def cos_object_headers(encoding: str) -> Dict[str, str]:
+    """日历对象的HTTP头（put_object 的参数名）"""
+    headers = {'ContentType': ICS_CONTENT_TYPE}
+    if encoding != 'identity':
+        headers['ContentEncoding'] = encoding
+    if COS_CACHE_CONTROL:
+        headers['CacheControl'] = COS_CACHE_CONTROL
+    if COS_EXPIRES_SECONDS > 0:
+        headers['Expires'] = formatdate(time.time() + COS_EXPIRES_SECONDS, usegmt=True)
+    return headers
+
+
+def head_cos_object(object_key: str, client: Optional[CosS3Client] = None) -> Dict[str, str]:
+    """读取COS上对象的HTTP头（键为小写，对象不存在或读取失败时返回空字典）"""
+    try:
+        headers = (client or get_cos_client()).head_object(Bucket=COS_BUCKET, Key=object_key)
+    except Exception as e:
+        logger.info(f"无法读取COS对象 {object_key} 的元数据，将直接上传: {e}")
+        return {}
+    return {name.lower(): value for name, value in headers.items()}
+
+
+def _upload_variant(client: CosS3Client, object_key: str, body: bytes, digest: str, encoding: str) -> Optional[int]:
+    """上传一个编码版本，返回上传的字节数；内容哈希、编码和缓存头都与COS上的对象一致时跳过并返回 None"""
+    headers = cos_object_headers(encoding)
+    if COS_SKIP_UNCHANGED:
+        remote = head_cos_object(object_key, client)
+        if (remote.get(COS_HASH_METADATA) == digest
+                and remote.get('content-encoding', 'identity') == encoding
+                and remote.get('cache-control', '') == COS_CACHE_CONTROL):
+            logger.info(f"文件内容与COS上的对象相同，跳过上传: {object_key}")
+            return None
+
+    encoded = encode_body(body, encoding)
+    client.put_object(
+        Bucket=COS_BUCKET,
+        Body=encoded,
+        Key=object_key,
+        Metadata={COS_HASH_METADATA: digest},
+        **headers
+    )
+
+    if encoding == 'identity':
+        logger.info(f"文件已成功上传到腾讯云COS，对象键为: {object_key}")
+    else:
+        logger.info(
+            f"文件已成功上传到腾讯云COS，对象键为: {object_key}（{encoding} 预压缩，"
+            f"{len(body)} -> {len(encoded)} 字节）"
+        )
+    logger.info(f"文件URL: {cos_object_url(object_key)}")
+    return len(encoded)
+
+
+def publish_file(file_path: str, object_key: str,
+                 client: Optional[CosS3Client] = None) -> List[Tuple[str, str, Optional[int]]]:
+    """上传一个文件的所有编码版本，返回 [(对象键, 内容哈希, 上传的字节数或 None 表示跳过)]，失败时抛出异常
+
+    文件的SHA-256保存在对象元数据中；与COS上已有对象的哈希相同时跳过上传。
+    按 COS_CONTENT_ENCODING 上传预压缩内容，COS_BROTLI_VARIANT 开启时另外上传 <对象键>.br
+    """
+    client = client or get_cos_client()
+    with open(file_path, "rb") as f:
+        body = f.read()
+    digest = hashlib.sha256(body).hexdigest()
+
+    # 所有编码版本共用同一个COS客户端
+    results = [(object_key, digest, _upload_variant(client, object_key, body, digest, COS_CONTENT_ENCODING))]
+    if COS_BROTLI_VARIANT:
+        try:
+            variant_key = f"{object_key}.br"
+            results.append((variant_key, digest, _upload_variant(client, variant_key, body, digest, 'br')))
+        except ImportError:
+            logger.warning("未安装 brotli，跳过 brotli 预压缩版本的上传（pip install brotli）")
+    return results
+
+
+def upload_to_cos(file_path: str, object_key: str) -> bool:
+    """上传文件到腾讯云COS（内容没有变化时跳过，见 publish_file）"""
+    if not os.path.exists(file_path):
+        logger.error(f"要上传的文件不存在: {file_path}")
+        return False
+
+    # 检查COS配置是否完整
+    if not cos_configured():
+        logger.error("腾讯云COS配置不完整，请设置环境变量或在脚本中直接配置")
+        # 在GitHub Actions环境中，可能没有COS配置，但我们不想让工作流失败
+        if is_github_actions:
+            logger.warning("在GitHub Actions环境中，跳过COS上传")
+            return True
+        return False
+
+    try:
+        publish_file(file_path, object_key)
+        return True
+
+    except Exception as e:
+        logger.error(f"上传文件到腾讯云COS时发生错误: {e}")
+        # 在GitHub Actions环境中，不因COS上传失败而让整个工作流失败
+        if is_github_actions:
+            logger.warning("在GitHub Actions环境中，忽略COS上传错误，继续执行")
+            return True
+        return False
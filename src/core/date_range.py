@@ -0,0 +1,121 @@
+"""
+Date range helpers shared by the calendar fetchers
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+# 定义中国时区（无夏令时，一天固定为86400秒）
+CHINA_TZ = pytz.timezone('Asia/Shanghai')
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def parse_date(value: str) -> datetime:
+    """将 YYYY-MM-DD 解析为北京时间当天 00:00:00"""
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD: {value}")
+    return CHINA_TZ.localize(day)
+
+
+def current_week_start(now: Optional[datetime] = None) -> datetime:
+    """获取本周周一 00:00:00（北京时间）"""
+    today = now or datetime.now(CHINA_TZ)
+    monday = today - timedelta(days=today.weekday())
+    return CHINA_TZ.localize(datetime(monday.year, monday.month, monday.day))
+
+
+def resolve_date_range(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       weeks: Optional[int] = None, now: Optional[datetime] = None) -> Tuple[int, int]:
+    """计算要获取的时间戳范围（闭区间，结束于最后一天的 23:59:59）
+
+    - 指定 start/end 时使用 [start, end] 日期范围
+    - 只指定 start 时从 start 起取 weeks 周（默认1周）
+    - 都未指定时从本周周一起取 weeks 周（默认即本周周一至周日）
+    - end 与 weeks 不能同时指定
+    """
+    if end is not None and weeks is not None:
+        raise ValueError("结束日期和周数不能同时指定")
+    if weeks is None:
+        weeks = 1
+    if weeks < 1:
+        raise ValueError(f"周数必须大于0: {weeks}")
+
+    start_day = start or current_week_start(now)
+    if end is not None:
+        end_day = end
+    else:
+        end_day = start_day + timedelta(days=7 * weeks - 1)
+
+    if end_day < start_day:
+        raise ValueError(f"结束日期 {end_day.strftime('%Y-%m-%d')} 早于开始日期 {start_day.strftime('%Y-%m-%d')}")
+
+    start_timestamp = int(start_day.timestamp())
+    end_timestamp = int(end_day.timestamp()) + SECONDS_PER_DAY - 1
+    return start_timestamp, end_timestamp
+
+
+def format_timestamp(timestamp: int) -> str:
+    """将时间戳格式化为北京时间字符串"""
+    return datetime.fromtimestamp(timestamp, tz=CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def make_window(start_timestamp: int, end_timestamp: int) -> Dict:
+    """构建时间窗口描述（date 为便于日志阅读的日期标签）"""
+    start_date = datetime.fromtimestamp(start_timestamp, tz=CHINA_TZ).strftime('%Y-%m-%d')
+    end_date = datetime.fromtimestamp(end_timestamp, tz=CHINA_TZ).strftime('%Y-%m-%d')
+    return {
+        'date': start_date if start_date == end_date else f"{start_date}~{end_date}",
+        'start': start_timestamp,
+        'end': end_timestamp
+    }
+
+
+def window_days(window: Dict) -> int:
+    """窗口覆盖的天数"""
+    return (window['end'] - window['start'] + 1 + SECONDS_PER_DAY - 1) // SECONDS_PER_DAY
+
+
+def split_windows(start_timestamp: int, end_timestamp: int, max_days: int) -> List[Dict]:
+    """将时间范围按天对齐切分为不超过 max_days 天的窗口列表"""
+    max_days = max(1, max_days)
+    windows = []
+    window_start = start_timestamp
+    while window_start <= end_timestamp:
+        window_end = min(window_start + max_days * SECONDS_PER_DAY - 1, end_timestamp)
+        windows.append(make_window(window_start, window_end))
+        window_start = window_end + 1
+    return windows
+
+
+def halve_window(window: Dict) -> Optional[Tuple[Dict, Dict]]:
+    """按天边界将窗口对半拆分，单天窗口无法再拆分时返回 None"""
+    days = window_days(window)
+    if days <= 1:
+        return None
+    middle = window['start'] + (days // 2) * SECONDS_PER_DAY
+    return make_window(window['start'], middle - 1), make_window(middle, window['end'])
+
+
+def add_date_range_arguments(parser: argparse.ArgumentParser):
+    """为命令行添加 --start/--end/--weeks 参数"""
+    parser.add_argument('--start', type=parse_date, help="开始日期 YYYY-MM-DD（默认本周周一）")
+    # 指定结束日期时周数没有意义，两者只能选一个
+    span = parser.add_mutually_exclusive_group()
+    span.add_argument('--end', type=parse_date, help="结束日期 YYYY-MM-DD（包含当天）")
+    span.add_argument('--weeks', type=int, default=None, help="从开始日期起获取的周数（默认1周，不能与 --end 同时使用）")
+
+
+def date_range_from_args(args, parser: Optional[argparse.ArgumentParser] = None) -> Tuple[int, int]:
+    """根据命令行参数计算时间戳范围；传入 parser 时参数无效通过 parser.error 退出"""
+    try:
+        return resolve_date_range(args.start, args.end, args.weeks)
+    except ValueError as e:
+        if parser is None:
+            raise
+        parser.error(str(e))
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent SQLite store of fetched macro events, earnings reports and their analyses
+
+用法:
+    python -m src.core.event_store events --start 2025-07-01 --end 2025-09-30 --keyword 美联储
+    python -m src.core.event_store reports --ticker TSLA.US --ticker 00700.HK
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.date_range import CHINA_TZ, add_date_range_arguments, date_range_from_args
+from src.core.feed_index import normalize_country
+from src.core.records import EarningsReport, MacroEvent
+from src.core.sync_state import payload_hash
+from src.core.watchlist import normalize_ticker
+
+logger = logging.getLogger("event_store")
+
+# 事件库文件（为空时不保存）
+EVENT_STORE_FILE = os.environ.get('EVENT_STORE_FILE', os.path.join("calendar_files", "events.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS macro_events (
+    id TEXT PRIMARY KEY,
+    public_date INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    country TEXT NOT NULL,
+    importance INTEGER,
+    title TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    actual_value REAL,
+    forecast_value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_macro_events_date ON macro_events (public_date);
+CREATE INDEX IF NOT EXISTS idx_macro_events_country ON macro_events (country, public_date);
+CREATE INDEX IF NOT EXISTS idx_macro_events_importance ON macro_events (importance, public_date);
+-- 已公布实际值的宏观事件按 (国家, 标题, 时间) 排列，供历史偏差统计按列读取
+CREATE INDEX IF NOT EXISTS idx_macro_events_history ON macro_events (country, title, public_date, actual_value, forecast_value)
+WHERE actual_value IS NOT NULL AND forecast_value IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS earnings_reports (
+    id TEXT PRIMARY KEY,
+    public_date INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    market TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    company_name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_earnings_reports_date ON earnings_reports (public_date);
+CREATE INDEX IF NOT EXISTS idx_earnings_reports_ticker ON earnings_reports (ticker, public_date);
+CREATE INDEX IF NOT EXISTS idx_earnings_reports_market ON earnings_reports (market, public_date);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    uid TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    description TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_LEADING_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _day(public_date: int) -> str:
+    """时间戳对应的北京时间日期"""
+    return datetime.fromtimestamp(public_date, tz=CHINA_TZ).strftime('%Y-%m-%d')
+
+
+def _number(value) -> Optional[float]:
+    """公布值/预期值开头的数字（"2.7%" -> 2.7，"1,234K" -> 1234.0），无法解析时返回 None"""
+    match = _LEADING_NUMBER.match(str(value or '').replace(',', '').strip())
+    return float(match.group()) if match else None
+
+
+def _in_clause(column: str, values: Sequence) -> Tuple[str, List]:
+    return f"{column} IN ({', '.join('?' * len(values))})", list(values)
+
+
+class EventStore:
+    """规范化后的宏观事件、财报和AI分析的本地SQLite库
+
+    按日期、国家、重要性和股票代码建立索引，重新生成日历时可以直接查询本地数据，不再请求接口。
+    内容哈希未变化的行不会被重写。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # 多个日历在同一进程的不同线程中写入，统一由锁串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def upsert_macro_events(self, events: Iterable[MacroEvent]) -> int:
+        """批量写入宏观事件，返回新增或内容变化的事件数"""
+        now = time.time()
+        rows = []
+        for event in events:
+            if not event.public_date or event.id is None:
+                continue
+            payload = event.to_dict()
+            rows.append((
+                str(event.id), int(event.public_date), _day(event.public_date), normalize_country(event.country),
+                event.importance, event.title or '', json.dumps(payload, ensure_ascii=False),
+                payload_hash(payload), now, _number(event.actual), _number(event.forecast)
+            ))
+        return self._upsert("""
+            INSERT INTO macro_events (id, public_date, day, country, importance, title, payload, hash, updated_at,
+                                      actual_value, forecast_value)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                public_date = excluded.public_date, day = excluded.day, country = excluded.country,
+                importance = excluded.importance, title = excluded.title, payload = excluded.payload,
+                hash = excluded.hash, updated_at = excluded.updated_at,
+                actual_value = excluded.actual_value, forecast_value = excluded.forecast_value
+            WHERE macro_events.hash != excluded.hash
+        """, rows)
+
+    def upsert_reports(self, reports: Iterable[EarningsReport]) -> int:
+        """批量写入财报，返回新增或内容变化的财报数"""
+        now = time.time()
+        rows = []
+        for report in reports:
+            if not report.public_date or report.id is None:
+                continue
+            payload = report.to_dict()
+            rows.append((
+                str(report.id), int(report.public_date), _day(report.public_date), normalize_country(report.country),
+                normalize_ticker(report.code) or (report.code or '').upper(), report.company_name or '',
+                json.dumps(payload, ensure_ascii=False), payload_hash(payload), now
+            ))
+        return self._upsert("""
+            INSERT INTO earnings_reports (id, public_date, day, market, ticker, company_name, payload, hash, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                public_date = excluded.public_date, day = excluded.day, market = excluded.market,
+                ticker = excluded.ticker, company_name = excluded.company_name, payload = excluded.payload,
+                hash = excluded.hash, updated_at = excluded.updated_at
+            WHERE earnings_reports.hash != excluded.hash
+        """, rows)
+
+    def save_analyses(self, analyses: Dict[str, Tuple[str, str]]):
+        """保存分析成功的事件描述 {UID: (事件内容哈希, 描述)}"""
+        now = time.time()
+        rows = [(uid, digest, description, now) for uid, (digest, description) in analyses.items() if description]
+        self._upsert("""
+            INSERT INTO analyses (uid, hash, description, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(uid) DO UPDATE SET
+                hash = excluded.hash, description = excluded.description, updated_at = excluded.updated_at
+            WHERE analyses.hash != excluded.hash OR analyses.description != excluded.description
+        """, rows)
+
+    def _upsert(self, sql: str, rows: List[tuple]) -> int:
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(sql, rows)
+            return self._conn.total_changes - before
+
+    def get_analyses(self, uids: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """读取事件的分析描述，返回 {UID: (事件内容哈希, 描述)}"""
+        uids = list(uids)
+        analyses = {}
+        with self._lock:
+            # 分批查询，避免超过SQLite的参数个数限制
+            for offset in range(0, len(uids), 500):
+                clause, params = _in_clause("uid", uids[offset:offset + 500])
+                for uid, digest, description in self._conn.execute(
+                    f"SELECT uid, hash, description FROM analyses WHERE {clause}", params
+                ):
+                    analyses[uid] = (digest, description)
+        return analyses
+
+    def query_macro_events(self, start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                           countries: Optional[Sequence[str]] = None, min_importance: Optional[int] = None,
+                           keyword: Optional[str] = None, limit: Optional[int] = None) -> List[MacroEvent]:
+        """按时间范围（包含两端）、国家、最低重要性和标题关键词查询宏观事件，按发布时间排序"""
+        where, params = self._time_range(start_timestamp, end_timestamp)
+        if countries:
+            clause, values = _in_clause("country", [normalize_country(country) for country in countries])
+            where.append(clause)
+            params.extend(values)
+        if min_importance is not None:
+            where.append("importance >= ?")
+            params.append(min_importance)
+        if keyword:
+            where.append("title LIKE ?")
+            params.append(f"%{keyword}%")
+        rows = self._select("macro_events", where, params, limit)
+        return [MacroEvent.from_api(json.loads(payload)) for payload in rows]
+
+    def query_reports(self, start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                      tickers: Optional[Sequence[str]] = None, markets: Optional[Sequence[str]] = None,
+                      limit: Optional[int] = None) -> List[EarningsReport]:
+        """按时间范围（包含两端）、股票代码和市场查询财报，按发布时间排序"""
+        where, params = self._time_range(start_timestamp, end_timestamp)
+        if tickers:
+            clause, values = _in_clause("ticker", [normalize_ticker(ticker) or ticker.upper() for ticker in tickers])
+            where.append(clause)
+            params.extend(values)
+        if markets:
+            clause, values = _in_clause("market", [normalize_country(market) for market in markets])
+            where.append(clause)
+            params.extend(values)
+        rows = self._select("earnings_reports", where, params, limit)
+        return [EarningsReport.from_api(json.loads(payload)) for payload in rows]
+
+    def macro_history(self, end_timestamp: Optional[int] = None
+                      ) -> Tuple[List[Tuple[str, str, int]], List[Tuple[int, float, float]]]:
+        """已公布实际值的宏观事件，返回 ([(国家代码, 标题, 公布次数)], [(发布时间戳, 公布值, 预期值)])
+
+        两个查询都按 (国家, 标题, 时间) 顺序扫描同一个覆盖索引，第二个结果的前N行属于第一个标题，依此类推；
+        只读取数值列，Python中不需要逐行解码事件或处理字符串。两个查询在同一个读事务中执行，
+        其他进程（如回填）在两次查询之间写入时，公布次数与数值行仍然对应同一份快照。
+        """
+        where = "actual_value IS NOT NULL AND forecast_value IS NOT NULL"
+        params = []
+        if end_timestamp is not None:
+            where += " AND public_date <= ?"
+            params.append(int(end_timestamp))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                names = self._conn.execute(f"""
+                    SELECT country, title, COUNT(*) FROM macro_events WHERE {where}
+                    GROUP BY country, title ORDER BY country, title
+                """, params).fetchall()
+                rows = self._conn.execute(f"""
+                    SELECT public_date, actual_value, forecast_value FROM macro_events WHERE {where}
+                    ORDER BY country, title, public_date
+                """, params).fetchall()
+            finally:
+                self._conn.commit()
+        return names, rows
+
+    @staticmethod
+    def _time_range(start_timestamp: Optional[int], end_timestamp: Optional[int]) -> Tuple[List[str], List]:
+        where, params = [], []
+        if start_timestamp is not None:
+            where.append("public_date >= ?")
+            params.append(int(start_timestamp))
+        if end_timestamp is not None:
+            where.append("public_date <= ?")
+            params.append(int(end_timestamp))
+        return where, params
+
+    def _select(self, table: str, where: List[str], params: List, limit: Optional[int]) -> List[str]:
+        sql = f"SELECT payload FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY public_date, id"
+        if limit:
+            sql += " LIMIT ?"
+            params = params + [int(limit)]
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def stats(self) -> Dict[str, int]:
+        """各表的行数"""
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("macro_events", "earnings_reports", "analyses")
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def get_event_store() -> Optional[EventStore]:
+    """获取进程内共享的事件库，未配置 EVENT_STORE_FILE 时返回 None"""
+    global _store
+    if not EVENT_STORE_FILE:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EventStore(EVENT_STORE_FILE)
+    return _store
+
+
+def main(argv=None):
+    """按条件查询事件库"""
+    parser = argparse.ArgumentParser(description="查询本地事件库中的宏观事件或财报")
+    subparsers = parser.add_subparsers(dest='kind', required=True)
+    events = subparsers.add_parser('events', help="宏观事件")
+    events.add_argument('--country', action='append', help="国家（代码或中文名称，可重复）")
+    events.add_argument('--importance', type=int, help="最低重要性")
+    events.add_argument('--keyword', help="标题关键词")
+    reports = subparsers.add_parser('reports', help="财报")
+    reports.add_argument('--ticker', action='append', help="股票代码，如 TSLA.US、00700.HK（可重复）")
+    reports.add_argument('--market', action='append', help="市场（US/HK/CN，可重复）")
+    for subparser in (events, reports):
+        subparser.add_argument('--all', action='store_true', help="不限制日期范围")
+        subparser.add_argument('--limit', type=int, help="最多返回的条数")
+        add_date_range_arguments(subparser)
+    args = parser.parse_args(argv)
+
+    db_path = EVENT_STORE_FILE or os.path.join("calendar_files", "events.sqlite3")
+    if not os.path.exists(db_path):
+        parser.error(f"事件库不存在: {db_path}（运行日历脚本后自动创建）")
+    store = EventStore(db_path)
+    start_timestamp, end_timestamp = (None, None) if args.all else date_range_from_args(args, parser)
+    if args.kind == 'events':
+        rows = store.query_macro_events(start_timestamp, end_timestamp, args.country, args.importance,
+                                        args.keyword, args.limit)
+        for event in rows:
+            when = datetime.fromtimestamp(event.public_date, tz=CHINA_TZ).strftime('%Y-%m-%d %H:%M')
+            print(f"{when}  {event.country or '':<6} {event.importance or '-'}  {event.title or ''}")
+    else:
+        rows = store.query_reports(start_timestamp, end_timestamp, args.ticker, args.market, args.limit)
+        for report in rows:
+            when = datetime.fromtimestamp(report.public_date, tz=CHINA_TZ).strftime('%Y-%m-%d %H:%M')
+            print(f"{when}  {report.code or '':<10} {report.company_name or ''}  {report.observation_date or ''}")
+    print(f"共 {len(rows)} 条")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
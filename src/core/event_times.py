@@ -0,0 +1,135 @@
+"""
+Batch conversion of event timestamps into Beijing-time calendar slots
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.date_range import CHINA_TZ
+from src.core.ics_writer import event_sort_key
+
+logger = logging.getLogger("event_times")
+
+# 北京时间自1992年起不再实行夏令时，此后的时间戳统一按 UTC+8 换算，更早的逐个交给 pytz
+CHINA_UTC_OFFSET = 8 * 3600
+CHINA_FIXED_TZ = timezone(timedelta(seconds=CHINA_UTC_OFFSET), 'CST')
+FIXED_OFFSET_SINCE = int(CHINA_TZ.localize(datetime(1992, 1, 1)).timestamp())
+
+# datetime 能表示的最后一天（9999-12-31）
+MAX_TIMESTAMP = 253402300799
+
+# 定时事件的默认持续时间
+DEFAULT_EVENT_DURATION = timedelta(hours=2)
+
+SECONDS_PER_DAY = 86400
+
+
+class EventTime:
+    """单个事件在日历中的时间（由 convert_timestamps 批量生成）
+
+    begin/end 可以直接传给 render_event；sort_key 与 event_sort_key 的结果相同。
+    """
+
+    __slots__ = ('timestamp', 'day', 'begin', 'end', 'all_day', 'pending', 'sort_timestamp')
+
+    def __init__(self, timestamp: int, day: str, begin, end, all_day: bool, pending: bool, sort_timestamp: int):
+        self.timestamp = timestamp
+        self.day = day
+        self.begin = begin
+        self.end = end
+        self.all_day = all_day
+        self.pending = pending
+        self.sort_timestamp = sort_timestamp
+
+    def local_datetime(self) -> datetime:
+        """发布时间对应的北京时间（pytz 时区，与逐个转换时相同）"""
+        return datetime.fromtimestamp(self.timestamp, tz=CHINA_TZ)
+
+    def sort_key(self, uid: str):
+        return self.sort_timestamp, uid or ''
+
+    def __repr__(self):
+        kind = "待定全天" if self.pending else "全天" if self.all_day else "定时"
+        return f"EventTime({self.timestamp}, {self.begin}, {kind})"
+
+
+def convert_timestamps(timestamps: Sequence) -> List[Optional[EventTime]]:
+    """将一列发布时间戳一次换算为北京时间的日历时间，返回与输入等长的列表，无效的时间戳对应 None
+
+    日期、当天秒数和事件类型在 NumPy 中整列计算：00:00 为全天事件，分钟不是 0/15/30/45 的
+    （如 12:02）为待定全天事件，其余为持续2小时的定时事件。
+    """
+    started = time.monotonic()
+    result = [None] * len(timestamps)
+    positions = [
+        i for i, value in enumerate(timestamps)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and 0 < value < MAX_TIMESTAMP
+    ]
+    invalid = sum(1 for value in timestamps if value) - len(positions)
+    if invalid:
+        logger.warning(f"{invalid} 个事件的时间戳无法解析，已跳过")
+    if not positions:
+        return result
+
+    values = np.array([timestamps[i] for i in positions], dtype=np.int64)
+    offsets = np.full(len(values), CHINA_UTC_OFFSET, dtype=np.int64)
+    legacy = np.flatnonzero(values < FIXED_OFFSET_SINCE)
+    for i in legacy:
+        offsets[i] = int(datetime.fromtimestamp(int(values[i]), tz=CHINA_TZ).utcoffset().total_seconds())
+
+    local = values + offsets
+    seconds = local % SECONDS_PER_DAY
+    midnight = seconds == 0
+    odd_time = (seconds // 60) % 15 != 0  # 非整点或常见时间点
+    all_day = midnight | odd_time
+    pending = odd_time & ~midnight
+    # 全天事件按当天 00:00 排序，与 event_sort_key 一致
+    sort_timestamps = np.where(all_day, values - seconds, values)
+
+    local_days = (local // SECONDS_PER_DAY).astype('datetime64[D]')
+    days = np.datetime_as_string(local_days).tolist()
+    dates = local_days.tolist()
+    local_times = local.astype('datetime64[s]').tolist()
+    values_list = values.tolist()
+    sort_list = sort_timestamps.tolist()
+    all_day_list = all_day.tolist()
+    pending_list = pending.tolist()
+    legacy_set = set(legacy.tolist())
+
+    for i, position in enumerate(positions):
+        if all_day_list[i]:
+            begin, end = dates[i], None
+        elif i in legacy_set:
+            begin = datetime.fromtimestamp(values_list[i], tz=CHINA_TZ)
+            end = begin + DEFAULT_EVENT_DURATION
+        else:
+            begin = local_times[i].replace(tzinfo=CHINA_FIXED_TZ)
+            end = begin + DEFAULT_EVENT_DURATION
+        # 1992年以前当天 00:00 与发布时间可能处于不同的夏令时偏移，按 event_sort_key 逐个计算
+        sort_timestamp = event_sort_key(begin, '', CHINA_TZ)[0] if i in legacy_set else sort_list[i]
+        result[position] = EventTime(
+            values_list[i], days[i], begin, end, all_day_list[i], pending_list[i], sort_timestamp
+        )
+
+    logger.info(
+        f"换算 {len(positions)} 个发布时间: 定时 {int((~all_day).sum())} 个, "
+        f"全天 {int(midnight.sum())} 个, 待定 {int(pending.sum())} 个，"
+        f"耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒"
+    )
+    return result
+
+
+def apply_event_time(cal_event: Dict, event_time: EventTime):
+    """根据换算好的事件时间设置 begin/end/all_day，待定的全天事件在标题中添加"待定"标记"""
+    cal_event['begin'] = event_time.begin
+    if event_time.all_day:
+        # 全天事件：使用日期对象，避免时区转换问题
+        cal_event['all_day'] = True
+        if event_time.pending:
+            cal_event['name'] = f"{cal_event['name']} (待定)"
+    else:
+        cal_event['end'] = event_time.end
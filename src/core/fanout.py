@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fan out the generated catalogs to the feeds declared in a config file
+
+用法:
+    python -m src.core.fanout [--config feeds.json] [--no-upload]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.common import setup_logging
+from src.core.feed_index import FeedIndex, parse_query
+from src.core.ics_writer import replace_file
+from src.core.publisher import CosPublisher
+from src.core.sync_state import SyncState
+
+logger = logging.getLogger("fanout")
+
+# 订阅配置
+FEEDS_CONFIG = os.environ.get('FEEDS_CONFIG', 'feeds.json')  # 订阅定义文件（不存在时不生成额外订阅）
+FANOUT_STATE_FILE = os.environ.get('FANOUT_STATE_FILE', os.path.join("calendar_files", "sync_state_feeds.json"))  # 记录每个订阅上次上传的内容哈希
+FANOUT_UPLOAD_WORKERS = int(os.environ.get('FANOUT_UPLOAD_WORKERS', '4'))  # 并发上传的线程数
+
+# 常驻模式下多个刷新任务完成后都会触发生成，同一时间只运行一次
+FANOUT_LOCK = threading.Lock()
+
+# 订阅可以使用的数据来源：名称 -> 包含全部事件的目录（ICS文件及其 .index.json 索引）
+FEED_SOURCES = {
+    'events': os.path.join("calendar_files", "wsc_events_all.ics"),
+    'reports': os.path.join("calendar_files", "wsc_reports.ics"),
+}
+
+# 每个来源建立了索引的筛选字段；合并多个来源时，每个来源只按自己的字段筛选
+FEED_SOURCE_FIELDS = {
+    'events': ('country', 'importance', 'date'),
+    'reports': ('market', 'date'),
+}
+
+# 其他脚本生成的内置日历文件（宏观事件、全部事件目录、财报及关注列表财报日历），订阅不能覆盖
+BUILTIN_FEED_FILE = re.compile(r'^wsc_(?:events|events_all|reports|reports_[\w-]+)\.ics$')
+
+
+class FeedDefinition:
+    """配置文件中的一个订阅：从哪些来源、按什么条件选取事件，写到哪里"""
+
+    __slots__ = ('name', 'sources', 'query', 'conditions', 'output', 'object_key')
+
+    def __init__(self, name: str, sources: List[str], query: str = '', output: Optional[str] = None,
+                 object_key: Optional[str] = None):
+        if not re.match(r'^[\w-]+$', name or '', re.ASCII):
+            raise ValueError(f"订阅名称只能包含字母、数字、下划线和连字符: {name!r}")
+        unknown = [source for source in sources if source not in FEED_SOURCES]
+        if not sources or unknown:
+            raise ValueError(f"订阅 {name} 的来源无效: {', '.join(unknown) or '(空)'}，可选: {', '.join(FEED_SOURCES)}")
+        self.name = name
+        self.sources = list(dict.fromkeys(sources))
+        self.query = query
+        self.conditions = parse_query(query)
+        supported = {field for source in self.sources for field in FEED_SOURCE_FIELDS[source]}
+        unsupported = sorted({field for field, _, _ in self.conditions if field not in supported})
+        if unsupported:
+            raise ValueError(f"订阅 {name} 的来源不支持按 {', '.join(unsupported)} 筛选")
+        self.output = output or os.path.join("calendar_files", f"wsc_{name}.ics")
+        self.object_key = object_key or f"calendar/wsc_{name}.ics"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FeedDefinition':
+        """从配置项创建，sources 可以是列表或逗号分隔的字符串"""
+        sources = data.get('sources', [])
+        if isinstance(sources, str):
+            sources = [source.strip() for source in sources.split(',') if source.strip()]
+        return cls(data.get('name'), sources, data.get('filter', ''), data.get('output'), data.get('object_key'))
+
+
+def load_feed_definitions(path: Optional[str] = None) -> List[FeedDefinition]:
+    """读取订阅定义文件，文件不存在时返回空列表，格式错误时抛出 ValueError"""
+    path = path or FEEDS_CONFIG
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    definitions = [FeedDefinition.from_dict(item) for item in config.get('feeds', [])]
+    names = [definition.name for definition in definitions]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"订阅名称重复: {', '.join(duplicates)}")
+    for definition in definitions:
+        # 名称决定默认的文件名，自定义的输出路径和对象键也不能与内置日历相同
+        files = [f"wsc_{definition.name}.ics", definition.output, definition.object_key]
+        conflicts = sorted({file for file in files if BUILTIN_FEED_FILE.match(os.path.basename(file))})
+        if conflicts:
+            raise ValueError(f"订阅 {definition.name} 与内置日历冲突: {', '.join(conflicts)}")
+    outputs = [os.path.normpath(definition.output) for definition in definitions]
+    keys = [definition.object_key for definition in definitions]
+    duplicates = sorted({value for value in outputs + keys if outputs.count(value) > 1 or keys.count(value) > 1})
+    if duplicates:
+        raise ValueError(f"订阅的输出文件或对象键重复: {', '.join(duplicates)}")
+    return definitions
+
+
+def render_feeds(definitions: List[FeedDefinition], indexes: Dict[str, FeedIndex]) -> Dict[str, bytes]:
+    """按每个订阅的条件从来源索引中选取事件，拼接预先编码好的字节块，返回 {订阅名称: 日历内容}
+
+    每个事件在生成目录时只渲染一次，这里不再重新序列化，耗时只与选中的事件数有关。
+    """
+    bodies = {}
+    for definition in definitions:
+        available = [indexes[source] for source in definition.sources if source in indexes]
+        if not available:
+            continue
+        parts = [available[0].header]
+        if len(available) == 1:
+            index = available[0]
+            parts.extend(index.chunks[position] for position in index.select(index.applicable(definition.conditions)))
+        else:
+            # 多个来源按 (DTSTART, UID) 归并，输出顺序与单个来源的目录一致
+            parts.extend(chunk for _, chunk in heapq.merge(
+                *(_iter_selected(index, definition.conditions) for index in available), key=lambda item: item[0]
+            ))
+        parts.append(available[0].footer)
+        bodies[definition.name] = b"".join(parts)
+    return bodies
+
+
+def _iter_selected(index: FeedIndex, conditions):
+    """按目录中的顺序返回满足条件的 (排序键, 字节块)"""
+    chunks = index.chunks
+    sort_keys = index.sort_keys or [(0, '')] * len(chunks)
+    for position in index.select(index.applicable(conditions)):
+        yield sort_keys[position], chunks[position]
+
+
+def publish_feeds(config_path: Optional[str] = None, upload: bool = True) -> bool:
+    """生成配置文件中的所有订阅，只写入和上传内容有变化（或上次上传失败）的订阅，返回是否全部成功"""
+    try:
+        definitions = load_feed_definitions(config_path)
+    except (OSError, ValueError) as e:
+        logger.error(f"读取订阅定义文件失败: {e}")
+        return False
+    if not definitions:
+        return True
+
+    with FANOUT_LOCK:
+        return _publish(definitions, upload)
+
+
+def _publish(definitions: List[FeedDefinition], upload: bool) -> bool:
+    started = time.monotonic()
+    # 每个来源只读取和建立一次索引，供所有订阅共用
+    indexes = {}
+    for source in {source for definition in definitions for source in definition.sources}:
+        try:
+            indexes[source] = FeedIndex.from_files(FEED_SOURCES[source])
+        except FileNotFoundError:
+            logger.warning(f"订阅来源 {source} 尚未生成: {FEED_SOURCES[source]}")
+    bodies = render_feeds(definitions, indexes)
+
+    state = SyncState.load(FANOUT_STATE_FILE)
+    hashes = {name: hashlib.sha256(body).hexdigest() for name, body in bodies.items()}
+    changed = []
+    for definition in definitions:
+        name = definition.name
+        if name not in bodies:
+            continue
+        previous = state.get(name) or {}
+        if previous.get('hash') == hashes[name] and os.path.exists(definition.output):
+            if previous.get('uploaded') or not upload:
+                continue
+        else:
+            replace_file(definition.output, bodies[name])
+        changed.append(definition)
+    logger.info(
+        f"已生成 {len(bodies)} 个订阅，{len(changed)} 个需要更新，"
+        f"耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒"
+    )
+
+    results = {}
+    if upload and changed:
+        # 所有订阅并发上传，共享同一个COS客户端
+        published = CosPublisher(workers=FANOUT_UPLOAD_WORKERS).publish(
+            [(definition.output, definition.object_key) for definition in changed]
+        )
+        for definition in changed:
+            results[definition.name] = all(
+                result.ok for result in published if result.file_path == definition.output
+            )
+        failed = [name for name, success in results.items() if not success]
+        if failed:
+            logger.error(f"以下订阅上传失败，下次运行时重试: {', '.join(failed)}")
+
+    entries = {}
+    for name, digest in hashes.items():
+        if name in results:
+            uploaded = results[name]
+        else:
+            previous = state.get(name) or {}
+            uploaded = previous.get('hash') == digest and previous.get('uploaded', False)
+        entries[name] = {'hash': digest, 'uploaded': bool(uploaded)}
+    state.replace(entries)
+    if all(entry['uploaded'] for entry in entries.values()):
+        state.mark_uploaded()
+    try:
+        state.save()
+    except OSError as e:
+        logger.warning(f"保存订阅状态失败: {e}")
+    return all(results.values())
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按订阅定义文件从已生成的日历中生成多个订阅")
+    parser.add_argument('--config', default=FEEDS_CONFIG, help=f"订阅定义文件（默认 {FEEDS_CONFIG}）")
+    parser.add_argument('--no-upload', action='store_true', help="只生成文件，不上传到COS")
+    args = parser.parse_args(argv)
+
+    setup_logging("fanout.log")
+    return 0 if publish_feeds(args.config, upload=not args.no_upload) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
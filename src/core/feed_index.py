@@ -0,0 +1,299 @@
+"""
+Attribute indexes for serving filtered calendar feeds
+
+用法:
+    python -m src.core.feed_index calendar_files/wsc_events_all.ics "country=US&importance>=2" -o us.ics
+"""
+
+import os
+import re
+import sys
+import json
+import bisect
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.date_range import CHINA_TZ
+from src.core.ics_writer import (
+    CRLF, StreamingCalendarWriter, block_sort_key, iter_event_blocks, render_event, replace_file
+)
+
+logger = logging.getLogger("feed_index")
+
+INDEX_VERSION = 1
+
+# 可筛选的字段：country/importance 只适用于宏观事件，market 只适用于财报，date 两者都有
+# 事件没有某个字段时会被该字段的条件排除；目录没有索引的字段不能用于筛选
+FILTER_FIELDS = ('country', 'importance', 'market', 'date')
+
+# 国家/市场名称统一为两位代码，查询时中文名称和代码都可以使用
+COUNTRY_CODES = {
+    '美国': 'US', '中国': 'CN', '香港': 'HK', '中国香港': 'HK', '日本': 'JP', '欧元区': 'EZ',
+    '英国': 'GB', '德国': 'DE', '法国': 'FR', '意大利': 'IT', '加拿大': 'CA', '澳大利亚': 'AU',
+    '新西兰': 'NZ', '瑞士': 'CH', '韩国': 'KR', '印度': 'IN', '新加坡': 'SG', '俄罗斯': 'RU',
+    '巴西': 'BR', '西班牙': 'ES', '中国台湾': 'TW', '台湾': 'TW',
+}
+
+_CONDITION_PATTERN = re.compile(r'^(\w+)\s*(>=|<=|!=|=|>|<)\s*(.*)$')
+
+# 筛选条件：(字段, 运算符, 值)；= 和 != 的值为元组（逗号分隔的多个值）
+Condition = Tuple[str, str, object]
+
+
+def normalize_country(value) -> str:
+    """将国家/市场名称统一为大写代码（未知名称原样返回）"""
+    value = str(value or '').strip()
+    return COUNTRY_CODES.get(value, value.upper())
+
+
+def index_path_for(ics_path: str) -> str:
+    """ICS文件对应的索引文件路径（wsc_reports.ics -> wsc_reports.index.json）"""
+    root, _ = os.path.splitext(ics_path)
+    return f"{root}.index.json"
+
+
+def parse_query(query: str) -> Tuple[Condition, ...]:
+    """解析筛选条件，如 country=US,CN&importance>=2&market=HK&start=2025-08-18
+
+    start/end 是 date>= 和 date<= 的简写；返回排序后的条件元组（可直接作为缓存键），格式错误时抛出 ValueError
+    """
+    conditions = set()
+    for part in query.split("&"):
+        part = part.strip()
+        if not part:
+            continue
+        match = _CONDITION_PATTERN.match(part)
+        if match is None:
+            raise ValueError(f"无法解析的筛选条件: {part}")
+        field, op, value = match.groups()
+        field = field.lower()
+        if field in ('start', 'end') and op == '=':
+            field, op = 'date', '>=' if field == 'start' else '<='
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"不支持的筛选字段: {field}")
+
+        values = [item.strip() for item in value.split(",") if item.strip()]
+        if not values:
+            raise ValueError(f"筛选条件缺少值: {part}")
+        if field in ('country', 'market'):
+            if op not in ('=', '!='):
+                raise ValueError(f"{field} 只支持 = 和 !=")
+            values = [normalize_country(item) for item in values]
+        elif field == 'importance':
+            try:
+                values = [int(item) for item in values]
+            except ValueError:
+                raise ValueError(f"importance 必须是整数: {value}")
+        elif not all(re.match(r'^\d{4}-\d{2}-\d{2}$', item) for item in values):
+            raise ValueError(f"date 必须是 YYYY-MM-DD 格式: {value}")
+
+        if op in ('=', '!='):
+            conditions.add((field, op, tuple(sorted(values))))
+        elif len(values) == 1:
+            conditions.add((field, op, values[0]))
+        else:
+            raise ValueError(f"{op} 只能比较单个值: {part}")
+    return tuple(sorted(conditions, key=repr))
+
+
+def _compare(op: str, left, right) -> bool:
+    if op == '>=':
+        return left >= right
+    if op == '<=':
+        return left <= right
+    if op == '>':
+        return left > right
+    return left < right
+
+
+class FeedIndex:
+    """一次构建、只读的事件索引：按 country/importance/market 建立倒排表，按 date 排序
+
+    每个事件保存为预先编码好的 VEVENT 字节块，筛选结果直接拼接字节块，不重新序列化日历。
+    fields 是目录建立了索引的字段（默认为事件属性中出现过的字段），其他字段的条件会被拒绝。
+    """
+
+    def __init__(self, header: bytes, chunks: List[bytes], attributes: List[Dict], footer: bytes = b"END:VCALENDAR",
+                 sort_keys: Optional[List[Tuple[int, str]]] = None, fields: Optional[Iterable[str]] = None):
+        self.header = header
+        self.chunks = chunks
+        self.footer = footer
+        # 每个事件的 (DTSTART时间戳, UID)，用于按时间合并多个来源
+        self.sort_keys = sort_keys
+        if fields is None:
+            fields = {field for attrs in attributes for field in attrs}
+        self.fields = frozenset(field for field in fields if field in FILTER_FIELDS)
+        self.postings: Dict[str, Dict[object, List[int]]] = {field: {} for field in FILTER_FIELDS if field != 'date'}
+        dated = []
+        for position, attrs in enumerate(attributes):
+            for field, postings in self.postings.items():
+                value = attrs.get(field)
+                if value is not None and value != '':
+                    postings.setdefault(value, []).append(position)
+            if attrs.get('date'):
+                dated.append((attrs['date'], position))
+        dated.sort()
+        self._dates = [date for date, _ in dated]
+        self._date_positions = [position for _, position in dated]
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def from_files(cls, ics_path: str, index_path: Optional[str] = None) -> 'FeedIndex':
+        """从ICS文件和索引文件构建（索引中没有的事件视为没有任何属性）"""
+        with open(ics_path, "rb") as f:
+            content = f.read()
+        attributes_by_uid = {}
+        fields = None
+        try:
+            with open(index_path or index_path_for(ics_path), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                attributes_by_uid = data.get('events', {})
+                fields = data.get('fields')
+        except (OSError, ValueError) as e:
+            logger.warning(f"无法读取索引文件，筛选条件将不起作用: {e}")
+
+        text = content.decode("utf-8")
+        start = text.find("BEGIN:VEVENT")
+        header = (text if start < 0 else text[:start]).encode("utf-8")
+        chunks = []
+        attributes = []
+        sort_keys = []
+        for uid, block in iter_event_blocks(text):
+            chunks.append(f"{block}{CRLF}".encode("utf-8"))
+            attributes.append(attributes_by_uid.get(uid, {}))
+            sort_keys.append(block_sort_key(block, CHINA_TZ))
+        return cls(header, chunks, attributes, sort_keys=sort_keys, fields=fields)
+
+    def applicable(self, conditions: Iterable[Condition]) -> Tuple[Condition, ...]:
+        """只保留目录建立了索引的字段上的条件（合并多个来源时，每个来源只按自己的字段筛选）"""
+        return tuple(condition for condition in conditions if condition[0] in self.fields)
+
+    def _match(self, condition: Condition) -> Set[int]:
+        """满足单个条件的事件位置（没有该字段的事件不满足）"""
+        field, op, value = condition
+        matched = set()
+        if field == 'date':
+            if op in ('=', '!='):
+                hits = set()
+                for day in value:
+                    left = bisect.bisect_left(self._dates, day)
+                    right = bisect.bisect_right(self._dates, day)
+                    hits.update(self._date_positions[left:right])
+                if op == '!=':
+                    hits = set(self._date_positions) - hits
+            else:
+                if op in ('>=', '>'):
+                    bound = (bisect.bisect_left if op == '>=' else bisect.bisect_right)(self._dates, value)
+                    hits = self._date_positions[bound:]
+                else:
+                    bound = (bisect.bisect_right if op == '<=' else bisect.bisect_left)(self._dates, value)
+                    hits = self._date_positions[:bound]
+            return matched.union(hits)
+
+        postings = self.postings[field]
+        if op == '=':
+            keys = [key for key in value if key in postings]
+        elif op == '!=':
+            keys = [key for key in postings if key not in value]
+        else:
+            keys = [key for key in postings if _compare(op, key, value)]
+        for key in keys:
+            matched.update(postings[key])
+        return matched
+
+    def select(self, conditions: Iterable[Condition]) -> List[int]:
+        """返回满足全部条件的事件位置（保持原日历中的顺序），目录没有索引的字段抛出 ValueError"""
+        conditions = tuple(conditions)
+        unsupported = sorted({field for field, _, _ in conditions if field not in self.fields})
+        if unsupported:
+            raise ValueError(f"该日历不支持按 {', '.join(unsupported)} 筛选")
+        selected = None
+        for condition in conditions:
+            matched = self._match(condition)
+            selected = matched if selected is None else selected & matched
+            if not selected:
+                return []
+        return list(range(len(self.chunks))) if selected is None else sorted(selected)
+
+    def render(self, conditions: Iterable[Condition]) -> Tuple[bytes, int]:
+        """拼接满足条件的事件，返回 (日历内容, 事件数)"""
+        positions = self.select(conditions)
+        chunks = self.chunks
+        body = b"".join([self.header, *(chunks[i] for i in positions), self.footer])
+        return body, len(positions)
+
+
+class CatalogWriter(StreamingCalendarWriter):
+    """在写入ICS文件的同时记录每个事件的筛选属性，提交时先写索引文件再替换ICS文件"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self.index_path = index_path_for(path)
+        self.attributes: Dict[str, Dict] = {}
+        # 写入过的属性字段（包括值为空的），即该目录支持筛选的字段
+        self.fields: Set[str] = set()
+
+    def write_block(self, block: str, uid: Optional[str] = None, attributes: Optional[Dict] = None):
+        super().write_block(block)
+        if uid and attributes:
+            self.fields.update(attributes)
+            self.attributes[uid] = {key: value for key, value in attributes.items() if value not in (None, '')}
+
+    def commit(self):
+        replace_file(self.index_path, json.dumps(
+            {'version': INDEX_VERSION, 'fields': sorted(self.fields), 'events': self.attributes},
+            ensure_ascii=False, separators=(",", ":")
+        ))
+        super().commit()
+
+
+def write_catalog(path: str, events: Iterable[Tuple[Dict, Dict]], fold: bool = False) -> int:
+    """将 (事件字典, 筛选属性) 流式写入ICS文件和索引文件，返回写入的事件数（没有事件时不替换文件）"""
+    writer = CatalogWriter(path, fold=fold).open()
+    try:
+        for event, attributes in events:
+            writer.write_block(render_event(**event, fold=fold), event['uid'], attributes)
+    except BaseException:
+        writer.abort()
+        raise
+
+    if writer.event_count == 0:
+        writer.abort()
+        return 0
+    writer.commit()
+    logger.info(f"已写入筛选目录 {path}，共 {writer.event_count} 个事件")
+    return writer.event_count
+
+
+def main(argv=None):
+    """按筛选条件从ICS文件和索引生成新的ICS文件"""
+    parser = argparse.ArgumentParser(description="按条件筛选日历事件")
+    parser.add_argument('catalog', help="包含全部事件的ICS文件（同目录下需有 .index.json 索引）")
+    parser.add_argument('query', help="筛选条件，如 \"country=US&importance>=2&market=HK\"")
+    parser.add_argument('-o', '--output', help="输出文件（默认输出到标准输出）")
+    args = parser.parse_args(argv)
+
+    try:
+        conditions = parse_query(args.query)
+        body, count = FeedIndex.from_files(args.catalog).render(conditions)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(body)
+        print(f"已写入 {args.output}，共 {count} 个事件")
+    else:
+        sys.stdout.buffer.write(body)
+
+
+if __name__ == "__main__":
+    main()
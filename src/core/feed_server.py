@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedded HTTP/webcal server for the generated calendars
+
+用法:
+    python -m src.core.feed_server [--host 0.0.0.0] [--port 8080]
+
+订阅地址可以带筛选条件，如 /wsc_events.ics?country=US&importance>=2
+"""
+
+import os
+import sys
+import gzip
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote
+from typing import Dict, Optional, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.caldav import CALDAV_ROOT, CalDAVService, CalendarCollection
+from src.core.common import setup_logging
+from src.core.feed_index import FeedIndex, index_path_for, parse_query
+from src.core.watchlist import list_watchlists
+from src.core.fanout import load_feed_definitions
+
+logger = logging.getLogger("feed_server")
+
+# 订阅服务配置
+FEED_SERVER_HOST = os.environ.get('FEED_SERVER_HOST', '0.0.0.0')  # 监听地址
+FEED_SERVER_PORT = int(os.environ.get('FEED_SERVER_PORT', '8080'))  # 监听端口
+FEED_CACHE_CONTROL = os.environ.get('FEED_CACHE_CONTROL', 'public, max-age=300')  # Cache-Control 响应头
+FEED_RELOAD_INTERVAL = float(os.environ.get('FEED_RELOAD_INTERVAL', '2'))  # 检查日历文件是否更新的间隔（秒）
+FEED_VARIANT_CACHE_SIZE = int(os.environ.get('FEED_VARIANT_CACHE_SIZE', '64'))  # 缓存的筛选订阅数量
+CALDAV_MAX_REQUEST_BYTES = int(os.environ.get('CALDAV_MAX_REQUEST_BYTES', str(64 * 1024)))  # CalDAV 请求体的最大字节数
+
+# 默认提供的日历：URL路径 -> 文件
+DEFAULT_FEEDS = {
+    '/wsc_events.ics': os.path.join("calendar_files", "wsc_events.ics"),
+    '/wsc_reports.ics': os.path.join("calendar_files", "wsc_reports.ics"),
+}
+
+# 带筛选条件的请求从这些目录（包含全部事件的ICS文件及其索引）中选取事件：URL路径 -> 文件
+DEFAULT_CATALOGS = {
+    '/wsc_events.ics': os.path.join("calendar_files", "wsc_events_all.ics"),
+    '/wsc_reports.ics': os.path.join("calendar_files", "wsc_reports.ics"),
+}
+
+# CalDAV 集合的显示名称：URL路径 -> 名称
+FEED_DISPLAY_NAMES = {
+    '/wsc_events.ics': "华尔街见闻-财经日历",
+    '/wsc_reports.ics': "华尔街见闻-财报日历",
+}
+
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+
+
+def default_feeds() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """默认日历和筛选目录，加上每个关注列表的财报日历（关注列表日历本身也是筛选目录）和订阅定义文件中的订阅"""
+    feeds = dict(DEFAULT_FEEDS)
+    catalogs = dict(DEFAULT_CATALOGS)
+    for watchlist in list_watchlists():
+        route = f"/wsc_reports_{watchlist}.ics"
+        feeds[route] = catalogs[route] = os.path.join("calendar_files", f"wsc_reports_{watchlist}.ics")
+    try:
+        for definition in load_feed_definitions():
+            feeds.setdefault(f"/{os.path.basename(definition.output)}", definition.output)
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取订阅定义文件失败，只提供默认订阅: {e}")
+    return feeds, catalogs
+
+
+class CalendarFeed:
+    """一个日历文件在内存中的快照（原始内容和预压缩的gzip内容）"""
+
+    __slots__ = ("body", "gzip_body", "etag", "gzip_etag", "last_modified", "mtime", "signature")
+
+    def __init__(self, body: bytes, mtime: float, signature=None):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # 强ETag：不同编码的表示使用不同的ETag
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.signature = signature
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CalendarFeed':
+        """读取日历文件"""
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        return cls(body, stat.st_mtime, (stat.st_mtime_ns, stat.st_size))
+
+
+class FeedStore:
+    """按URL路径保存日历快照，文件更新后原子替换为新快照"""
+
+    def __init__(self, feeds: Optional[Dict[str, str]] = None, catalogs: Optional[Dict[str, str]] = None):
+        default_routes, default_catalogs = default_feeds()
+        self.feeds = dict(feeds or default_routes)
+        self.catalogs = dict(default_catalogs if catalogs is None else catalogs)
+        self._snapshots: Dict[str, CalendarFeed] = {}
+        # 每个目录只在文件变化时构建一次索引；筛选结果按规范化后的条件缓存
+        self._indexes: Dict[str, Tuple[tuple, float, FeedIndex]] = {}
+        self._variants: "OrderedDict[tuple, CalendarFeed]" = OrderedDict()
+        # 每个日历同时作为 CalDAV 集合提供，集合名为去掉 .ics 的文件名
+        self.collections: Dict[str, CalendarCollection] = {
+            route: CalendarCollection(
+                route.strip("/").rsplit(".", 1)[0],
+                FEED_DISPLAY_NAMES.get(route, route.strip("/")),
+            )
+            for route in self.feeds
+        }
+        self.caldav = CalDAVService(self.collections)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def get(self, route: str) -> Optional[CalendarFeed]:
+        """返回当前快照（读取不加锁，替换是原子的）"""
+        return self._snapshots.get(route)
+
+    def reload(self):
+        """重新加载有变化的日历文件"""
+        with self._lock:
+            for route, path in self.feeds.items():
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                current = self._snapshots.get(route)
+                if current is not None and current.signature == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    snapshot = CalendarFeed.from_file(path)
+                except OSError as e:
+                    logger.warning(f"读取日历文件失败 {path}: {e}")
+                    continue
+                if current is None or current.etag != snapshot.etag:
+                    logger.info(f"已加载 {route}: {len(snapshot.body)} 字节, gzip {len(snapshot.gzip_body)} 字节")
+                    self.collections[route].update(snapshot.body.decode("utf-8"))
+                self._snapshots[route] = snapshot
+
+            for route, path in self.catalogs.items():
+                self._reload_index(route, path)
+
+    def _reload_index(self, route: str, path: str):
+        """目录或索引文件变化时重新构建索引，并丢弃该路径已缓存的筛选结果"""
+        try:
+            stats = [os.stat(path), os.stat(index_path_for(path))]
+        except FileNotFoundError:
+            return
+        signature = tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
+        current = self._indexes.get(route)
+        if current is not None and current[0] == signature:
+            return
+        try:
+            index = FeedIndex.from_files(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"读取筛选目录失败 {path}: {e}")
+            return
+        self._indexes[route] = (signature, max(stat.st_mtime for stat in stats), index)
+        for key in [key for key in self._variants if key[0] == route]:
+            del self._variants[key]
+        logger.info(f"已构建 {route} 的筛选索引: {len(index)} 个事件")
+
+    def get_filtered(self, route: str, query: str) -> Optional[CalendarFeed]:
+        """返回按条件筛选的日历（条件无效时抛出 ValueError，没有对应目录时返回 None）"""
+        conditions = parse_query(query)
+        if not conditions:
+            return self.get(route)
+        key = (route, conditions)
+        with self._lock:
+            # 索引与筛选缓存在同一把锁下读取，避免把旧索引的结果缓存到重新加载之后
+            current = self._indexes.get(route)
+            if current is None:
+                return None
+            feed = self._variants.get(key)
+            if feed is not None:
+                self._variants.move_to_end(key)
+                return feed
+            _, mtime, index = current
+            body, count = index.render(conditions)
+            feed = CalendarFeed(body, mtime)
+            self._variants[key] = feed
+            while len(self._variants) > FEED_VARIANT_CACHE_SIZE:
+                self._variants.popitem(last=False)
+        logger.info(f"已生成筛选订阅 {route}?{query}: {count} 个事件")
+        return feed
+
+    def watch(self, interval: float = None):
+        """在后台线程中定期检查文件更新"""
+        interval = interval or FEED_RELOAD_INTERVAL
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        thread = threading.Thread(target=loop, name="feed-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def _etag_matches(header: str, etags) -> bool:
+    """If-None-Match 使用弱比较（忽略 W/ 前缀）"""
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def _accepts_gzip(header: str) -> bool:
+    """客户端是否接受 gzip 编码（q=0 表示拒绝）"""
+    for part in header.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if coding.lower() not in ("gzip", "*"):
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    """处理日历订阅请求"""
+
+    server_version = "ios-calendar-feed"
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文分两次写出，关闭 Nagle 算法避免与延迟确认叠加产生约40ms的等待
+    disable_nagle_algorithm = True
+    store: FeedStore = None
+
+    def do_GET(self):
+        if self.path.startswith(CALDAV_ROOT):
+            self._serve_caldav(send_body=True)
+        else:
+            self._serve(send_body=True)
+
+    def do_HEAD(self):
+        if self.path.startswith(CALDAV_ROOT):
+            self._serve_caldav(send_body=False)
+        else:
+            self._serve(send_body=False)
+
+    def do_OPTIONS(self):
+        self._serve_caldav()
+
+    def do_PROPFIND(self):
+        self._serve_caldav()
+
+    def do_REPORT(self):
+        self._serve_caldav()
+
+    def _serve_caldav(self, send_body: bool = True):
+        """CalDAV 请求交给 CalDAVService 处理"""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > CALDAV_MAX_REQUEST_BYTES:
+            # 请求体过大或长度无效时不读取，直接关闭连接
+            status = HTTPStatus.BAD_REQUEST if length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            return
+        request_body = self.rfile.read(length) if length else b""
+        status, headers, body = self.store.caldav.handle(
+            self.command, self.path, self.headers.get("Depth", "0"), request_body,
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def _serve(self, send_body: bool):
+        route, _, query = self.path.partition("?")
+        try:
+            feed = self.store.get_filtered(route, unquote(query)) if query else self.store.get(route)
+        except ValueError as e:
+            body = str(e).encode("utf-8")
+            self.send_response(HTTPStatus.BAD_REQUEST)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        if feed is None:
+            self.send_response(HTTPStatus.NOT_FOUND)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        use_gzip = _accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        etag = feed.gzip_etag if use_gzip else feed.etag
+
+        if self._not_modified(feed):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_cache_headers(feed, etag)
+            self.end_headers()
+            return
+
+        body = feed.gzip_body if use_gzip else feed.body
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self._send_cache_headers(feed, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _not_modified(self, feed: CalendarFeed) -> bool:
+        """条件请求：优先使用 If-None-Match，没有时才使用 If-Modified-Since"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, (feed.etag, feed.gzip_etag))
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return feed.mtime <= int(parsedate_to_datetime(if_modified_since).timestamp())
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_cache_headers(self, feed: CalendarFeed, etag: str):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", feed.last_modified)
+        self.send_header("Cache-Control", FEED_CACHE_CONTROL)
+        self.send_header("Vary", "Accept-Encoding")
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(store: FeedStore, host: str = None, port: int = None) -> ThreadingHTTPServer:
+    """创建订阅服务（尚未开始监听循环）"""
+    handler = type("BoundFeedRequestHandler", (FeedRequestHandler,), {"store": store})
+    server = ThreadingHTTPServer((host or FEED_SERVER_HOST, port if port is not None else FEED_SERVER_PORT), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(store: FeedStore, host: str = None, port: int = None) -> ThreadingHTTPServer:
+    """在后台线程中启动订阅服务，并开始监视日历文件"""
+    store.reload()
+    store.watch()
+    server = create_server(store, host, port)
+    thread = threading.Thread(target=server.serve_forever, name="feed-server", daemon=True)
+    thread.start()
+    address, port = server.server_address[:2]
+    logger.info(f"日历订阅服务已启动: http://{address}:{port}，日历: {', '.join(store.feeds)}")
+    return server
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="提供日历订阅的HTTP服务")
+    parser.add_argument('--host', default=FEED_SERVER_HOST, help=f"监听地址（默认 {FEED_SERVER_HOST}）")
+    parser.add_argument('--port', type=int, default=FEED_SERVER_PORT, help=f"监听端口（默认 {FEED_SERVER_PORT}）")
+    args = parser.parse_args(argv)
+
+    setup_logging("feed_server.log")
+    store = FeedStore()
+    store.reload()
+    store.watch()
+    server = create_server(store, args.host, args.port)
+    logger.info(f"日历订阅服务已启动: http://{args.host}:{args.port}，日历: {', '.join(store.feeds)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("日历订阅服务已停止")
+    finally:
+        store.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,82 +3,75 @@
 
 import requests
 import json
+import argparse
 from datetime import datetime, timedelta
-from ics import Calendar, Event
 import os
 import logging
 import re
-from qcloud_cos import CosConfig
-from qcloud_cos import CosS3Client
-import sys
-import pytz
-
 import sys
+import threading
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
-# 导入事件分析器（在设置路径后）
-from src.analysis.event_analyzer import EventAnalyzer
+# 导入事件分析器和共享HTTP客户端（在设置路径后）
+from src.analysis.event_analyzer import EventAnalyzer, is_successful_analysis
+from src.analysis.cache_store import SQLiteCache
+from src.analysis.search_cache import SearchCache
+from src.analysis.surprise import SURPRISE_PREFIX, load_surprise_profiles
+from src.core.http_client import http_get
+from src.core.ics_writer import StreamingCalendarWriter, render_event
+from src.core.event_times import apply_event_time, convert_timestamps
+from src.core.event_store import get_event_store
+from src.core.feed_index import CatalogWriter, normalize_country
+from src.core.records import decode_macro_events
+from src.core.sync_state import SyncState, payload_hash
+from src.core.date_range import (
+    add_date_range_arguments, date_range_from_args, format_timestamp, split_windows
+)
+from src.core.common import (
+    CHINA_TZ, get_current_week_timestamps, is_github_actions, setup_logging, upload_to_cos
+)
 
 
 # 配置日志
-# 检查是否在GitHub Actions环境中运行
-is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
-
-# 确保日志目录存在
-log_dir = os.path.join(project_root, "logs")
-os.makedirs(log_dir, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "calendar_sync.log")) if not is_github_actions else logging.StreamHandler(),
-        logging.StreamHandler()
-    ]
-)
+setup_logging("calendar_sync.log")
 logger = logging.getLogger("calendar_sync")
 
 # 日历数据来源URL
 CALENDAR_URL = "https://api-one-wscn.awtmt.com/apiv1/finance/macrodatas"
 
+# 长时间范围按该天数切分为多个请求
+MACRO_MAX_WINDOW_DAYS = int(os.environ.get('MACRO_MAX_WINDOW_DAYS', '7'))
+
 # ICS文件保存路径
 OUTPUT_DIR = "calendar_files"
 ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_events.ics")
+# 包含所有国家和重要性的事件（及其索引），供按条件筛选的订阅使用
+FULL_ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_events_all.ics")
 
-# 腾讯云COS配置
-COS_SECRET_ID = os.environ.get('COS_SECRET_ID', '')  # 从环境变量获取，也可以直接设置
-COS_SECRET_KEY = os.environ.get('COS_SECRET_KEY', '')  # 从环境变量获取，也可以直接设置
-COS_REGION = os.environ.get('COS_REGION', 'ap-beijing')  # COS存储桶所在地域
-COS_BUCKET = os.environ.get('COS_BUCKET', '')  # 存储桶名称
-COS_OBJECT_KEY = os.environ.get('COS_OBJECT_KEY', 'calendar/wsc_events.ics')  # 对象键（文件在COS中的路径）
+# AI分析缓存配置（事件未变化时跳过研报搜索和AI分析）
+ANALYSIS_CACHE_FILE = os.environ.get('ANALYSIS_CACHE_FILE', os.path.join(OUTPUT_DIR, "analysis_cache.sqlite3"))
+ANALYSIS_CACHE_TTL_DAYS = float(os.environ.get('ANALYSIS_CACHE_TTL_DAYS', '7'))  # 缓存有效期（天）
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', '2000'))  # 最大缓存条目数
+SEARCH_CACHE_TTL_HOURS = float(os.environ.get('SEARCH_CACHE_TTL_HOURS', '24'))  # 研报搜索结果缓存有效期（小时）
 
-# 定义中国时区
-CHINA_TZ = pytz.timezone('Asia/Shanghai')
+# 增量同步状态文件（记录每个事件上次同步时的内容哈希和分析结果）
+SYNC_STATE_FILE = os.environ.get('EVENT_SYNC_STATE_FILE', os.path.join(OUTPUT_DIR, "sync_state_events.json"))
 
-def get_current_week_timestamps():
-    """获取本周周一至周日的时间戳"""
-    today = datetime.now(CHINA_TZ)
-    # 获取本周周一（0=周一，6=周日）
-    days_since_monday = today.weekday()
-    monday = today - timedelta(days=days_since_monday)
-    # 设置为周一的00:00:00
-    monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # 获取本周周日的23:59:59
-    sunday = monday + timedelta(days=6, hours=23, minutes=59, seconds=59)
-    
-    # 转换为时间戳
-    start_timestamp = int(monday.timestamp())
-    end_timestamp = int(sunday.timestamp())
-    
-    logger.info(f"本周时间范围: {monday.strftime('%Y-%m-%d %H:%M:%S')} 至 {sunday.strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"时间戳范围: {start_timestamp} 至 {end_timestamp}")
-    
-    return start_timestamp, end_timestamp
+# 在尚未公布的事件描述中附加该指标的历史偏差概况（需要事件库中有历史数据）
+SURPRISE_PROFILES = os.environ.get('SURPRISE_PROFILES', 'true').lower() != 'false'
+
+# 描述中公布值行的前缀（公布后由 actuals_updater 写入或随全量生成写入）
+ACTUAL_PREFIX = "✅ 公布值"
+
+# 写入ICS文件、同步状态和上传时持有，避免全量生成与公布值更新同时写文件
+PUBLISH_LOCK = threading.Lock()
+
+# 腾讯云COS对象键（密钥、地域和存储桶见 src/core/common.py）
+COS_OBJECT_KEY = os.environ.get('COS_OBJECT_KEY', 'calendar/wsc_events.ics')  # 对象键（文件在COS中的路径）
 
 def get_next_week_dates():
     """获取未来一周的起始和结束日期（保留原函数以兼容其他代码）"""
@@ -87,22 +80,19 @@ def get_next_week_dates():
     end_date = today + timedelta(days=7)
     return start_date, end_date
 
-def fetch_calendar_data():
-    """从API获取日历数据"""
+def fetch_calendar_window(window):
+    """获取单个时间窗口内的宏观事件，失败时返回 None"""
     try:
-        # 获取本周的时间戳范围
-        start_timestamp, end_timestamp = get_current_week_timestamps()
-        
         # 构建请求参数
         params = {
-            'start': start_timestamp,
-            'end': end_timestamp
+            'start': window['start'],
+            'end': window['end']
         }
         
         logger.info(f"请求API: {CALENDAR_URL}")
         logger.info(f"请求参数: {params}")
         
-        response = requests.get(CALENDAR_URL, params=params)
+        response = http_get(CALENDAR_URL, params=params)
         response.raise_for_status()
         
         data = response.json()
@@ -112,18 +102,43 @@ def fetch_calendar_data():
         # 检查API响应格式
         if isinstance(data, dict) and 'code' in data:
             if data['code'] == 20000 and 'data' in data and 'items' in data['data']:
-                items = data['data']['items']
-                logger.info(f"成功获取 {len(items)} 个事件")
+                # 解码为紧凑的 MacroEvent 记录，原始字典随响应一起释放
+                items = decode_macro_events(data['data']['items'])
+                logger.info(f"{window['date']} 成功获取 {len(items)} 个事件")
                 return items
             else:
                 logger.error(f"API返回错误: {data.get('message', '未知错误')}")
                 return None
         else:
-            # 如果是旧格式，直接返回
-            return data
+            # 如果是旧格式（事件列表），直接解码
+            return decode_macro_events(data) if isinstance(data, list) else None
     except requests.exceptions.RequestException as e:
-        logger.error(f"获取日历数据失败: {e}")
+        logger.error(f"获取 {window['date']} 日历数据失败: {e}")
+        return None
+
+def fetch_calendar_data(start_timestamp=None, end_timestamp=None):
+    """从API获取日历数据（默认本周，长时间范围按周切分请求）"""
+    if start_timestamp is None or end_timestamp is None:
+        # 获取本周的时间戳范围
+        start_timestamp, end_timestamp = get_current_week_timestamps()
+    else:
+        logger.info(f"时间范围: {format_timestamp(start_timestamp)} 至 {format_timestamp(end_timestamp)}")
+    
+    all_items = []
+    failed_windows = []
+    for window in split_windows(start_timestamp, end_timestamp, MACRO_MAX_WINDOW_DAYS):
+        items = fetch_calendar_window(window)
+        if items is None:
+            failed_windows.append(window['date'])
+            continue
+        all_items.extend(items)
+    
+    if failed_windows:
+        logger.warning(f"以下时间段的日历数据获取失败，已跳过: {', '.join(failed_windows)}")
+    
+    if not all_items and failed_windows:
         return None
+    return all_items
 
 def parse_datetime(dt_string):
     """解析API返回的日期时间字符串（已经是北京时间）"""
@@ -165,9 +180,132 @@ def parse_summary(summary):
     
     return None, summary
 
-def pycreate_ics_file(calendar_data):
-    """将日历数据转换为ICS格式"""
+def build_event_description(event_data, analysis_text):
+    """构建包含基本信息和AI分析结果的事件描述（event_data 为 MacroEvent）"""
+    description_parts = []
+    
+    # 添加基本事件信息
+    if event_data.event:
+        description_parts.append(f"📊 事件详情: {event_data.event}")
+    
+    if event_data.quantity and event_data.unit:
+        description_parts.append(f"📈 数据: {event_data.quantity} {event_data.unit}")
+    
+    # 添加foresight信息
+    if event_data.foresight:
+        description_parts.append(f"🔮 {event_data.foresight}")
+    
+    # 添加分析结果
+    if analysis_text:
+        description_parts.append("\n" + analysis_text)
+    
+    return "\n".join(description_parts)
+
+def build_basic_description(event_data, country_emoji):
+    """构建不含AI分析的基本事件描述（分析失败时使用）"""
+    basic_info = [country_emoji]
+    if event_data.event:
+        basic_info.append(f"📊 {event_data.event}")
+    if event_data.quantity and event_data.unit:
+        basic_info.append(f"📈 {event_data.quantity} {event_data.unit}")
+    if event_data.foresight:
+        basic_info.append(f"🔮 {event_data.foresight}")
+    return "\n".join(basic_info)
+
+def format_actual_line(event_data):
+    """构建公布值行（尚未公布时返回 None）"""
+    if not event_data.actual:
+        return None
+    unit = event_data.unit or ''
+    parts = [f"{ACTUAL_PREFIX}: {event_data.actual}{unit}"]
+    if event_data.forecast:
+        parts.append(f"预期 {event_data.forecast}{unit}")
+    if event_data.previous:
+        parts.append(f"前值 {event_data.previous}{unit}")
+    return "  ".join(parts)
+
+def add_actual_line(description, event_data):
+    """在描述第一行写入公布值；已有公布值行时替换（公布值被修正），公布前的历史偏差概况行一并去掉"""
+    line = format_actual_line(event_data)
+    if not line:
+        return description
+    if description and description.startswith(ACTUAL_PREFIX):
+        description = description.partition("\n")[2]
+    if description and description.startswith(SURPRISE_PREFIX):
+        description = description.partition("\n")[2]
+    return f"{line}\n{description}" if description else line
+
+def add_surprise_line(description, event_data, profiles):
+    """在尚未公布的事件描述开头加入该指标的历史偏差概况（公布后由公布值行代替）"""
+    if profiles is None or event_data.actual:
+        return description
+    line = profiles.describe(normalize_country(event_data.country), event_data.title or '', event_data.unit or '')
+    if not line:
+        return description
+    return f"{line}\n{description}" if description else line
+
+def is_tracked_event(event_data):
+    """是否为需要写入日历的事件（美国或中国的重要性为3的事件）"""
+    return (event_data.country or '') in ['美国', '中国'] and (event_data.importance or 0) == 3
+
+def watch_timestamps(calendar_data):
+    """返回日历中事件的发布时间戳，供常驻调度器判断是否临近事件"""
+    return [
+        event_data.public_date for event_data in calendar_data
+        if event_data.public_date and is_tracked_event(event_data)
+    ]
+
+def create_event_analyzer():
+    """初始化分析缓存、研报搜索缓存和事件分析器"""
+    analysis_cache = None
+    try:
+        analysis_cache = SQLiteCache(
+            ANALYSIS_CACHE_FILE,
+            table="event_analysis",
+            ttl=ANALYSIS_CACHE_TTL_DAYS * 24 * 3600,
+            max_entries=ANALYSIS_CACHE_MAX_ENTRIES
+        )
+    except Exception as e:
+        logger.warning(f"无法打开分析缓存，将不使用缓存: {e}")
+    
+    # 研报搜索缓存：进程内合并相同查询，持久化部分与分析缓存共用数据库文件
+    search_store = None
+    try:
+        search_store = SQLiteCache(
+            ANALYSIS_CACHE_FILE,
+            table="report_search",
+            ttl=SEARCH_CACHE_TTL_HOURS * 3600,
+            max_entries=ANALYSIS_CACHE_MAX_ENTRIES
+        )
+    except Exception as e:
+        logger.warning(f"无法打开研报搜索缓存，仅使用进程内缓存: {e}")
+    search_cache = SearchCache(store=search_store)
+    
+    return EventAnalyzer(cache=analysis_cache, search_cache=search_cache)
+
+def close_event_analyzer(analyzer):
+    """输出本次运行的缓存命中统计并关闭缓存"""
+    if analyzer.cache is not None:
+        stats = analyzer.cache.stats()
+        logger.info(f"分析缓存统计: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, 当前缓存 {stats['size']} 条")
+        analyzer.cache.close()
+    
+    search_cache = analyzer.search_cache
+    search_stats = search_cache.stats()
+    logger.info(
+        f"研报搜索缓存统计: 进程内命中 {search_stats['memory_hits']} 次, 合并并发查询 {search_stats['coalesced']} 次, "
+        f"持久化命中 {search_stats['store_hits']} 次, 实际请求 {search_stats['misses']} 次"
+    )
+    if search_cache.store is not None:
+        search_cache.store.close()
+
+def pycreate_ics_file(calendar_data, sync_state=None):
+    """将日历数据转换为ICS格式
+    
+    传入 sync_state 时只分析新增或变化的事件；事件没有任何变化时不写文件并返回 None
+    """
     global ICS_FILE
+    global FULL_ICS_FILE
     global OUTPUT_DIR
     
     if not calendar_data:
@@ -183,50 +321,31 @@ def pycreate_ics_file(calendar_data):
         if is_github_actions:
             OUTPUT_DIR = "./calendar_files"
             ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_events.ics")
+            FULL_ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_events_all.ics")
             os.makedirs(OUTPUT_DIR, exist_ok=True)
             logger.info(f"在GitHub Actions环境中使用替代路径: {OUTPUT_DIR}")
     
-    # 创建新的日历
-    cal = Calendar()
-    
-    # 初始化事件分析器
-    analyzer = EventAnalyzer()
+    # 整列换算发布时间（新API使用 public_date 字段，时间戳格式），并分类为定时/全天/待定事件
+    event_times = convert_timestamps([event_data.public_date for event_data in calendar_data])
     
     # 添加事件
-    event_count = 0
-    for event_data in calendar_data:
-        # 新API使用 public_date 字段（时间戳格式）
-        public_date = event_data.get('public_date')
-        if not public_date:
+    all_events = []
+    for event_data, event_time in zip(calendar_data, event_times):
+        if event_time is None:
             continue
-            
-        # 过滤条件：只保留美国和中国的重要性最高事件
-        country = event_data.get('country', '')
-        importance = event_data.get('importance', 0)
         
-        # 只处理美国或中国的重要性为3的事件
-        if country not in ['美国', '中国'] or importance != 3:
-            continue
-            
-        # 将时间戳转换为datetime对象
-        try:
-            event_datetime = datetime.fromtimestamp(public_date, tz=CHINA_TZ)
-            logger.info(f"原始时间戳: {public_date}, 转换后时间: {event_datetime.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        except (ValueError, TypeError) as e:
-            logger.warning(f"无法解析时间戳 {public_date}: {e}")
-            continue
-            
-        # 处理所有事件，不再进行日期过滤
-        cal_event = Event()
+        # 默认日历只保留美国和中国的重要性最高事件，其余事件只写入筛选目录
+        tracked = is_tracked_event(event_data)
         
+        # 处理所有事件，不再进行日期过滤
         # 获取事件UID (使用id字段)
-        cal_event.uid = f"{event_data.get('id', '')}_wscn_macro"
+        cal_event = {'uid': f"{(event_data.id or '')}_wscn_macro"}
         
         # 获取事件标题
-        title = event_data.get('title', '未知事件')
+        title = event_data.title or '未知事件'
         
         # 设置事件名称，包含国家信息
-        country = event_data.get('country', '')
+        country = event_data.country or ''
         
         # 根据国家使用对应的 emoji
         country_emoji = ""
@@ -238,94 +357,151 @@ def pycreate_ics_file(calendar_data):
             country_emoji = "🌍"  # 其他国家使用地球图标
         
         if country:
-            cal_event.name = f"{country_emoji} {title}"
+            cal_event['name'] = f"{country_emoji} {title}"
         else:
-            cal_event.name = title
+            cal_event['name'] = title
         
-        # 判断是否为全天事件
-        # 1. 如果时间是00:00:00，则视为全天事件
-        # 2. 如果时间不是整点或常见时间点（如12:02这样的奇怪时间），也视为待定的全天事件
-        is_midnight = event_datetime.hour == 0 and event_datetime.minute == 0 and event_datetime.second == 0
-        is_odd_time = event_datetime.minute not in [0, 15, 30, 45]  # 非整点或常见时间点
-        is_all_day = is_midnight or is_odd_time
+        # 设置事件时间（00:00或非常见时间点视为全天事件）
+        apply_event_time(cal_event, event_time)
         
-        # 设置事件时间
-        if is_all_day:
-            # 全天事件：使用日期对象，避免时区转换问题
-            event_date = event_datetime.date()
-            cal_event.begin = event_date
-            cal_event.end = event_date
-            cal_event.make_all_day()  # 标记为全天事件
-            
-            # 如果是因为时间奇怪而设为全天事件，在标题中添加"待定"标记
-            if is_odd_time and not is_midnight:
-                cal_event.name = f"{cal_event.name} (待定)"
-                logger.info(f"创建待定全天事件: {cal_event.name}, 日期: {event_date}, 原时间: {event_datetime.strftime('%H:%M:%S')}")
-            else:
-                logger.info(f"创建全天事件: {cal_event.name}, 日期: {event_date}")
+        # 先收集事件，稍后统一并发分析（只分析默认日历中的事件）
+        all_events.append((cal_event, event_data, event_time, country_emoji, tracked))
+    # 按开始时间和UID排序，相同数据每次生成的文件内容完全相同
+    all_events.sort(key=lambda pending: pending[2].sort_key(pending[0]['uid']))
+    pending_events = [pending[:4] for pending in all_events if pending[4]]
+    
+    # 增量同步：与上次同步状态比较，事件没有任何变化时跳过分析、写入和上传
+    hashes = {
+        cal_event['uid']: payload_hash(event_data.to_dict())
+        for cal_event, event_data, _, _, _ in all_events
+    }
+    delta = sync_state.diff(hashes) if sync_state is not None else None
+    if delta is not None:
+        logger.info(f"增量同步: {delta}")
+        # 上次分析失败的事件（同步状态中没有描述）即使没有变化也需要重新分析
+        failed = [
+            pending[0]['uid'] for pending in pending_events
+            if not (sync_state.get(pending[0]['uid']) or {}).get('description')
+        ]
+        if not delta.has_changes and not failed and os.path.exists(ICS_FILE) and os.path.exists(FULL_ICS_FILE):
+            logger.info("事件没有变化，跳过AI分析和ICS文件写入")
+            return None
+    
+    # 只分析新增或变化的事件，以及上次分析失败的事件；其余事件复用上次的描述
+    reused_descriptions = {}
+    analyze_events = []
+    for pending in pending_events:
+        uid = pending[0]['uid']
+        previous = sync_state.get(uid) if delta is not None else None
+        if previous and previous.get('description') and not delta.is_dirty(uid):
+            reused_descriptions[uid] = previous['description']
         else:
-            # 普通事件：设置具体时间，默认持续2小时
-            cal_event.begin = event_datetime
-            cal_event.end = event_datetime + timedelta(hours=2)
-            logger.info(f"创建定时事件: {cal_event.name}, 时间: {event_datetime.strftime('%Y-%m-%d %H:%M:%S')}, 持续2小时")
+            analyze_events.append(pending)
+    if analyze_events:
+        # 同步状态中没有的事件（如重新生成过去的某一周）可以复用事件库中内容相同时的分析
+        stored = load_stored_analyses([pending[0]['uid'] for pending in analyze_events])
+        for uid, (digest, description) in stored.items():
+            if digest == hashes[uid]:
+                reused_descriptions[uid] = description
+        analyze_events = [pending for pending in analyze_events if pending[0]['uid'] not in reused_descriptions]
+    if delta is not None or reused_descriptions:
+        logger.info(f"需要分析 {len(analyze_events)} 个事件，复用 {len(reused_descriptions)} 个未变化事件的分析")
+    
+    analyses = {}
+    analyzer = None
+    if analyze_events:
+        analyzer = create_event_analyzer()
         
-        # 分析投资机会
+        # 并发分析事件的投资机会（结果按输入顺序返回，单个失败为 None）
         try:
-            # 搜索相关信息
-            related_info = analyzer.search_related_info(cal_event.name, event_datetime)
-            
-            # 分析投资机会
-            analysis = analyzer.analyze_investment_opportunity(
-                cal_event.name, 
-                event_datetime,
-                related_info
-            )
-            
-            # 格式化分析结果
-            analysis_text = analyzer.format_analysis_for_calendar(analysis)
-            
-            # 构建事件描述，包含基本信息
-            description_parts = []
-            
-            # 添加基本事件信息
-            if event_data.get('event'):
-                description_parts.append(f"📊 事件详情: {event_data.get('event')}")
-            
-            if event_data.get('quantity') and event_data.get('unit'):
-                description_parts.append(f"📈 数据: {event_data.get('quantity')} {event_data.get('unit')}")
-            
-            # 添加foresight信息
-            if event_data.get('foresight'):
-                description_parts.append(f"🔮 {event_data.get('foresight')}")
+            results = analyzer.analyze_many([
+                {
+                    'id': event_data.id or '',
+                    'summary': cal_event['name'],
+                    'date': event_time.local_datetime(),
+                    'foresight': event_data.foresight or ''
+                }
+                for cal_event, event_data, event_time, _ in analyze_events
+            ])
+        except Exception as e:
+            logger.error(f"批量分析事件时出错: {e}")
+            results = [None] * len(analyze_events)
+        analyses = {pending[0]['uid']: result for pending, result in zip(analyze_events, results)}
+        
+        close_event_analyzer(analyzer)
+    
+    # 本次生成的同步状态（只有分析成功的描述会被复用）
+    new_entries = {}
+    # 分析成功（或复用成功分析）的描述 {UID: (事件内容哈希, 描述)}，只有这些写入事件库
+    analyzed = {}
+    # 历史偏差概况每次生成时重新计算，不写入同步状态
+    profiles = load_event_surprise_profiles()
+    
+    def finish_description(description, event_data):
+        return add_actual_line(add_surprise_line(description, event_data, profiles), event_data)
+    
+    def iter_calendar_events():
+        """逐个生成 (带描述的事件, 筛选属性, 是否写入默认日历)，供流式写入ICS文件"""
+        for cal_event, event_data, event_time, country_emoji, tracked in all_events:
+            uid = cal_event['uid']
+            attributes = {
+                'country': normalize_country(event_data.country),
+                'importance': event_data.importance,
+                'date': event_time.day,
+            }
             
-            # 添加分析结果
-            if analysis_text:
-                description_parts.append("\n" + analysis_text)
+            if not tracked:
+                # 筛选目录中的其他事件不做AI分析，也不等待公布值更新
+                new_entries[uid] = {'hash': hashes[uid]}
+                description = build_basic_description(event_data, country_emoji)
+                yield dict(cal_event, description=finish_description(description, event_data)), attributes, False
+                continue
             
-            cal_event.description = "\n".join(description_parts)
+            entry = {'hash': hashes[uid], 'public_date': event_data.public_date, 'actual': event_data.actual or ''}
             
-        except Exception as e:
-            logger.error(f"分析事件时出错: {e}")
+            if uid in reused_descriptions:
+                description = reused_descriptions[uid]
+                entry['description'] = description
+                analyzed[uid] = (hashes[uid], description)
+            else:
+                try:
+                    analysis = analyses.get(uid)
+                    if not is_successful_analysis(analysis):
+                        # 失败的分析不写入同步状态，下次运行时重新分析
+                        raise RuntimeError(f"事件 {cal_event['name']} 分析失败")
+                    
+                    # 格式化分析结果并构建事件描述
+                    analysis_text = analyzer.format_analysis_for_calendar(analysis)
+                    description = build_event_description(event_data, analysis_text)
+                    entry['description'] = description
+                    analyzed[uid] = (hashes[uid], description)
+                    
+                except Exception as e:
+                    logger.error(f"分析事件时出错: {e}")
+                    
+                    # 如果分析失败，使用基本描述
+                    description = build_basic_description(event_data, country_emoji)
             
-            # 如果分析失败，使用基本描述
-            basic_info = [country_emoji]
-            if event_data.get('event'):
-                basic_info.append(f"📊 {event_data.get('event')}")
-            if event_data.get('quantity') and event_data.get('unit'):
-                basic_info.append(f"📈 {event_data.get('quantity')} {event_data.get('unit')}")
-            if event_data.get('foresight'):
-                basic_info.append(f"🔮 {event_data.get('foresight')}")
-            cal_event.description = "\n".join(basic_info)
-        
-        # 添加事件到日历
-        cal.events.add(cal_event)
-        event_count += 1
+            new_entries[uid] = entry
+            yield dict(cal_event, description=finish_description(description, event_data)), attributes, True
+    
+    def write_calendar_files(ics_path):
+        """单次遍历同时写入默认日历和筛选目录，每个事件只渲染一次"""
+        with StreamingCalendarWriter(ics_path) as writer, CatalogWriter(FULL_ICS_FILE) as catalog:
+            for event, attributes, tracked in iter_calendar_events():
+                block = render_event(**event)
+                if tracked:
+                    writer.write_block(block)
+                catalog.write_block(block, event['uid'], attributes)
     
-    # 保存ICS文件
+    # 流式保存ICS文件（写入临时文件后原子替换）
+    event_count = len(pending_events)
     if event_count > 0:
         try:
-            with open(ICS_FILE, 'w') as f:
-                f.write(str(cal))
+            write_calendar_files(ICS_FILE)
+            if sync_state is not None:
+                sync_state.replace(new_entries)
+            save_analyses(analyzed)
             logger.info(f"成功创建ICS文件，包含 {event_count} 个事件")
             logger.info(f"ICS文件保存位置: {os.path.abspath(ICS_FILE)}")
             return True
@@ -336,8 +512,12 @@ def pycreate_ics_file(calendar_data):
                 try:
                     # 使用绝对路径
                     absolute_path = os.path.abspath(ICS_FILE)
-                    with open(absolute_path, 'w') as f:
-                        f.write(str(cal))
+                    new_entries.clear()
+                    analyzed.clear()
+                    write_calendar_files(absolute_path)
+                    if sync_state is not None:
+                        sync_state.replace(new_entries)
+                    save_analyses(analyzed)
                     logger.info(f"使用绝对路径成功创建ICS文件: {absolute_path}")
                     return True
                 except Exception as e2:
@@ -347,80 +527,136 @@ def pycreate_ics_file(calendar_data):
         logger.warning("未找到任何事件")
         return False
 
-def upload_to_cos(file_path):
-    """上传文件到腾讯云COS"""
-    if not os.path.exists(file_path):
-        logger.error(f"要上传的文件不存在: {file_path}")
-        return False
-        
-    # 检查COS配置是否完整
-    if not all([COS_SECRET_ID, COS_SECRET_KEY, COS_BUCKET]):
-        logger.error("腾讯云COS配置不完整，请设置环境变量或在脚本中直接配置")
-        # 在GitHub Actions环境中，可能没有COS配置，但我们不想让工作流失败
-        if is_github_actions:
-            logger.warning("在GitHub Actions环境中，跳过COS上传")
-            return True
-        return False
-    
+def save_to_event_store(calendar_data):
+    """将获取的事件批量写入本地事件库（失败不影响日历生成）"""
+    store = get_event_store()
+    if store is None:
+        return
     try:
-        # 创建COS客户端
-        config = CosConfig(
-            Region=COS_REGION,
-            SecretId=COS_SECRET_ID,
-            SecretKey=COS_SECRET_KEY
-        )
-        client = CosS3Client(config)
-        
-        # 上传文件
-        response = client.upload_file(
-            Bucket=COS_BUCKET,
-            LocalFilePath=file_path,
-            Key=COS_OBJECT_KEY
-        )
-        
-        # 生成文件访问URL（如果是公共读取权限的存储桶）
-        file_url = f'https://{COS_BUCKET}.cos.{COS_REGION}.myqcloud.com/{COS_OBJECT_KEY}'
-        
-        logger.info(f"文件已成功上传到腾讯云COS，对象键为: {COS_OBJECT_KEY}")
-        logger.info(f"文件URL: {file_url}")
-        return True
-    
+        changed = store.upsert_macro_events(calendar_data)
+        logger.info(f"事件库: 写入 {len(calendar_data)} 个事件，其中 {changed} 个新增或变化")
     except Exception as e:
-        logger.error(f"上传文件到腾讯云COS时发生错误: {e}")
-        # 在GitHub Actions环境中，不因COS上传失败而让整个工作流失败
-        if is_github_actions:
-            logger.warning("在GitHub Actions环境中，忽略COS上传错误，继续执行")
-            return True
-        return False
+        logger.warning(f"写入事件库失败: {e}")
 
-def main():
-    """主函数"""
+def load_from_event_store(start_timestamp=None, end_timestamp=None):
+    """从本地事件库查询时间范围内的事件（不请求接口）"""
+    store = get_event_store()
+    if store is None:
+        logger.error("未配置事件库（EVENT_STORE_FILE），无法从事件库生成日历")
+        return []
+    calendar_data = store.query_macro_events(start_timestamp, end_timestamp)
+    logger.info(f"从事件库读取 {len(calendar_data)} 个事件")
+    return calendar_data
+
+def load_stored_analyses(uids):
+    """读取事件库中保存的分析描述 {UID: (事件内容哈希, 描述)}"""
+    store = get_event_store()
+    if store is None or not uids:
+        return {}
+    try:
+        return store.get_analyses(uids)
+    except Exception as e:
+        logger.warning(f"读取事件库中的分析失败: {e}")
+        return {}
+
+def load_event_surprise_profiles():
+    """从事件库计算各指标的历史偏差统计，未配置事件库或读取失败时返回 None"""
+    store = get_event_store() if SURPRISE_PROFILES else None
+    if store is None:
+        return None
+    try:
+        return load_surprise_profiles(store)
+    except Exception as e:
+        logger.warning(f"计算历史偏差统计失败: {e}")
+        return None
+
+def save_analyses(analyzed):
+    """将分析成功的事件描述 {UID: (事件内容哈希, 描述)} 保存到事件库"""
+    store = get_event_store()
+    if store is None or not analyzed:
+        return
+    try:
+        store.save_analyses(analyzed)
+    except Exception as e:
+        logger.warning(f"保存分析到事件库失败: {e}")
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="获取华尔街见闻宏观事件日历并生成ICS文件")
+    add_date_range_arguments(parser)
+    parser.add_argument('--from-store', action='store_true', help="从本地事件库生成日历，不请求接口")
+    args = parser.parse_args(argv)
+    date_range_from_args(args, parser)
+    return args
+
+def run_pipeline(start_timestamp=None, end_timestamp=None, show_guide=True, calendar_data=None, from_store=False):
+    """获取数据、生成ICS文件并上传，成功（包括没有变化）时返回 True
+    
+    calendar_data: 已获取的日历数据，传入时不再重新请求
+    from_store: 从本地事件库读取数据，不请求接口
+    """
     logger.info("开始获取日历数据")
     logger.info(f"运行环境: {'GitHub Actions' if is_github_actions else '本地或服务器'}")
     
-    calendar_data = fetch_calendar_data()
+    if calendar_data is None and from_store:
+        calendar_data = load_from_event_store(start_timestamp, end_timestamp)
+    else:
+        if calendar_data is None:
+            calendar_data = fetch_calendar_data(start_timestamp, end_timestamp)
+        if calendar_data:
+            save_to_event_store(calendar_data)
     
     if calendar_data:
         logger.info(f"成功获取日历数据，共 {len(calendar_data)} 条记录")
-        success = pycreate_ics_file(calendar_data)
+        with PUBLISH_LOCK:
+            return publish_calendar(calendar_data, show_guide)
+    else:
+        logger.error("获取日历数据失败")
+        if is_github_actions:
+            print("##[error] 获取日历数据失败")
+        return False
+
+def publish_calendar(calendar_data, show_guide=True):
+    """生成ICS文件并上传，保存同步状态（调用方需持有 PUBLISH_LOCK）"""
+    sync_state = SyncState.load(SYNC_STATE_FILE)
+    success = pycreate_ics_file(calendar_data, sync_state)
+    
+    if success is None:
+        # 没有变化：只在上次上传失败时重新上传已有文件
+        if sync_state.pending_upload:
+            logger.info("事件没有变化，但上次上传未成功，重新上传ICS文件")
+            if upload_to_cos(ICS_FILE, COS_OBJECT_KEY):
+                sync_state.mark_uploaded()
+                sync_state.save()
+                return True
+            return False
+        logger.info("事件没有变化，跳过ICS文件上传")
+        return True
+    elif success:
+        logger.info(f"ICS文件已生成: {ICS_FILE}")
+        logger.info("请将此文件导入到iOS日历应用中")
         
-        if success:
-            logger.info(f"ICS文件已生成: {ICS_FILE}")
-            logger.info("请将此文件导入到iOS日历应用中")
-            
-            # 上传到腾讯云COS
-            upload_success = upload_to_cos(ICS_FILE)
-            if upload_success:
-                logger.info("ICS文件已成功上传到腾讯云COS")
-            else:
-                logger.error("ICS文件上传到腾讯云COS失败")
-                
-            # 在GitHub Actions环境中，显示文件路径
-            if is_github_actions:
-                logger.info(f"GitHub Actions环境中的文件路径: {os.path.abspath(ICS_FILE)}")
-                print(f"##[notice] ICS文件生成路径: {os.path.abspath(ICS_FILE)}")
+        # 上传到腾讯云COS
+        upload_success = upload_to_cos(ICS_FILE, COS_OBJECT_KEY)
+        if upload_success:
+            logger.info("ICS文件已成功上传到腾讯云COS")
+            sync_state.mark_uploaded()
+        else:
+            logger.error("ICS文件上传到腾讯云COS失败")
+        
+        # 保存同步状态，下次运行只处理变化的事件
+        try:
+            sync_state.save()
+        except Exception as e:
+            logger.warning(f"保存同步状态失败，下次运行将全量重新生成: {e}")
             
-            # 显示导入指南
+        # 在GitHub Actions环境中，显示文件路径
+        if is_github_actions:
+            logger.info(f"GitHub Actions环境中的文件路径: {os.path.abspath(ICS_FILE)}")
+            print(f"##[notice] ICS文件生成路径: {os.path.abspath(ICS_FILE)}")
+        
+        # 显示导入指南
+        if show_guide:
             print("\n如何导入到iOS日历:")
             print("1. 将生成的ICS文件发送到您的iOS设备（通过电子邮件、AirDrop或其他方式）")
             print("2. 在iOS设备上打开该文件")
@@ -429,14 +665,18 @@ def main():
             print("1. 将此文件上传到iCloud Drive")
             print("2. 在iOS设备上通过'文件'应用访问该文件")
             print("3. 点击文件，选择添加到日历\n")
-        else:
-            logger.error("创建ICS文件失败")
-            if is_github_actions:
-                print("##[error] 创建ICS文件失败")
+        return upload_success
     else:
-        logger.error("获取日历数据失败")
+        logger.error("创建ICS文件失败")
         if is_github_actions:
-            print("##[error] 获取日历数据失败")
+            print("##[error] 创建ICS文件失败")
+        return False
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    start_timestamp, end_timestamp = date_range_from_args(args)
+    run_pipeline(start_timestamp, end_timestamp, from_store=args.from_store)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
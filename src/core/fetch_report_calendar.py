@@ -3,40 +3,39 @@
 
 import requests
 import json
-from datetime import datetime, timedelta
-from ics import Calendar, Event
+from operator import itemgetter
 import os
 import logging
 import re
-from qcloud_cos import CosConfig
-from qcloud_cos import CosS3Client
-import sys
-import pytz
-import time
-
 import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import argparse
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
-# 配置日志
-# 检查是否在GitHub Actions环境中运行
-is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
-
-# 确保日志目录存在
-log_dir = os.path.join(project_root, "logs")
-os.makedirs(log_dir, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "report_calendar_sync.log")) if not is_github_actions else logging.StreamHandler(),
-        logging.StreamHandler()
-    ]
+# 导入限速器和共享HTTP客户端（在设置路径后）
+from src.core.rate_limiter import TokenBucket
+from src.core.http_client import http_get
+from src.core.event_store import get_event_store
+from src.core.feed_index import CatalogWriter, normalize_country, write_catalog
+from src.core.ics_writer import render_event
+from src.core.event_times import apply_event_time, convert_timestamps
+from src.core.publisher import publish_manifest
+from src.core.watchlist import WatchlistIndex
+from src.core.records import decode_report_rows
+from src.core.sync_state import SyncState, payload_hash
+from src.core.date_range import (
+    add_date_range_arguments, date_range_from_args, format_timestamp, halve_window, split_windows
+)
+from src.core.common import (
+    get_current_week_timestamps, is_github_actions, setup_logging, upload_to_cos
 )
+
+# 配置日志
+setup_logging("report_calendar_sync.log")
 logger = logging.getLogger("report_calendar_sync")
 
 # 财报数据来源URL
@@ -46,88 +45,40 @@ REPORT_CALENDAR_URL = "https://api-ddc-wscn.awtmt.com/finance/report/list"
 OUTPUT_DIR = "calendar_files"
 ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_reports.ics")
 
-# 腾讯云COS配置
-COS_SECRET_ID = os.environ.get('COS_SECRET_ID', '')  # 从环境变量获取，也可以直接设置
-COS_SECRET_KEY = os.environ.get('COS_SECRET_KEY', '')  # 从环境变量获取，也可以直接设置
-COS_REGION = os.environ.get('COS_REGION', 'ap-beijing')  # COS存储桶所在地域
-COS_BUCKET = os.environ.get('COS_BUCKET', '')  # 存储桶名称
-COS_OBJECT_KEY = os.environ.get('COS_REPORT_OBJECT_KEY', 'calendar/wsc_reports.ics')  # 对象键（文件在COS中的路径）
+# 增量同步状态文件（记录每个财报事件上次同步时的内容哈希）
+SYNC_STATE_FILE = os.environ.get('REPORT_SYNC_STATE_FILE', os.path.join(OUTPUT_DIR, "sync_state_reports.json"))
 
-# 定义中国时区
-CHINA_TZ = pytz.timezone('Asia/Shanghai')
+# 腾讯云COS对象键（密钥、地域和存储桶见 src/core/common.py）
+COS_OBJECT_KEY = os.environ.get('COS_REPORT_OBJECT_KEY', 'calendar/wsc_reports.ics')  # 对象键（文件在COS中的路径）
 
-def get_current_week_timestamps():
-    """获取本周周一至周日的时间戳"""
-    today = datetime.now(CHINA_TZ)
-    # 获取本周周一（0=周一，6=周日）
-    days_since_monday = today.weekday()
-    monday = today - timedelta(days=days_since_monday)
-    # 设置为周一的00:00:00
-    monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # 获取本周周日的23:59:59
-    sunday = monday + timedelta(days=6, hours=23, minutes=59, seconds=59)
-    
-    # 转换为时间戳
-    start_timestamp = int(monday.timestamp())
-    end_timestamp = int(sunday.timestamp())
-    
-    logger.info(f"本周时间范围: {monday.strftime('%Y-%m-%d %H:%M:%S')} 至 {sunday.strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"时间戳范围: {start_timestamp} 至 {end_timestamp}")
-    
-    return start_timestamp, end_timestamp
+# 请求的市场（逗号分隔），按市场筛选的订阅从中选取
+REPORT_MARKETS = os.environ.get('REPORT_MARKETS', 'US,HK,CN')
 
-def get_week_days_timestamps():
-    """获取本周每天的时间戳列表"""
-    today = datetime.now(CHINA_TZ)
-    # 获取本周周一（0=周一，6=周日）
-    days_since_monday = today.weekday()
-    monday = today - timedelta(days=days_since_monday)
-    
-    daily_timestamps = []
-    for i in range(7):  # 周一到周日
-        day = monday + timedelta(days=i)
-        # 设置为当天的00:00:00
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        # 设置为当天的23:59:59
-        day_end = day.replace(hour=23, minute=59, second=59, microsecond=999000)
-        
-        start_timestamp = int(day_start.timestamp())
-        end_timestamp = int(day_end.timestamp())
-        
-        daily_timestamps.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'start': start_timestamp,
-            'end': end_timestamp
-        })
-    
-    logger.info(f"本周每天的时间戳范围: {len(daily_timestamps)} 天")
-    return daily_timestamps
+# 并发获取配置
+REPORT_FETCH_WORKERS = int(os.environ.get('REPORT_FETCH_WORKERS', '4'))  # 并发请求的最大线程数
+REPORT_REQUESTS_PER_SECOND = float(os.environ.get('REPORT_REQUESTS_PER_SECOND', '2'))  # 每秒最多发出的请求数
+REPORT_MAX_WINDOW_DAYS = int(os.environ.get('REPORT_MAX_WINDOW_DAYS', '7'))  # 单次请求覆盖的最大天数
+REPORT_TRUNCATION_LIMIT = int(os.environ.get('REPORT_TRUNCATION_LIMIT', '500'))  # 单次返回达到该条数时视为被截断
 
-def fetch_single_day_report_data(day_info):
-    """获取单天的财报数据"""
+def fetch_report_window_data(window):
+    """获取一个时间窗口（一天或多天）的财报数据，失败时返回 None"""
     try:
         # 构建请求参数
         params = {
-            'country': 'US,HK,CN',
-            'start': day_info['start'],
-            'end': day_info['end']
+            'country': REPORT_MARKETS,
+            'start': window['start'],
+            'end': window['end']
         }
         
-        logger.info("请求 {} 财报数据: {}".format(day_info['date'], REPORT_CALENDAR_URL))
+        logger.info("请求 {} 财报数据: {}".format(window['date'], REPORT_CALENDAR_URL))
         logger.info("请求参数: {}".format(params))
         
-        # 添加请求头来避免403错误
+        # 添加Referer来避免403错误（User-Agent等通用请求头由共享会话提供）
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
             'Referer': 'https://wallstreetcn.com/'
         }
         
-        response = requests.get(REPORT_CALENDAR_URL, params=params, headers=headers)
+        response = http_get(REPORT_CALENDAR_URL, params=params, headers=headers)
         response.raise_for_status()
         
         data = response.json()
@@ -138,52 +89,202 @@ def fetch_single_day_report_data(day_info):
                 fields = data['data'].get('fields', [])
                 items = data['data'].get('items', [])
                 
-                # 将items转换为字典格式，便于处理
-                processed_items = []
-                for item in items:
-                    if len(item) == len(fields):
-                        item_dict = dict(zip(fields, item))
-                        processed_items.append(item_dict)
+                # 按列下标一次性解码为紧凑的 EarningsReport 记录
+                processed_items = decode_report_rows(fields, items)
                 
-                logger.info(f"{day_info['date']} 成功获取 {len(processed_items)} 个财报事件")
+                logger.info(f"{window['date']} 成功获取 {len(processed_items)} 个财报事件")
                 return processed_items
             else:
-                logger.error(f"{day_info['date']} API返回错误: {data.get('message', '未知错误')}")
-                return []
+                logger.error(f"{window['date']} API返回错误: {data.get('message', '未知错误')}")
+                return None
         else:
-            logger.error(f"{day_info['date']} API响应格式不正确")
-            return []
+            logger.error(f"{window['date']} API响应格式不正确")
+            return None
     except requests.exceptions.RequestException as e:
-        logger.error(f"获取 {day_info['date']} 财报数据失败: {e}")
-        return []
+        logger.error(f"获取 {window['date']} 财报数据失败: {e}")
+        return None
+
+def fetch_report_calendar_data(start_timestamp=None, end_timestamp=None, max_workers=None, requests_per_second=None):
+    """从API获取财报日历数据（大窗口优先，被截断或出错时对半拆分，并发调用并令牌桶限速）"""
+    if start_timestamp is None or end_timestamp is None:
+        # 默认获取本周的数据
+        start_timestamp, end_timestamp = get_current_week_timestamps()
+    else:
+        logger.info(f"时间范围: {format_timestamp(start_timestamp)} 至 {format_timestamp(end_timestamp)}")
+    
+    windows = split_windows(start_timestamp, end_timestamp, REPORT_MAX_WINDOW_DAYS)
+    
+    max_workers = max(1, max_workers or REPORT_FETCH_WORKERS)
+    requests_per_second = requests_per_second or REPORT_REQUESTS_PER_SECOND
+    
+    # 所有工作线程共享同一个令牌桶，避免触发API频率限制
+    limiter = TokenBucket(requests_per_second)
+    logger.info(f"并发获取财报数据: 初始 {len(windows)} 个时间窗口, {max_workers} 个线程, 每秒最多 {requests_per_second} 个请求")
+    
+    all_report_data, failed_windows, request_count = fetch_report_windows(windows, limiter, max_workers)
+    
+    if failed_windows:
+        logger.warning(f"以下日期的财报数据获取失败，已跳过: {', '.join(failed_windows)}")
+    
+    logger.info(f"总共获取 {len(all_report_data)} 个财报事件，共发出 {request_count} 个请求")
+    return all_report_data if all_report_data else None
 
-def fetch_report_calendar_data():
-    """从API获取财报日历数据（按天循环调用）"""
-    # 获取本周每天的时间戳
-    daily_timestamps = get_week_days_timestamps()
+def fetch_report_windows(windows, limiter, max_workers=1):
+    """获取多个时间窗口的财报，被截断或出错的窗口对半拆分后重新请求
+    
+    返回 (按天排序的财报列表, 获取失败的日期列表, 发出的请求数)；limiter 可在多个调用方之间共享
+    """
+    def fetch_with_limit(window):
+        limiter.acquire()
+        try:
+            return fetch_report_window_data(window)
+        except Exception as e:
+            logger.error(f"获取 {window['date']} 财报数据时发生未预期的错误: {e}")
+            return None
+    
+    window_results = {}  # 窗口开始时间 -> 财报列表
+    failed_windows = []
+    request_count = 0
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = {executor.submit(fetch_with_limit, window): window for window in windows}
+        request_count += len(pending)
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                window = pending.pop(future)
+                window_data = future.result()
+                
+                truncated = window_data is not None and len(window_data) >= REPORT_TRUNCATION_LIMIT
+                if window_data is not None and not truncated:
+                    window_results[window['start']] = window_data
+                    continue
+                
+                # 请求失败或结果被截断时，将窗口对半拆分后重新请求
+                halves = halve_window(window)
+                if halves is None:
+                    if truncated:
+                        logger.warning(f"{window['date']} 单天返回 {len(window_data)} 条，可能已被截断，无法继续拆分")
+                        window_results[window['start']] = window_data
+                    else:
+                        failed_windows.append(window['date'])
+                    continue
+                
+                reason = "结果可能被截断" if truncated else "请求失败"
+                logger.info(f"{window['date']} {reason}，拆分为 {halves[0]['date']} 和 {halves[1]['date']} 重新请求")
+                for half in halves:
+                    pending[executor.submit(fetch_with_limit, half)] = half
+                    request_count += 1
     
+    # 按窗口开始时间合并，保证数据按天排序
     all_report_data = []
+    for window_start in sorted(window_results):
+        all_report_data.extend(window_results[window_start])
+    return all_report_data, failed_windows, request_count
+
+def build_report_event(report_item, event_time):
+    """将一条财报数据转换为 (日历事件, 筛选属性)
     
-    for day_info in daily_timestamps:
-        # 获取单天数据
-        day_data = fetch_single_day_report_data(day_info)
-        if day_data:
-            all_report_data.extend(day_data)
+    event_time: convert_timestamps 换算好的发布时间，没有有效发布时间（None）时返回 None
+    """
+    if event_time is None:
+        return None
         
-        # 添加短暂延迟，避免API频率限制
-        time.sleep(0.5)
+    # 创建日历事件，获取事件UID (使用id字段)
+    cal_event = {'uid': f"{report_item.id or ''}_wscn_report"}
     
-    logger.info(f"总共获取 {len(all_report_data)} 个财报事件")
-    return all_report_data if all_report_data else None
+    # 获取公司信息
+    company_name = report_item.company_name or '未知公司'
+    company_code = report_item.code or ''
+    country = report_item.country or ''
+    calendar_type = report_item.calendar_type or ''
+    observation_date = report_item.observation_date or ''
+    
+    # 根据国家使用对应的 emoji
+    country_emoji = ""
+    if country == "美国" or country == "US":
+        country_emoji = "🇺🇸"
+    elif country == "中国" or country == "CN":
+        country_emoji = "🇨🇳"
+    elif country == "香港" or country == "HK":
+        country_emoji = "🇭🇰"
+    else:
+        country_emoji = "🌍"  # 其他国家使用地球图标
+    
+    # 设置事件标题
+    title_parts = [country_emoji, company_name]
+    if company_code:
+        title_parts.append(f"({company_code})")
+    if observation_date:
+        title_parts.append(f"- {observation_date}")
+    
+    cal_event['name'] = " ".join(title_parts)
+    
+    # 设置事件时间（00:00或非常见时间点视为全天事件）
+    apply_event_time(cal_event, event_time)
+    
+    # 创建事件描述
+    description_parts = [country_emoji]
+        
+    # 添加EPS相关信息
+    eps_estimate = report_item.eps_estimate or 0
+    if eps_estimate and eps_estimate != 0:
+        description_parts.append(f"💰 预期EPS: {eps_estimate}")
+        
+    # 添加收益相关信息
+    earnings_estimate = report_item.earnings_estimate or 0
+    if earnings_estimate and earnings_estimate != 0:
+        description_parts.append(f"📈 预期收益: {earnings_estimate}")
+        
+    cal_event['description'] = "\n".join(description_parts)
+    
+    return cal_event, {'market': normalize_country(country), 'date': event_time.day}
+
+def convert_reports(report_data):
+    """整列换算发布时间后逐条转换财报数据，返回按开始时间和UID排序的 [(财报在输入中的位置, 日历事件, 筛选属性)]"""
+    event_times = convert_timestamps([report_item.public_date for report_item in report_data])
+    converted_events = []
+    for position, (report_item, event_time) in enumerate(zip(report_data, event_times)):
+        converted = build_report_event(report_item, event_time)
+        if converted is not None:
+            converted_events.append((event_time.sort_key(converted[0]['uid']), position) + converted)
+    converted_events.sort(key=itemgetter(0))
+    return [converted[1:] for converted in converted_events]
+
+def iter_report_events(report_data):
+    """将财报数据转换为 (日历事件, 筛选属性)，按开始时间和UID排序后逐条返回，供流式写入ICS文件和索引"""
+    for _, cal_event, attributes in convert_reports(report_data):
+        yield cal_event, attributes
 
-def create_report_ics_file(report_data):
-    """将财报数据转换为ICS格式"""
+def watch_timestamps(report_data):
+    """返回财报的发布时间戳，供常驻调度器判断是否临近事件"""
+    return [report_item.public_date for report_item in report_data if report_item.public_date]
+
+def create_report_ics_file(report_data, sync_state=None):
+    """将财报数据转换为ICS格式
+    
+    传入 sync_state 时与上次同步状态比较，财报没有任何变化时不写文件并返回 None
+    """
     global ICS_FILE
     global OUTPUT_DIR
     
     if not report_data:
         return False
     
+    # 增量同步：计算每个财报事件的内容哈希
+    hashes = {
+        f"{report_item.id or ''}_wscn_report": payload_hash(report_item.to_dict())
+        for report_item in report_data
+        if report_item.public_date
+    }
+    if sync_state is not None:
+        delta = sync_state.diff(hashes)
+        logger.info(f"增量同步: {delta}")
+        if not delta.has_changes and os.path.exists(ICS_FILE):
+            logger.info("财报没有变化，跳过ICS文件写入")
+            return None
+    
     # 确保输出目录存在
     try:
         os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -194,200 +295,196 @@ def create_report_ics_file(report_data):
         if is_github_actions:
             OUTPUT_DIR = "./calendar_files"
             ICS_FILE = os.path.join(OUTPUT_DIR, "wsc_reports.ics")
+
             os.makedirs(OUTPUT_DIR, exist_ok=True)
             logger.info(f"在GitHub Actions环境中使用替代路径: {OUTPUT_DIR}")
     
-    # 创建新的日历
-    cal = Calendar()
-    
-    # 添加事件
-    event_count = 0
-    for report_item in report_data:
-        # 获取public_date字段（时间戳格式）
-        public_date = report_item.get('public_date')
-        if not public_date:
-            continue
-            
-        # 将时间戳转换为datetime对象
-        try:
-            event_datetime = datetime.fromtimestamp(public_date, tz=CHINA_TZ)
-            logger.info(f"原始时间戳: {public_date}, 转换后时间: {event_datetime.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        except (ValueError, TypeError) as e:
-            logger.warning(f"无法解析时间戳 {public_date}: {e}")
-            continue
-            
-        # 创建日历事件
-        cal_event = Event()
-        
-        # 获取事件UID (使用id字段)
-        cal_event.uid = f"{report_item.get('id', '')}_wscn_report"
-        
-        # 获取公司信息
-        company_name = report_item.get('company_name', '未知公司')
-        company_code = report_item.get('code', '')
-        country = report_item.get('country', '')
-        calendar_type = report_item.get('calendar_type', '')
-        observation_date = report_item.get('observation_date', '')
-        
-        # 根据国家使用对应的 emoji
-        country_emoji = ""
-        if country == "美国" or country == "US":
-            country_emoji = "🇺🇸"
-        elif country == "中国" or country == "CN":
-            country_emoji = "🇨🇳"
-        elif country == "香港" or country == "HK":
-            country_emoji = "🇭🇰"
-        else:
-            country_emoji = "🌍"  # 其他国家使用地球图标
-        
-        # 设置事件标题
-        title_parts = [country_emoji, company_name]
-        if company_code:
-            title_parts.append(f"({company_code})")
-        if observation_date:
-            title_parts.append(f"- {observation_date}")
-        
-        cal_event.name = " ".join(title_parts)
-        
-        # 判断是否为全天事件
-        # 1. 如果时间是00:00:00，则视为全天事件
-        # 2. 如果时间不是整点或常见时间点，也视为待定的全天事件
-        is_midnight = event_datetime.hour == 0 and event_datetime.minute == 0 and event_datetime.second == 0
-        is_odd_time = event_datetime.minute not in [0, 15, 30, 45]  # 非整点或常见时间点
-        is_all_day = is_midnight or is_odd_time
-        
-        # 设置事件时间
-        if is_all_day:
-            # 全天事件：使用日期对象，避免时区转换问题
-            event_date = event_datetime.date()
-            cal_event.begin = event_date
-            cal_event.end = event_date
-            cal_event.make_all_day()  # 标记为全天事件
-            
-            # 如果是因为时间奇怪而设为全天事件，在标题中添加"待定"标记
-            if is_odd_time and not is_midnight:
-                cal_event.name = f"{cal_event.name} (待定)"
-                logger.info(f"创建待定全天财报事件: {cal_event.name}, 日期: {event_date}, 原时间: {event_datetime.strftime('%H:%M:%S')}")
-            else:
-                logger.info(f"创建全天财报事件: {cal_event.name}, 日期: {event_date}")
-        else:
-            # 普通事件：设置具体时间，默认持续2小时
-            cal_event.begin = event_datetime
-            cal_event.end = event_datetime + timedelta(hours=2)
-            logger.info(f"创建定时财报事件: {cal_event.name}, 时间: {event_datetime.strftime('%Y-%m-%d %H:%M:%S')}, 持续2小时")
-        
-        # 创建事件描述
-        description_parts = [country_emoji]
-            
-        # 添加EPS相关信息
-        eps_estimate = report_item.get('eps_estimate', 0)
-        if eps_estimate and eps_estimate != 0:
-            description_parts.append(f"💰 预期EPS: {eps_estimate}")
-            
-        # 添加收益相关信息
-        earnings_estimate = report_item.get('earnings_estimate', 0)
-        if earnings_estimate and earnings_estimate != 0:
-            description_parts.append(f"📈 预期收益: {earnings_estimate}")
-            
-        cal_event.description = "\n".join(description_parts)
-        
-        # 添加事件到日历
-        cal.events.add(cal_event)
-        event_count += 1
-    
-    # 保存ICS文件
-    if event_count > 0:
-        try:
-            with open(ICS_FILE, 'w') as f:
-                f.write(str(cal))
-            logger.info(f"成功创建财报ICS文件，包含 {event_count} 个事件")
-            logger.info(f"财报ICS文件保存位置: {os.path.abspath(ICS_FILE)}")
-            return True
-        except Exception as e:
-            logger.error(f"保存财报ICS文件时出错: {e}")
-            # 如果在GitHub Actions环境中尝试使用不同的方法
-            if is_github_actions:
-                try:
-                    # 使用绝对路径
-                    absolute_path = os.path.abspath(ICS_FILE)
-                    with open(absolute_path, 'w') as f:
-                        f.write(str(cal))
+    # 流式保存ICS文件：逐条生成事件并写入临时文件，完成后原子替换
+    try:
+        event_count = write_catalog(ICS_FILE, iter_report_events(report_data))
+    except Exception as e:
+        logger.error(f"保存财报ICS文件时出错: {e}")
+        # 如果在GitHub Actions环境中尝试使用不同的方法
+        if is_github_actions:
+            try:
+                # 使用绝对路径
+                absolute_path = os.path.abspath(ICS_FILE)
+                if write_catalog(absolute_path, iter_report_events(report_data)) > 0:
+                    if sync_state is not None:
+                        sync_state.replace({uid: {'hash': digest} for uid, digest in hashes.items()})
                     logger.info(f"使用绝对路径成功创建财报ICS文件: {absolute_path}")
                     return True
-                except Exception as e2:
-                    logger.error(f"使用绝对路径保存文件时也出错: {e2}")
-            return False
+            except Exception as e2:
+                logger.error(f"使用绝对路径保存文件时也出错: {e2}")
+        return False
+    
+    if event_count > 0:
+        if sync_state is not None:
+            sync_state.replace({uid: {'hash': digest} for uid, digest in hashes.items()})
+        logger.info(f"成功创建财报ICS文件，包含 {event_count} 个事件")
+        logger.info(f"财报ICS文件保存位置: {os.path.abspath(ICS_FILE)}")
+        return True
     else:
         logger.warning("未找到任何财报事件")
         return False
 
-def upload_to_cos(file_path):
-    """上传文件到腾讯云COS"""
-    if not os.path.exists(file_path):
-        logger.error(f"要上传的文件不存在: {file_path}")
-        return False
-        
-    # 检查COS配置是否完整
-    if not all([COS_SECRET_ID, COS_SECRET_KEY, COS_BUCKET]):
-        logger.error("腾讯云COS配置不完整，请设置环境变量或在脚本中直接配置")
-        # 在GitHub Actions环境中，可能没有COS配置，但我们不想让工作流失败
-        if is_github_actions:
-            logger.warning("在GitHub Actions环境中，跳过COS上传")
-            return True
-        return False
+def watchlist_ics_file(watchlist):
+    """关注列表财报日历的保存路径"""
+    return os.path.join(OUTPUT_DIR, f"wsc_reports_{watchlist}.ics")
+
+def watchlist_object_key(watchlist):
+    """关注列表财报日历在COS中的对象键（与默认财报日历放在同一目录）"""
+    root, ext = os.path.splitext(COS_OBJECT_KEY)
+    return f"{root}_{watchlist}{ext or '.ics'}"
+
+def create_watchlist_ics_files(report_data, watchlists, targets):
+    """一次遍历财报数据，为每个关注列表写入只包含其股票的财报日历，返回 {关注列表: 事件数}
     
+    targets: {关注列表名称: 输出路径}，只生成其中的关注列表
+    """
+    matched_items = []
+    matched_names = []
+    for report_item in report_data:
+        matched = [name for name in watchlists.match(report_item.code, report_item.company_name) if name in targets]
+        if matched:
+            matched_items.append(report_item)
+            matched_names.append(sorted(matched))
+    
+    writers = {name: CatalogWriter(path).open() for name, path in targets.items()}
     try:
-        # 创建COS客户端
-        config = CosConfig(
-            Region=COS_REGION,
-            SecretId=COS_SECRET_ID,
-            SecretKey=COS_SECRET_KEY
-        )
-        client = CosS3Client(config)
-        
-        # 上传文件
-        response = client.upload_file(
-            Bucket=COS_BUCKET,
-            LocalFilePath=file_path,
-            Key=COS_OBJECT_KEY
-        )
-        
-        # 生成文件访问URL（如果是公共读取权限的存储桶）
-        file_url = f'https://{COS_BUCKET}.cos.{COS_REGION}.myqcloud.com/{COS_OBJECT_KEY}'
-        
-        logger.info(f"财报文件已成功上传到腾讯云COS，对象键为: {COS_OBJECT_KEY}")
-        logger.info(f"财报文件URL: {file_url}")
+        for position, cal_event, attributes in convert_reports(matched_items):
+            # 同一财报只渲染一次，写入所有包含它的关注列表
+            block = render_event(**cal_event)
+            for name in matched_names[position]:
+                writers[name].write_block(block, cal_event['uid'], attributes)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    
+    # 没有匹配财报的关注列表也写入空日历，避免订阅保留过期的事件
+    for writer in writers.values():
+        writer.commit()
+    counts = {name: writer.event_count for name, writer in writers.items()}
+    logger.info("关注列表财报日历: " + ", ".join(f"{name} {count} 个事件" for name, count in counts.items()))
+    return counts
+
+def publish_watchlist_files(report_data, force=False):
+    """生成并上传关注列表的财报日历，返回是否全部上传成功
+    
+    只重新生成需要更新的关注列表：force 为 True（财报有变化或上次上传失败）、
+    输出文件不存在或关注列表文件在上次生成之后被修改
+    """
+    watchlists = WatchlistIndex.load()
+    if not len(watchlists):
         return True
     
+    targets = {
+        name: watchlist_ics_file(name) for name in watchlists
+        if force or watchlists.is_stale(name, watchlist_ics_file(name))
+    }
+    if not targets:
+        logger.info("关注列表财报日历没有变化，跳过生成和上传")
+        return True
+    
+    try:
+        create_watchlist_ics_files(report_data, watchlists, targets)
     except Exception as e:
-        logger.error(f"上传财报文件到腾讯云COS时发生错误: {e}")
-        # 在GitHub Actions环境中，不因COS上传失败而让整个工作流失败
-        if is_github_actions:
-            logger.warning("在GitHub Actions环境中，忽略COS上传错误，继续执行")
-            return True
+        logger.error(f"生成关注列表财报日历时出错: {e}")
         return False
+    
+    # 所有关注列表的日历通过同一个COS客户端并发上传
+    success = publish_manifest([(path, watchlist_object_key(name)) for name, path in targets.items()])
+    if not success:
+        logger.error("部分关注列表的财报日历上传失败")
+    return success
 
-def main():
-    """主函数"""
+def save_to_event_store(report_data):
+    """将获取的财报批量写入本地事件库（失败不影响日历生成）"""
+    store = get_event_store()
+    if store is None:
+        return
+    try:
+        changed = store.upsert_reports(report_data)
+        logger.info(f"事件库: 写入 {len(report_data)} 条财报，其中 {changed} 条新增或变化")
+    except Exception as e:
+        logger.warning(f"写入事件库失败: {e}")
+
+def load_from_event_store(start_timestamp=None, end_timestamp=None):
+    """从本地事件库查询时间范围内的财报（不请求接口）"""
+    store = get_event_store()
+    if store is None:
+        logger.error("未配置事件库（EVENT_STORE_FILE），无法从事件库生成日历")
+        return []
+    markets = [market.strip() for market in REPORT_MARKETS.split(",") if market.strip()]
+    report_data = store.query_reports(start_timestamp, end_timestamp, markets=markets)
+    logger.info(f"从事件库读取 {len(report_data)} 条财报")
+    return report_data
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="获取华尔街见闻财报日历并生成ICS文件")
+    add_date_range_arguments(parser)
+    parser.add_argument('--from-store', action='store_true', help="从本地事件库生成日历，不请求接口")
+    args = parser.parse_args(argv)
+    date_range_from_args(args, parser)
+    return args
+
+def run_pipeline(start_timestamp=None, end_timestamp=None, show_guide=True, report_data=None, from_store=False):
+    """获取数据、生成ICS文件并上传，成功（包括没有变化）时返回 True
+    
+    report_data: 已获取的财报数据，传入时不再重新请求
+    from_store: 从本地事件库读取数据，不请求接口
+    """
     logger.info("开始获取财报日历数据")
     logger.info(f"运行环境: {'GitHub Actions' if is_github_actions else '本地或服务器'}")
     
-    report_data = fetch_report_calendar_data()
+    if report_data is None and from_store:
+        report_data = load_from_event_store(start_timestamp, end_timestamp)
+    else:
+        if report_data is None:
+            report_data = fetch_report_calendar_data(start_timestamp, end_timestamp)
+        if report_data:
+            save_to_event_store(report_data)
     
     if report_data:
         logger.info(f"成功获取财报数据，共 {len(report_data)} 条记录")
-        success = create_report_ics_file(report_data)
+        sync_state = SyncState.load(SYNC_STATE_FILE)
+        success = create_report_ics_file(report_data, sync_state)
         
-        if success:
+        if success is None:
+            # 没有变化：只在上次上传失败时重新上传已有文件；关注列表文件被修改时只重新生成对应日历
+            watchlist_success = publish_watchlist_files(report_data, force=sync_state.pending_upload)
+            if sync_state.pending_upload:
+                logger.info("财报没有变化，但上次上传未成功，重新上传财报ICS文件")
+                if upload_to_cos(ICS_FILE, COS_OBJECT_KEY) and watchlist_success:
+                    sync_state.mark_uploaded()
+                    sync_state.save()
+                    return True
+                return False
+            logger.info("财报没有变化，跳过财报ICS文件上传")
+            return watchlist_success
+        elif success:
             logger.info(f"财报ICS文件已生成: {ICS_FILE}")
             logger.info("请将此文件导入到iOS日历应用中")
             
             # 上传到腾讯云COS
-            upload_success = upload_to_cos(ICS_FILE)
+            upload_success = upload_to_cos(ICS_FILE, COS_OBJECT_KEY)
             if upload_success:
                 logger.info("财报ICS文件已成功上传到腾讯云COS")
             else:
                 logger.error("财报ICS文件上传到腾讯云COS失败")
+            
+            # 财报有变化时重新生成所有关注列表的日历
+            upload_success = publish_watchlist_files(report_data, force=True) and upload_success
+            if upload_success:
+                sync_state.mark_uploaded()
+            
+            # 保存同步状态，下次运行没有变化时跳过写入和上传
+            try:
+                sync_state.save()
+            except Exception as e:
+                logger.warning(f"保存同步状态失败，下次运行将全量重新生成: {e}")
                 
             # 在GitHub Actions环境中，显示文件路径
             if is_github_actions:
@@ -395,22 +492,32 @@ def main():
                 print(f"##[notice] 财报ICS文件生成路径: {os.path.abspath(ICS_FILE)}")
             
             # 显示导入指南
-            print("\n如何导入财报日历到iOS:")
-            print("1. 将生成的ICS文件发送到您的iOS设备（通过电子邮件、AirDrop或其他方式）")
-            print("2. 在iOS设备上打开该文件")
-            print("3. 系统会提示您添加到日历，点击'添加'")
-            print("或者:")
-            print("1. 将此文件上传到iCloud Drive")
-            print("2. 在iOS设备上通过'文件'应用访问该文件")
-            print("3. 点击文件，选择添加到日历\n")
+            if show_guide:
+                print("\n如何导入财报日历到iOS:")
+                print("1. 将生成的ICS文件发送到您的iOS设备（通过电子邮件、AirDrop或其他方式）")
+                print("2. 在iOS设备上打开该文件")
+                print("3. 系统会提示您添加到日历，点击'添加'")
+                print("或者:")
+                print("1. 将此文件上传到iCloud Drive")
+                print("2. 在iOS设备上通过'文件'应用访问该文件")
+                print("3. 点击文件，选择添加到日历\n")
+            return upload_success
         else:
             logger.error("创建财报ICS文件失败")
             if is_github_actions:
                 print("##[error] 创建财报ICS文件失败")
+            return False
     else:
         logger.error("获取财报数据失败")
         if is_github_actions:
             print("##[error] 获取财报数据失败")
+        return False
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    start_timestamp, end_timestamp = date_range_from_args(args)
+    run_pipeline(start_timestamp, end_timestamp, from_store=args.from_store)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,102 @@
+"""
+Shared pooled HTTP transport for all outbound API calls
+"""
+
+import os
+import random
+import logging
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("http_client")
+
+# 超时与重试配置
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5'))  # 建立连接的超时（秒）
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '30'))  # 读取响应的超时（秒）
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))  # 幂等请求的最大重试次数
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', '0.5'))  # 指数退避的基数（秒）
+HTTP_BACKOFF_MAX = 30.0  # 单次退避等待的上限（秒）
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))  # 每个主机保持的长连接数
+
+# 需要重试的HTTP状态码（限流和服务端临时错误）
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 所有请求共用的默认请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class JitteredRetry(Retry):
+    """在指数退避时间上叠加随机抖动的重试策略，避免并发请求同时重试"""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return min(HTTP_BACKOFF_MAX, backoff / 2 + random.uniform(0, backoff))
+
+
+def _build_session() -> requests.Session:
+    """创建带连接池、重试策略和默认请求头的会话"""
+    retry = JitteredRetry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=HTTP_MAX_RETRIES,
+        status=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),  # 只重试幂等请求
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的HTTP会话（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+                logger.info(f"已创建共享HTTP连接池: 每主机 {HTTP_POOL_SIZE} 个连接, 最多重试 {HTTP_MAX_RETRIES} 次")
+    return _session
+
+
+def http_get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+             timeout=None, **kwargs) -> requests.Response:
+    """通过共享连接池发送GET请求，默认带连接/读取超时"""
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    return get_session().get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+
+
+def close_session():
+    """关闭共享会话并释放所有长连接"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,341 @@
+"""
+Streaming RFC 5545 calendar writer
+"""
+
+import os
+import logging
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pytz
+
+logger = logging.getLogger("ics_writer")
+
+CRLF = "\r\n"
+
+# 与此前使用的 ics 库保持一致的 PRODID，保证输出内容不变
+DEFAULT_PRODID = "ics.py - http://git.io/lLljaA"
+
+# RFC 5545 建议每行不超过75个字节（不含CRLF）
+FOLD_LIMIT = 75
+
+
+def escape_text(value: str) -> str:
+    """按 RFC 5545 转义 TEXT 类型的属性值（换行统一为 \\n，RFC 5545 没有 \\r 转义）"""
+    value = value.replace("\r\n", "\n").replace("\r", "\n")
+    value = value.replace("\\", "\\\\")
+    value = value.replace(";", "\\;")
+    value = value.replace(",", "\\,")
+    value = value.replace("\n", "\\n")
+    return value
+
+
+def unescape_text(value: str) -> str:
+    """escape_text 的逆操作"""
+    result = []
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value):
+            nxt = value[i + 1]
+            result.append({"n": "\n", "N": "\n", "r": "\r"}.get(nxt, nxt))
+            i += 2
+        else:
+            result.append(ch)
+            i += 1
+    return "".join(result)
+
+
+def fold_line(line: str, limit: int = FOLD_LIMIT) -> str:
+    """按字节长度折行，续行以空格开头，且不会截断多字节UTF-8字符"""
+    if len(line.encode("utf-8")) <= limit:
+        return line
+
+    parts = []
+    current = []
+    current_size = 0
+    for ch in line:
+        size = len(ch.encode("utf-8"))
+        # 续行的首个空格也计入长度
+        max_size = limit if not parts else limit - 1
+        if current_size + size > max_size:
+            parts.append("".join(current))
+            current = []
+            current_size = 0
+        current.append(ch)
+        current_size += size
+    parts.append("".join(current))
+    return (CRLF + " ").join(parts)
+
+
+def format_utc(value: datetime) -> str:
+    """将带时区的时间格式化为UTC时间（如 20250813T123000Z）"""
+    return value.astimezone(pytz.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def format_date(value) -> str:
+    """将日期格式化为 DATE 类型的值（如 20250813）"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.strftime("%Y%m%d")
+
+
+def render_event(uid: str, name: str, begin, end=None, all_day: bool = False,
+                 description: Optional[str] = None, fold: bool = False) -> str:
+    """将单个事件渲染为 VEVENT 文本块（不含结尾的CRLF）
+
+    属性顺序与 ics 库的输出一致：全天事件的 DTSTART、DESCRIPTION、
+    定时事件的 DTEND/DTSTART、SUMMARY、UID。
+    """
+    lines = ["BEGIN:VEVENT"]
+
+    if all_day:
+        lines.append(f"DTSTART;VALUE=DATE:{format_date(begin)}")
+        # 跨天的全天事件才需要 DTEND（不含结束当天）
+        if end is not None and _as_date(end) > _as_date(begin) + timedelta(days=1):
+            lines.append(f"DTEND;VALUE=DATE:{format_date(end)}")
+
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+
+    if not all_day:
+        if end is not None:
+            lines.append(f"DTEND:{format_utc(end)}")
+        lines.append(f"DTSTART:{format_utc(begin)}")
+
+    if name:
+        lines.append(f"SUMMARY:{escape_text(name)}")
+    lines.append(f"UID:{uid}")
+    lines.append("END:VEVENT")
+
+    if fold:
+        lines = [fold_line(line) for line in lines]
+    return CRLF.join(lines)
+
+
+def _as_date(value) -> date:
+    """将 datetime/date 统一为 date"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def event_sort_key(begin, uid: str, tz=pytz.utc) -> Tuple[int, str]:
+    """事件在日历中的排序键 (DTSTART时间戳, UID)，全天事件按 tz 时区当天 00:00 计算"""
+    if not isinstance(begin, datetime):
+        begin = tz.localize(datetime(begin.year, begin.month, begin.day))
+    return int(begin.timestamp()), uid or ''
+
+
+def block_sort_key(block: str, tz=pytz.utc) -> Tuple[int, str]:
+    """从已渲染的 VEVENT 文本块中解析 DTSTART 和 UID，返回与 event_sort_key 相同的排序键"""
+    begin = None
+    uid = ''
+    for line in block.split(CRLF):
+        if line.startswith("DTSTART;VALUE=DATE:"):
+            begin = datetime.strptime(line[19:27], "%Y%m%d").date()
+        elif line.startswith("DTSTART:"):
+            begin = pytz.utc.localize(datetime.strptime(line[8:24], "%Y%m%dT%H%M%SZ"))
+        elif line.startswith("UID:"):
+            uid = line[4:]
+    if begin is None:
+        return 0, uid
+    return event_sort_key(begin, uid, tz)
+
+
+class StreamingCalendarWriter:
+    """逐个写入 VEVENT 的日历写入器，先写临时文件，完成后原子替换目标文件"""
+
+    def __init__(self, path: str, prodid: str = DEFAULT_PRODID, fold: bool = False):
+        self.path = path
+        self.prodid = prodid
+        self.fold = fold
+        self.event_count = 0
+        self._file = None
+        self._temp_path = None
+
+    def open(self):
+        """创建临时文件并写入日历头"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(self.path)}.", suffix=".tmp", dir=directory
+        )
+        self._file = os.fdopen(fd, "w", encoding="utf-8", newline="")
+        self._file.write(f"BEGIN:VCALENDAR{CRLF}VERSION:2.0{CRLF}PRODID:{self.prodid}{CRLF}")
+        return self
+
+    def write_event(self, uid: str, name: str, begin, end=None, all_day: bool = False,
+                    description: Optional[str] = None):
+        """渲染并写入一个事件"""
+        self.write_block(render_event(uid, name, begin, end, all_day, description, fold=self.fold))
+
+    def write_block(self, block: str):
+        """写入一个已渲染好的 VEVENT 文本块"""
+        self._file.write(block)
+        self._file.write(CRLF)
+        self.event_count += 1
+
+    def commit(self):
+        """写入日历尾，刷盘后原子替换目标文件"""
+        self._file.write("END:VCALENDAR")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.chmod(self._temp_path, 0o644)
+        os.replace(self._temp_path, self.path)
+        self._temp_path = None
+
+    def abort(self):
+        """放弃写入并删除临时文件，目标文件保持不变"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def write_calendar(path: str, events: Iterable[Dict], fold: bool = False, skip_empty: bool = True) -> int:
+    """将事件流式写入ICS文件，返回写入的事件数
+
+    events: 可迭代的事件字典，键为 render_event 的参数（uid、name、begin、end、all_day、description）
+    skip_empty: 没有任何事件时不替换目标文件
+    """
+    writer = StreamingCalendarWriter(path, fold=fold).open()
+    try:
+        for event in events:
+            writer.write_event(**event)
+    except BaseException:
+        writer.abort()
+        raise
+
+    if writer.event_count == 0 and skip_empty:
+        writer.abort()
+        return 0
+
+    writer.commit()
+    logger.info(f"已写入ICS文件 {path}，共 {writer.event_count} 个事件")
+    return writer.event_count
+
+
+def iter_event_blocks(content: str) -> Iterator[Tuple[str, str]]:
+    """按顺序逐个返回 (UID, VEVENT 文本块)，文本块保留原始行（不含结尾的CRLF）"""
+    block = None
+    uid = None
+    for line in content.split(CRLF):
+        if line == "BEGIN:VEVENT":
+            block = [line]
+            uid = None
+        elif block is not None:
+            block.append(line)
+            if line.startswith("UID:"):
+                uid = line[4:]
+            elif line == "END:VEVENT":
+                yield uid, CRLF.join(block)
+                block = None
+
+
+def _logical_lines(content: str) -> List[str]:
+    """拆分为逻辑行（合并以空格开头的折行续行）"""
+    lines = []
+    for line in content.split(CRLF):
+        if line.startswith(" ") and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+    return lines
+
+
+def replace_file(path: str, content: Union[str, bytes]):
+    """写入临时文件后原子替换目标文件（content 为 str 时按UTF-8写入）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def patch_event_descriptions(path: str, transforms: Dict[str, Callable[[str], str]], fold: bool = False) -> List[str]:
+    """只修改指定 UID 事件的 DESCRIPTION，其余内容原样保留，返回实际修改的 UID 列表
+
+    transforms: {uid: 函数}，函数接收原描述（没有描述时为空字符串）并返回新描述
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        lines = _logical_lines(f.read())
+
+    output = []
+    patched = []
+    block = None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            block = [line]
+            continue
+        if block is None:
+            output.append(line)
+            continue
+
+        block.append(line)
+        if line != "END:VEVENT":
+            continue
+
+        uid = next((item[4:] for item in block if item.startswith("UID:")), None)
+        if uid in transforms:
+            patched_block = _patch_description(block, transforms[uid])
+            if patched_block is not None:
+                block = patched_block
+                patched.append(uid)
+        output.extend(item if not fold else fold_line(item) for item in block)
+        block = None
+
+    if patched:
+        replace_file(path, CRLF.join(output))
+    return patched
+
+
+def _patch_description(block: List[str], transform: Callable[[str], str]) -> Optional[List[str]]:
+    """替换 VEVENT 块的 DESCRIPTION 行，描述不变时返回 None"""
+    index = next((i for i, item in enumerate(block) if item.startswith("DESCRIPTION:")), None)
+    old = unescape_text(block[index][len("DESCRIPTION:"):]) if index is not None else ""
+    new = transform(old)
+    if new == old:
+        return None
+
+    block = list(block)
+    line = f"DESCRIPTION:{escape_text(new)}"
+    if index is not None:
+        block[index] = line
+    else:
+        # 与 render_event 的属性顺序一致：DESCRIPTION 位于定时事件的时间、SUMMARY 和 UID 之前
+        position = next(
+            i for i, item in enumerate(block)
+            if item.startswith(("DTEND:", "DTSTART:", "SUMMARY:", "UID:"))
+        )
+        block.insert(position, line)
+    return block
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent COS publisher for a manifest of local files and object keys
+
+用法:
+    python -m src.core.publisher manifest.json [--workers 8] [--no-verify]
+
+清单文件格式: [{"file": "calendar_files/wsc_events.ics", "key": "calendar/wsc_events.ics"}, ...]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.common import (
+    COS_HASH_METADATA, cos_configured, get_cos_client, head_cos_object, is_github_actions, publish_file, setup_logging
+)
+
+logger = logging.getLogger("publisher")
+
+# 发布配置
+PUBLISH_WORKERS = int(os.environ.get('PUBLISH_WORKERS', '8'))  # 并发上传的线程数
+PUBLISH_VERIFY = os.environ.get('PUBLISH_VERIFY', 'true').lower() != 'false'  # 上传后读取对象元数据确认内容哈希
+
+# 清单中的一项：(本地文件, 对象键)
+ManifestEntry = Tuple[str, str]
+
+
+class PublishResult:
+    """一个对象的发布结果"""
+
+    __slots__ = ('file_path', 'object_key', 'status', 'size', 'seconds', 'error')
+
+    UPLOADED = 'uploaded'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+    def __init__(self, file_path: str, object_key: str, status: str, size: int = 0, seconds: float = 0.0,
+                 error: str = ''):
+        self.file_path = file_path
+        self.object_key = object_key
+        self.status = status
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status != self.FAILED
+
+    def __repr__(self):
+        return f"PublishResult({self.object_key!r}, {self.status}, {self.size} bytes, {self.seconds * 1000:.0f}ms)"
+
+
+def load_manifest(path: str) -> List[ManifestEntry]:
+    """读取JSON清单文件，格式错误时抛出 ValueError"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('objects', [])
+    entries = []
+    for item in data:
+        if not isinstance(item, dict) or not item.get('file') or not item.get('key'):
+            raise ValueError(f"清单项缺少 file 或 key: {item!r}")
+        entries.append((item['file'], item['key']))
+    return entries
+
+
+class CosPublisher:
+    """通过同一个COS客户端并发上传清单中的所有文件，上传后确认对象的内容哈希，并记录每个对象的耗时"""
+
+    def __init__(self, client=None, workers: Optional[int] = None, verify: Optional[bool] = None):
+        self.client = client
+        self.workers = workers or PUBLISH_WORKERS
+        self.verify = PUBLISH_VERIFY if verify is None else verify
+
+    def publish(self, entries: Iterable[ManifestEntry]) -> List[PublishResult]:
+        """发布清单中的所有文件，结果按清单顺序返回（每个编码版本一项）"""
+        entries = list(dict.fromkeys(entries))
+        if not entries:
+            return []
+        if not cos_configured():
+            logger.error("腾讯云COS配置不完整，请设置环境变量或在脚本中直接配置")
+            # 与 upload_to_cos 一致：GitHub Actions 中没有COS配置时不让工作流失败
+            status = PublishResult.SKIPPED if is_github_actions else PublishResult.FAILED
+            return [PublishResult(file_path, object_key, status, error="COS配置不完整") for file_path, object_key in entries]
+
+        client = self.client or get_cos_client()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(entries))),
+                                thread_name_prefix="cos-publish") as executor:
+            futures = [executor.submit(self._publish_one, client, file_path, object_key)
+                       for file_path, object_key in entries]
+            results = [result for future in futures for result in future.result()]
+        log_report(results, time.monotonic() - started)
+        return results
+
+    def _publish_one(self, client, file_path: str, object_key: str) -> List[PublishResult]:
+        started = time.monotonic()
+        if not os.path.exists(file_path):
+            logger.error(f"要上传的文件不存在: {file_path}")
+            return [PublishResult(file_path, object_key, PublishResult.FAILED, error="文件不存在")]
+        try:
+            uploads = publish_file(file_path, object_key, client)
+        except Exception as e:
+            logger.error(f"上传 {object_key} 时发生错误: {e}")
+            return [PublishResult(file_path, object_key, PublishResult.FAILED,
+                                  seconds=time.monotonic() - started, error=str(e))]
+
+        results = []
+        for key, digest, size in uploads:
+            if size is None:
+                results.append(PublishResult(file_path, key, PublishResult.SKIPPED))
+                continue
+            error = self._verify(client, key, digest, size) if self.verify else ''
+            status = PublishResult.FAILED if error else PublishResult.UPLOADED
+            results.append(PublishResult(file_path, key, status, size, error=error))
+        # 各编码版本依次上传，耗时记在整个文件上
+        for result in results:
+            result.seconds = time.monotonic() - started
+        return results
+
+    @staticmethod
+    def _verify(client, object_key: str, digest: str, size: int) -> str:
+        """读取刚上传的对象元数据，返回不一致的原因（一致时返回空字符串）"""
+        remote = head_cos_object(object_key, client)
+        if not remote:
+            return "上传后无法读取对象"
+        if remote.get(COS_HASH_METADATA) != digest:
+            return f"内容哈希不一致: {remote.get(COS_HASH_METADATA)!r}"
+        length = remote.get('content-length')
+        if length is not None and str(length) != str(size):
+            return f"对象大小不一致: {length} != {size}"
+        return ''
+
+
+def log_report(results: List[PublishResult], elapsed: float):
+    """输出每个对象的发布结果和耗时"""
+    for result in results:
+        detail = f"{result.size} 字节" if result.status == PublishResult.UPLOADED else result.error
+        logger.info(f"  {result.status:<8} {result.seconds * 1000:7.0f}ms  {result.object_key}  {detail}".rstrip())
+    counts = {status: sum(1 for result in results if result.status == status)
+              for status in (PublishResult.UPLOADED, PublishResult.SKIPPED, PublishResult.FAILED)}
+    logger.info(
+        f"发布完成: 上传 {counts[PublishResult.UPLOADED]} 个, 跳过 {counts[PublishResult.SKIPPED]} 个, "
+        f"失败 {counts[PublishResult.FAILED]} 个，总耗时 {elapsed * 1000:.0f} 毫秒"
+    )
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        logger.error(f"发布失败 {result.object_key}: {result.error}")
+
+
+def publish_manifest(entries: Iterable[ManifestEntry], **kwargs) -> bool:
+    """并发发布清单中的所有文件，返回是否全部成功"""
+    return all(result.ok for result in CosPublisher(**kwargs).publish(entries))
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="并发上传清单中的文件到腾讯云COS")
+    parser.add_argument('manifest', help="JSON清单文件: [{\"file\": 本地文件, \"key\": 对象键}, ...]")
+    parser.add_argument('--workers', type=int, default=PUBLISH_WORKERS, help=f"并发上传的线程数（默认 {PUBLISH_WORKERS}）")
+    parser.add_argument('--no-verify', action='store_true', help="上传后不确认对象的内容哈希")
+    args = parser.parse_args(argv)
+
+    setup_logging("publisher.log")
+    try:
+        entries = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        logger.error(f"读取清单文件失败: {e}")
+        return 1
+    success = publish_manifest(entries, workers=args.workers, verify=False if args.no_verify else None)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Rate limiting helpers for outbound API requests
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        rate: 每秒补充的令牌数，即每秒允许的请求数
+        capacity: 桶容量，即允许的最大突发请求数，默认为 1（匀速放行）
+        """
+        if rate <= 0:
+            raise ValueError(f"令牌补充速率必须大于0: {rate}")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else 1.0
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """按流逝的时间补充令牌（调用方需持有锁）"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """尝试立即获取令牌，不足时返回 False 而不等待"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """阻塞直到获取到令牌，返回累计等待的秒数"""
+        if tokens > self.capacity:
+            raise ValueError(f"单次请求的令牌数 {tokens} 超过桶容量 {self.capacity}")
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait_time = (tokens - self._tokens) / self.rate
+
+            # 在锁外等待，避免阻塞其他线程补充/获取令牌
+            time.sleep(wait_time)
+            waited += wait_time
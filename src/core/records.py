@@ -0,0 +1,112 @@
+"""
+Compact record types for macro events and earnings reports
+"""
+
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class _Record:
+    """__slots__ 记录的公共方法"""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于序列化和计算内容哈希）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r})"
+
+
+class MacroEvent(_Record):
+    """宏观经济事件（来自 macrodatas 接口）"""
+
+    __slots__ = (
+        'id', 'title', 'country', 'importance', 'public_date',
+        'event', 'quantity', 'unit', 'foresight',
+        'actual', 'forecast', 'previous'
+    )
+
+    def __init__(self, id=None, title=None, country=None, importance=None, public_date=None,
+                 event=None, quantity=None, unit=None, foresight=None,
+                 actual=None, forecast=None, previous=None):
+        self.id = id
+        self.title = title
+        self.country = country
+        self.importance = importance
+        self.public_date = public_date
+        self.event = event
+        self.quantity = quantity
+        self.unit = unit
+        self.foresight = foresight
+        self.actual = actual
+        self.forecast = forecast
+        self.previous = previous
+
+    @classmethod
+    def from_api(cls, item: Dict) -> 'MacroEvent':
+        """从接口返回的事件字典解码，忽略未使用的字段"""
+        get = item.get
+        return cls(
+            get('id'), get('title'), get('country'), get('importance'), get('public_date'),
+            get('event'), get('quantity'), get('unit'), get('foresight'),
+            get('actual'), get('forecast'), get('previous')
+        )
+
+
+class EarningsReport(_Record):
+    """上市公司财报发布事件（来自 finance/report/list 接口）"""
+
+    __slots__ = (
+        'id', 'company_name', 'code', 'country', 'calendar_type',
+        'observation_date', 'public_date', 'eps_estimate', 'earnings_estimate'
+    )
+
+    def __init__(self, id=None, company_name=None, code=None, country=None, calendar_type=None,
+                 observation_date=None, public_date=None, eps_estimate=None, earnings_estimate=None):
+        self.id = id
+        self.company_name = company_name
+        self.code = code
+        self.country = country
+        self.calendar_type = calendar_type
+        self.observation_date = observation_date
+        self.public_date = public_date
+        self.eps_estimate = eps_estimate
+        self.earnings_estimate = earnings_estimate
+
+    @classmethod
+    def from_api(cls, item: Dict) -> 'EarningsReport':
+        """从字典解码"""
+        return cls(*(item.get(name) for name in cls.__slots__))
+
+
+def decode_macro_events(items: Iterable[Dict]) -> List[MacroEvent]:
+    """将接口返回的事件字典列表解码为 MacroEvent 列表"""
+    return [MacroEvent.from_api(item) for item in items if isinstance(item, dict)]
+
+
+def decode_report_rows(fields: Sequence[str], items: Iterable[Sequence]) -> List[EarningsReport]:
+    """按 fields/items 列式布局一次性解码财报行，跳过列数不匹配的行
+
+    每行直接按预先计算好的列下标取值，不会为每行创建中间字典。
+    """
+    positions = {name: index for index, name in enumerate(fields)}
+    missing = [name for name in EarningsReport.__slots__ if name not in positions]
+
+    if missing:
+        # 接口缺少某些列时，对应属性取 None
+        indices = [positions.get(name) for name in EarningsReport.__slots__]
+
+        def pick(row) -> tuple:
+            return tuple(row[i] if i is not None else None for i in indices)
+    else:
+        pick = itemgetter(*(positions[name] for name in EarningsReport.__slots__))
+
+    width = len(fields)
+    return [EarningsReport(*pick(row)) for row in items if len(row) == width]
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run the calendar pipelines concurrently in a single process
+
+用法:
+    python -m src.core.run --calendars events,reports [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--weeks N] [--from-store]
+    python -m src.core.run --daemon [--serve] [--weeks N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.common import setup_logging
+from src.core.date_range import add_date_range_arguments, date_range_from_args
+from src.core.scheduler import RefreshScheduler
+from src.core.fanout import FEEDS_CONFIG, publish_feeds
+
+# 在导入各日历模块之前配置日志，所有日历共享同一套日志输出
+setup_logging("calendar_run.log")
+logger = logging.getLogger("calendar_run")
+
+# 可运行的日历：名称 -> (模块, 获取数据的函数名, 说明)
+PIPELINES = {
+    'events': ('src.core.fetch_event_calendar', 'fetch_calendar_data', '宏观事件日历'),
+    'reports': ('src.core.fetch_report_calendar', 'fetch_report_calendar_data', '财报日历'),
+}
+
+
+def parse_calendars(value):
+    """解析逗号分隔的日历名称列表"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in PIPELINES]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(f"未知的日历: {', '.join(unknown) or value}，可选: {', '.join(PIPELINES)}")
+    # 去重并保持顺序
+    return list(dict.fromkeys(names))
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="在同一进程中并发生成多个日历")
+    parser.add_argument('--calendars', type=parse_calendars, default=list(PIPELINES),
+                        help=f"要生成的日历，逗号分隔（默认 {','.join(PIPELINES)}）")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常驻运行，按事件临近程度定时刷新，数据变化时才重新发布")
+    parser.add_argument('--serve', action='store_true',
+                        help="常驻模式下同时提供日历订阅HTTP服务（端口见 FEED_SERVER_PORT）")
+    parser.add_argument('--from-store', action='store_true',
+                        help="从本地事件库生成日历，不请求接口")
+    add_date_range_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.serve and not args.daemon:
+        parser.error("--serve 需要与 --daemon 一起使用")
+    if args.from_store and args.daemon:
+        parser.error("--from-store 不能与 --daemon 一起使用")
+    date_range_from_args(args, parser)
+    return args
+
+
+def run_calendar(name, start_timestamp, end_timestamp, from_store=False):
+    """运行单个日历的完整流程，返回 (是否成功, 耗时秒数)"""
+    module_name, _, label = PIPELINES[name]
+    started = time.monotonic()
+    try:
+        # 按需导入，只生成财报日历时不会加载 openai 等依赖
+        module = importlib.import_module(module_name)
+        success = module.run_pipeline(start_timestamp, end_timestamp, show_guide=False, from_store=from_store)
+    except Exception as e:
+        logger.exception(f"{label}生成时发生未预期的错误: {e}")
+        success = False
+    return success, time.monotonic() - started
+
+
+def refresh_calendar(name, args):
+    """常驻模式下刷新单个日历，成功时返回事件发布时间戳列表，失败时返回 None"""
+    module_name, fetch_name, label = PIPELINES[name]
+    module = importlib.import_module(module_name)
+
+    # 每次刷新重新计算日期范围，跨周后自动切换到新的一周
+    start_timestamp, end_timestamp = date_range_from_args(args)
+    data = getattr(module, fetch_name)(start_timestamp, end_timestamp)
+    if not data:
+        logger.error(f"{label}数据获取失败")
+        return None
+
+    # 只有数据变化时才会重新生成和上传
+    if not module.run_pipeline(start_timestamp, end_timestamp, False, data):
+        return None
+    return module.watch_timestamps(data)
+
+
+def _fanout_after(job):
+    """包装任务：运行后按订阅定义文件重新生成额外的订阅（只有内容变化的订阅会被写入和上传）"""
+    def run():
+        result = job()
+        if result is not None:
+            publish_feeds()
+        return result
+    return run
+
+
+def _reload_after(job, store):
+    """包装任务：运行后重新加载订阅服务中的日历"""
+    def run():
+        try:
+            return job()
+        finally:
+            store.reload()
+    return run
+
+
+def run_daemon(args):
+    """常驻运行，直到收到 SIGINT/SIGTERM"""
+    jobs = {
+        name: (lambda name=name: refresh_calendar(name, args))
+        for name in args.calendars
+    }
+    if 'events' in args.calendars:
+        # 宏观事件发布后秒级轮询公布值，只修改对应事件并重新上传
+        from src.core.actuals_updater import update_actuals
+        jobs['actuals'] = update_actuals
+
+    if os.path.exists(FEEDS_CONFIG):
+        jobs = {name: _fanout_after(job) for name, job in jobs.items()}
+
+    server = None
+    if args.serve:
+        from src.core.feed_server import FeedStore, start_server
+        store = FeedStore()
+        server = start_server(store)
+        # 每次刷新后立即切换到新生成的文件，不必等待文件监视的下一次检查
+        jobs = {name: _reload_after(job, store) for name, job in jobs.items()}
+
+    try:
+        RefreshScheduler(jobs).run_forever()
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    if args.daemon:
+        return run_daemon(args)
+
+    start_timestamp, end_timestamp = date_range_from_args(args)
+
+    logger.info(f"开始生成日历: {', '.join(args.calendars)}")
+    started = time.monotonic()
+
+    # 每个日历一个线程：HTTP连接池、COS客户端和配置在进程内共享
+    with ThreadPoolExecutor(max_workers=len(args.calendars), thread_name_prefix="calendar") as executor:
+        futures = {
+            name: executor.submit(run_calendar, name, start_timestamp, end_timestamp, args.from_store)
+            for name in args.calendars
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, (success, elapsed) in results.items():
+        label = PIPELINES[name][2]
+        logger.info(f"{label}: {'成功' if success else '失败'}，耗时 {elapsed:.1f} 秒")
+
+    success = all(success for success, _ in results.values())
+    if os.path.exists(FEEDS_CONFIG):
+        # 数据只获取一次，按订阅定义文件从生成的目录中拼接出所有额外的订阅
+        success = publish_feeds() and success
+    logger.info(f"全部完成，总耗时 {time.monotonic() - started:.1f} 秒")
+
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Proximity-aware refresh scheduler for daemon mode
+"""
+
+import os
+import time
+import random
+import signal
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Union
+
+logger = logging.getLogger("scheduler")
+
+# 常驻模式的刷新节奏配置
+DAEMON_FAST_INTERVAL = float(os.environ.get('DAEMON_FAST_INTERVAL', '60'))  # 临近事件时的刷新间隔（秒）
+DAEMON_SLOW_INTERVAL = float(os.environ.get('DAEMON_SLOW_INTERVAL', '1800'))  # 没有临近事件时的刷新间隔（秒）
+DAEMON_RETRY_INTERVAL = float(os.environ.get('DAEMON_RETRY_INTERVAL', '300'))  # 刷新失败后的重试间隔（秒）
+DAEMON_PROXIMITY_MINUTES = float(os.environ.get('DAEMON_PROXIMITY_MINUTES', '10'))  # 事件前后多少分钟内视为临近
+DAEMON_JITTER = float(os.environ.get('DAEMON_JITTER', '0.1'))  # 刷新间隔的随机抖动比例
+
+# 任务：执行一次刷新，成功时返回事件发布时间戳列表（由调度器按临近程度决定下次刷新时间）
+# 或直接返回距离下次刷新的秒数，失败时返回 None
+RefreshJob = Callable[[], Union[List[int], float, None]]
+
+
+class RefreshScheduler:
+    """按事件临近程度调整刷新频率的调度器
+
+    每个任务独立调度：有事件在前后 proximity 秒内发布时按 fast_interval 快速刷新，
+    否则按 slow_interval 慢速刷新，但不会错过下一个事件临近窗口的开始。
+    """
+
+    def __init__(self, jobs: Dict[str, RefreshJob], fast_interval: float = None, slow_interval: float = None,
+                 retry_interval: float = None, proximity: float = None, jitter: float = None):
+        self.jobs = jobs
+        self.fast_interval = fast_interval or DAEMON_FAST_INTERVAL
+        self.slow_interval = slow_interval or DAEMON_SLOW_INTERVAL
+        self.retry_interval = retry_interval or DAEMON_RETRY_INTERVAL
+        self.proximity = proximity if proximity is not None else DAEMON_PROXIMITY_MINUTES * 60
+        self.jitter = jitter if jitter is not None else DAEMON_JITTER
+
+        self._next_run = {name: 0.0 for name in jobs}
+        self._stop = threading.Event()
+
+    def next_delay(self, timestamps: Iterable[int], now: float) -> float:
+        """根据事件发布时间计算距离下次刷新的秒数"""
+        timestamps = list(timestamps)
+        if any(abs(ts - now) <= self.proximity for ts in timestamps):
+            return self._with_jitter(self.fast_interval)
+
+        delay = self._with_jitter(self.slow_interval)
+        # 慢速刷新时，在下一个事件进入临近窗口时提前醒来
+        upcoming = [ts - self.proximity - now for ts in timestamps if ts - self.proximity > now]
+        if upcoming:
+            delay = min(delay, min(upcoming))
+        return max(delay, 1.0)
+
+    def _with_jitter(self, interval: float) -> float:
+        """为间隔加入随机抖动，避免多个实例同时请求"""
+        if self.jitter <= 0:
+            return interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _finish(self, name: str, future: Future):
+        """处理一个已完成的刷新，并安排下次刷新时间"""
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.exception(f"{name} 刷新时发生未预期的错误: {e}")
+            result = None
+
+        finished = time.time()
+        if result is None:
+            delay = self._with_jitter(self.retry_interval)
+            logger.warning(f"{name} 刷新失败，{delay:.0f} 秒后重试")
+        elif isinstance(result, (int, float)):
+            # 任务自行决定的间隔（如等待公布值时的秒级轮询），不加抖动
+            delay = result
+            logger.debug(f"{name} {delay:.0f} 秒后再次运行")
+        else:
+            delay = self.next_delay(result, finished)
+            logger.info(f"{name} 刷新完成，{delay:.0f} 秒后再次刷新")
+        self._next_run[name] = finished + delay
+
+    def run_forever(self):
+        """循环执行刷新任务，直到收到停止信号；正在进行的刷新会先完成再退出
+
+        各任务互不阻塞：一个日历刷新较慢时，另一个日历仍按自己的节奏刷新。
+        """
+        self._install_signal_handlers()
+        logger.info(
+            f"常驻模式启动: {', '.join(self.jobs)}，临近事件 {self.proximity / 60:.0f} 分钟内每 {self.fast_interval:.0f} 秒刷新，"
+            f"否则每 {self.slow_interval:.0f} 秒刷新"
+        )
+
+        running: Dict[str, Future] = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.jobs)), thread_name_prefix="refresh") as executor:
+            while not self._stop.is_set():
+                for name, future in list(running.items()):
+                    if future.done():
+                        del running[name]
+                        self._finish(name, future)
+
+                now = time.time()
+                for name, next_run in self._next_run.items():
+                    if name not in running and next_run <= now:
+                        running[name] = executor.submit(self.jobs[name])
+
+                idle = [next_run for name, next_run in self._next_run.items() if name not in running]
+                wait_seconds = max(0.0, min(idle) - time.time()) if idle else None
+                if running:
+                    # 有刷新进行中时等到其中一个完成，每秒检查一次停止信号
+                    timeout = 1.0 if wait_seconds is None else min(wait_seconds, 1.0)
+                    wait(list(running.values()), timeout=timeout, return_when=FIRST_COMPLETED)
+                elif wait_seconds is not None:
+                    self._stop.wait(wait_seconds)
+
+            # 等待进行中的刷新完成，避免写到一半的文件或状态
+            for name, future in running.items():
+                self._finish(name, future)
+
+        logger.info("常驻模式已停止")
+
+    def stop(self):
+        """请求停止调度（可在其他线程或信号处理函数中调用）"""
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        """收到 SIGINT/SIGTERM 时优雅退出（只能在主线程中注册）"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle(signum, frame):
+            logger.info(f"收到信号 {signal.Signals(signum).name}，完成当前刷新后退出")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
@@ -0,0 +1,111 @@
+"""
+Persisted per-UID sync state for incremental calendar regeneration
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("sync_state")
+
+# 状态文件格式版本；输出格式变化时递增，旧状态将被视为全部变化
+STATE_VERSION = 1
+
+
+def payload_hash(payload: Dict) -> str:
+    """计算事件内容的稳定哈希（键排序后的JSON）"""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class SyncDelta:
+    """本次运行相对上次同步的事件变化"""
+
+    __slots__ = ("added", "changed", "removed")
+
+    def __init__(self, added: List[str], changed: List[str], removed: List[str]):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def is_dirty(self, uid: str) -> bool:
+        """事件是否为新增或内容已变化"""
+        return uid in self.added or uid in self.changed
+
+    def __repr__(self):
+        return f"新增 {len(self.added)} 个, 变化 {len(self.changed)} 个, 删除 {len(self.removed)} 个"
+
+
+class SyncState:
+    """记录每个 UID 上次同步时的内容哈希（及可复用的附加数据），保存为JSON文件"""
+
+    def __init__(self, path: str, entries: Optional[Dict[str, Dict]] = None, pending_upload: bool = False):
+        self.path = path
+        self.entries: Dict[str, Dict] = entries or {}
+        self.pending_upload = pending_upload  # 文件已重新生成但尚未成功上传
+
+    @classmethod
+    def load(cls, path: str) -> 'SyncState':
+        """读取状态文件；文件不存在、损坏或版本不符时返回空状态"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"无法读取同步状态文件 {path}，将全量重新生成: {e}")
+            return cls(path)
+
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            logger.info(f"同步状态文件版本不一致，将全量重新生成: {path}")
+            return cls(path)
+
+        return cls(path, data.get("entries") or {}, bool(data.get("pending_upload")))
+
+    def get(self, uid: str) -> Optional[Dict]:
+        """返回上次同步时该 UID 的记录"""
+        return self.entries.get(uid)
+
+    def diff(self, hashes: Dict[str, str]) -> SyncDelta:
+        """将本次事件的 {uid: 哈希} 与上次状态比较"""
+        added = [uid for uid in hashes if uid not in self.entries]
+        changed = [
+            uid for uid, digest in hashes.items()
+            if uid in self.entries and self.entries[uid].get("hash") != digest
+        ]
+        removed = [uid for uid in self.entries if uid not in hashes]
+        return SyncDelta(added, changed, removed)
+
+    def replace(self, entries: Dict[str, Dict]):
+        """用本次生成的事件替换全部记录，并标记为待上传"""
+        self.entries = entries
+        self.pending_upload = True
+
+    def mark_uploaded(self):
+        """上传成功后清除待上传标记"""
+        self.pending_upload = False
+
+    def save(self):
+        """原子写入状态文件"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = {"version": STATE_VERSION, "pending_upload": self.pending_upload, "entries": self.entries}
+
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,181 @@
+"""
+Watchlists of tickers and company names for per-portfolio earnings calendars
+"""
+
+import os
+import re
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+logger = logging.getLogger("watchlist")
+
+# 关注列表目录：每个 <名称>.txt 文件是一个关注列表，生成 wsc_reports_<名称>.ics
+WATCHLIST_DIR = os.environ.get('WATCHLIST_DIR', 'watchlists')
+
+# 代码后缀/前缀 -> 统一的市场代码
+MARKET_ALIASES = {
+    'US': 'US', 'N': 'US', 'O': 'US', 'OQ': 'US', 'NYSE': 'US', 'NASDAQ': 'US',
+    'HK': 'HK', 'HKEX': 'HK',
+    'SH': 'SH', 'SS': 'SH', 'SSE': 'SH',
+    'SZ': 'SZ', 'SZSE': 'SZ',
+    'BJ': 'BJ', 'BSE': 'BJ',
+    'CN': 'CN',
+}
+
+_US_SYMBOL = re.compile(r'^[A-Z][A-Z0-9.]{0,9}$')
+_NAME_SUFFIX = re.compile(r'[-－](W|SW|S|B|R|WR|U)$', re.IGNORECASE)
+_NAME_NOISE = re.compile(r'[\s\-－_.,，。·()（）]+')
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+def _a_share_market(symbol: str) -> Optional[str]:
+    """根据6位A股代码的首位推断交易所"""
+    if symbol[0] in '659':
+        return 'SH'
+    if symbol[0] in '023':
+        return 'SZ'
+    if symbol[0] in '48':
+        return 'BJ'
+    return None
+
+
+def normalize_ticker(value: str) -> Optional[str]:
+    """将各种格式的股票代码统一为 代码.市场 形式，无法识别时返回 None
+
+    支持 TSLA.US、00700.HK、700.HK、000333.SZ、600519.SS、US:TSLA、SZ:002594、
+    以及不带市场的 TSLA（美股）、00700（港股）、600519（A股）。
+    """
+    value = (value or '').strip().upper()
+    if not value:
+        return None
+
+    market = None
+    prefix, sep, rest = value.partition(':')
+    if sep and prefix in MARKET_ALIASES:
+        market, symbol = MARKET_ALIASES[prefix], rest.strip()
+    else:
+        symbol, sep, suffix = value.rpartition('.')
+        if sep and suffix in MARKET_ALIASES:
+            market = MARKET_ALIASES[suffix]
+        else:
+            symbol = value
+
+    if market is None:
+        if symbol.isdigit():
+            market = 'HK' if len(symbol) <= 5 else 'CN'
+        else:
+            market = 'US'
+    if market == 'CN':
+        market = _a_share_market(symbol) if len(symbol) == 6 and symbol.isdigit() else None
+
+    if market == 'US':
+        symbol = symbol.replace('-', '.').replace('/', '.')
+        return f"{symbol}.US" if _US_SYMBOL.match(symbol) else None
+    if market == 'HK':
+        return f"{symbol.zfill(5)}.HK" if symbol.isdigit() and len(symbol) <= 5 else None
+    if market in ('SH', 'SZ', 'BJ'):
+        return f"{symbol}.{market}" if symbol.isdigit() and len(symbol) == 6 else None
+    return None
+
+
+def normalize_company_name(value: str) -> str:
+    """公司名称的匹配键：忽略大小写、空白、标点和港股的 -W/-SW 等后缀"""
+    value = _NAME_SUFFIX.sub('', (value or '').strip())
+    return _NAME_NOISE.sub('', value).casefold()
+
+
+class WatchlistIndex:
+    """所有关注列表合并后的哈希索引：代码/名称 -> 包含它的关注列表名称集合
+
+    每条财报只需一次代码规范化和两次字典查找，与关注列表的数量和长度无关。
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, str] = {}  # 关注列表名称 -> 来源文件
+        self.tickers: Dict[str, FrozenSet[str]] = {}
+        self.names: Dict[str, FrozenSet[str]] = {}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __iter__(self):
+        return iter(self.sources)
+
+    def add(self, watchlist: str, entries: Iterable[str], source: str = ''):
+        """添加一个关注列表
+
+        条目可以是股票代码或公司名称：无法识别为代码的条目按公司名称匹配，
+        以 name: 开头的条目（如 name:Tesla）总是作为公司名称匹配。
+        """
+        self.sources[watchlist] = source
+        tickers = names = 0
+        for entry in entries:
+            entry = entry.strip()
+            if not entry:
+                continue
+            if entry.lower().startswith('name:'):
+                key, index = normalize_company_name(entry[5:]), self.names
+            else:
+                key = normalize_ticker(entry)
+                index = self.tickers
+                if key is None:
+                    key, index = normalize_company_name(entry), self.names
+            if not key:
+                continue
+            index[key] = index.get(key, _EMPTY) | {watchlist}
+            if index is self.tickers:
+                tickers += 1
+            else:
+                names += 1
+        logger.info(f"关注列表 {watchlist}: {tickers} 个代码, {names} 个公司名称")
+
+    def match(self, code: Optional[str], company_name: Optional[str] = None) -> FrozenSet[str]:
+        """返回包含该代码或公司名称的关注列表"""
+        matched = self.tickers.get(normalize_ticker(code), _EMPTY) if code else _EMPTY
+        if company_name and self.names:
+            matched = matched | self.names.get(normalize_company_name(company_name), _EMPTY)
+        return matched
+
+    def is_stale(self, watchlist: str, output_path: str) -> bool:
+        """输出文件不存在或早于关注列表文件时需要重新生成"""
+        try:
+            output_mtime = os.path.getmtime(output_path)
+        except OSError:
+            return True
+        source = self.sources.get(watchlist)
+        return bool(source) and os.path.getmtime(source) > output_mtime
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> 'WatchlistIndex':
+        """读取目录中的所有 .txt 关注列表（每行一个或多个以逗号分隔的条目，# 开头为注释）"""
+        index = cls()
+        for watchlist, path in list_watchlists(directory).items():
+            try:
+                with open(path, 'r', encoding='utf-8-sig') as f:
+                    index.add(watchlist, _parse_entries(f), source=path)
+            except OSError as e:
+                logger.warning(f"读取关注列表失败 {path}: {e}")
+        return index
+
+
+def list_watchlists(directory: Optional[str] = None) -> Dict[str, str]:
+    """返回目录中的关注列表 {名称: 文件路径}，名称只能包含字母、数字、下划线和连字符"""
+    directory = directory or WATCHLIST_DIR
+    if not os.path.isdir(directory):
+        return {}
+    watchlists = {}
+    for filename in sorted(os.listdir(directory)):
+        watchlist, ext = os.path.splitext(filename)
+        if ext == '.txt' and re.match(r'^[\w-]+$', watchlist, re.ASCII):
+            watchlists[watchlist] = os.path.join(directory, filename)
+    return watchlists
+
+
+def _parse_entries(lines: Iterable[str]) -> List[str]:
+    """拆分关注列表文件的条目（逗号、制表符或换行分隔，忽略 # 之后的内容）"""
+    entries = []
+    for line in lines:
+        line = line.split('#', 1)[0]
+        entries.extend(re.split(r'[,，\t]', line))
+    return entries
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+
+from src.core import actuals_updater
+from src.core import fetch_event_calendar as events
+from src.core.ics_writer import write_calendar
+from src.core.records import decode_macro_events
+from src.core.sync_state import SyncState
+
+NOW = 1755088260.0
+RELEASED = 1755088200  # NOW 前一分钟发布
+UPCOMING = 1755091800  # NOW 后一小时发布
+
+CPI = {"id": 1001, "title": "美国7月CPI年率", "country": "美国", "importance": 3, "public_date": RELEASED,
+       "unit": "%", "forecast": "2.8", "previous": "2.7"}
+GDP = {"id": 1002, "title": "美国GDP", "country": "美国", "importance": 3, "public_date": UPCOMING}
+
+
+@pytest.fixture
+def calendar(tmp_path, monkeypatch):
+    """临时目录中的日历文件和同步状态，fetch 返回 calendar.items，上传结果记录在 calendar.uploads"""
+    monkeypatch.setattr(events, 'ICS_FILE', str(tmp_path / "events.ics"))
+    monkeypatch.setattr(events, 'SYNC_STATE_FILE', str(tmp_path / "sync_state.json"))
+    write_calendar(events.ICS_FILE, [
+        {"uid": "1001_wscn_macro", "name": "CPI", "begin": date(2025, 8, 13), "all_day": True, "description": "分析"},
+        {"uid": "1002_wscn_macro", "name": "GDP", "begin": date(2025, 8, 13), "all_day": True, "description": "分析"},
+    ])
+    state = SyncState(events.SYNC_STATE_FILE, {
+        "1001_wscn_macro": {"hash": "old", "public_date": RELEASED, "actual": "", "description": "分析"},
+        "1002_wscn_macro": {"hash": "old", "public_date": UPCOMING, "actual": "", "description": "分析"},
+    })
+    state.save()
+
+    class Calendar:
+        items = []
+        uploads = []
+        windows = []
+
+    def fetch(window):
+        Calendar.windows.append(window)
+        return decode_macro_events(Calendar.items)
+
+    monkeypatch.setattr(events, 'fetch_calendar_window', fetch)
+    monkeypatch.setattr(events, 'upload_to_cos', lambda path, key: Calendar.uploads.append(path) or True)
+    return Calendar
+
+
+def read_calendar():
+    with open(events.ICS_FILE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_find_waiting_events():
+    state = SyncState("unused", {
+        "released": {"public_date": RELEASED, "actual": ""},
+        "published": {"public_date": RELEASED, "actual": "2.9"},
+        "upcoming": {"public_date": UPCOMING, "actual": ""},
+        "expired": {"public_date": NOW - actuals_updater.ACTUALS_WATCH_MINUTES * 60 - 1, "actual": ""},
+    })
+    assert set(actuals_updater.find_waiting_events(state, NOW)) == {"released"}
+    assert actuals_updater.next_release(state, NOW) == UPCOMING
+
+
+def test_polls_until_actual_is_published(calendar):
+    calendar.items = [CPI]
+    assert actuals_updater.update_actuals(NOW) == actuals_updater.ACTUALS_POLL_INTERVAL
+    # 只请求覆盖发布时间的窄窗口
+    assert calendar.windows[0]['start'] <= RELEASED <= calendar.windows[0]['end']
+    assert calendar.windows[0]['end'] - calendar.windows[0]['start'] < 300
+    assert calendar.uploads == []
+
+
+def test_writes_actual_into_released_event_only(calendar):
+    calendar.items = [dict(CPI, actual="2.9"), GDP]
+    delay = actuals_updater.update_actuals(NOW)
+    # 没有其他等待中的事件时，在下一个事件发布时醒来
+    assert delay == min(actuals_updater.ACTUALS_IDLE_INTERVAL, UPCOMING - NOW)
+
+    content = read_calendar()
+    assert f"DESCRIPTION:{events.ACTUAL_PREFIX}: 2.9%  预期 2.8%  前值 2.7%\\n分析" in content
+    assert content.count("DESCRIPTION:分析") == 1
+    assert calendar.uploads == [events.ICS_FILE]
+
+    state = SyncState.load(events.SYNC_STATE_FILE)
+    assert state.get("1001_wscn_macro")["actual"] == "2.9"
+    assert state.get("1001_wscn_macro")["hash"] != "old"
+    assert not state.pending_upload
+
+    # 已写入公布值的事件不再轮询
+    assert actuals_updater.update_actuals(NOW + 1) == min(actuals_updater.ACTUALS_IDLE_INTERVAL, UPCOMING - NOW - 1)
+    assert len(calendar.windows) == 1
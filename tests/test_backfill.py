@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from src.core import backfill, event_store
+from src.core.backfill import Checkpoint
+from src.core.date_range import parse_date, resolve_date_range
+from src.core.records import EarningsReport, MacroEvent
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "backfill_state.json")
+    checkpoint = Checkpoint(path)
+    checkpoint.add('events', '2025-08-18~2025-08-24')
+    checkpoint.add('events', '2025-08-11~2025-08-17')
+    checkpoint.add('reports', '2025-08-18~2025-08-24')
+    checkpoint.save()
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data['completed']['events'] == ['2025-08-11~2025-08-17', '2025-08-18~2025-08-24']
+
+    loaded = Checkpoint.load(path)
+    assert loaded.is_done('events', '2025-08-11~2025-08-17')
+    assert loaded.is_done('reports', '2025-08-18~2025-08-24')
+    assert not loaded.is_done('reports', '2025-08-11~2025-08-17')
+
+
+@pytest.mark.parametrize("content", [None, "{not json", json.dumps({'version': 0, 'completed': {'events': ['x']}})])
+def test_missing_or_incompatible_checkpoint_starts_over(tmp_path, content):
+    path = tmp_path / "backfill_state.json"
+    if content is not None:
+        path.write_text(content, encoding="utf-8")
+    assert Checkpoint.load(str(path)).completed == {}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_store, 'EVENT_STORE_FILE', str(tmp_path / "events.sqlite3"))
+    monkeypatch.setattr(event_store, '_store', None)
+    yield event_store.get_event_store()
+    event_store._store.close()
+
+
+@pytest.fixture
+def fetchers(monkeypatch):
+    """按时间段返回一条记录的假获取函数，failing 中的时间段返回 None"""
+    calls = []
+    failing = set()
+
+    def make_fetcher(calendar, limiter):
+        def fetch(chunk):
+            calls.append((calendar, chunk['date']))
+            if (calendar, chunk['date']) in failing:
+                return None
+            if calendar == 'events':
+                return [MacroEvent(id=chunk['start'], title=chunk['date'], country="美国", public_date=chunk['start'])]
+            return [EarningsReport(id=chunk['start'], code="TSLA.US", public_date=chunk['start'])]
+        return fetch
+
+    monkeypatch.setattr(backfill, 'make_fetcher', make_fetcher)
+    monkeypatch.setattr(backfill, 'BACKFILL_BATCH_ROWS', 2)
+    return calls, failing
+
+
+def run(tmp_path, calendars=('events', 'reports'), **kwargs):
+    start_timestamp, end_timestamp = resolve_date_range(parse_date("2025-08-04"), parse_date("2025-08-24"))
+    return backfill.run_backfill(start_timestamp, end_timestamp, list(calendars), chunk_days=7, workers=3,
+                                 requests_per_second=1000, state_file=str(tmp_path / "backfill_state.json"), **kwargs)
+
+
+def test_backfill_writes_store_and_resumes_failed_chunks(tmp_path, store, fetchers):
+    calls, failing = fetchers
+    failing.add(('reports', '2025-08-11~2025-08-17'))
+    assert run(tmp_path) is False
+    assert len(calls) == 6
+    assert store.stats()['macro_events'] == 3
+    assert store.stats()['earnings_reports'] == 2
+
+    # 再次运行只重试失败的时间段
+    calls.clear()
+    failing.clear()
+    assert run(tmp_path) is True
+    assert calls == [('reports', '2025-08-11~2025-08-17')]
+    assert store.stats()['earnings_reports'] == 3
+
+    calls.clear()
+    assert run(tmp_path) is True and calls == []
+    assert run(tmp_path, calendars=['events'], restart=True) is True
+    assert sorted(calls) == [('events', '2025-08-04~2025-08-10'), ('events', '2025-08-11~2025-08-17'),
+                             ('events', '2025-08-18~2025-08-24')]
+
+
+def test_unexpected_errors_are_retried_on_next_run(tmp_path, store, fetchers, monkeypatch):
+    def make_fetcher(calendar, limiter):
+        def fetch(chunk):
+            raise RuntimeError("boom")
+        return fetch
+    monkeypatch.setattr(backfill, 'make_fetcher', make_fetcher)
+    assert run(tmp_path, calendars=['events']) is False
+    assert Checkpoint.load(str(tmp_path / "backfill_state.json")).completed == {}
+
+
+@pytest.mark.parametrize("argv", [
+    ["--from", "2025-08-24", "--to", "2025-08-18"],
+    ["--from", "2025-08-18", "--to", "2025-08-24", "--calendars", "quotes"],
+    ["--from", "2025-08-18", "--to", "2025-08-24", "--chunk-days", "0"],
+    ["--from", "2025-08-18", "--to", "2025-08-24", "--rps", "0"],
+    ["--from", "2025/08/18", "--to", "2025-08-24"],
+])
+def test_parse_args_rejects_invalid_arguments(argv):
+    with pytest.raises(SystemExit):
+        backfill.parse_args(argv)
+
+
+def test_parse_args():
+    args = backfill.parse_args(["--from", "2025-08-18", "--to", "2025-08-24", "--calendars", "reports, events,reports"])
+    assert args.calendars == ['reports', 'events']
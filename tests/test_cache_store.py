@@ -0,0 +1,93 @@
+import pytest
+
+from src.analysis import cache_store
+from src.analysis.cache_store import SQLiteCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_store, 'time', clock)
+    return clock
+
+
+def make_cache(tmp_path, **kwargs):
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_values_round_trip_and_persist(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", {"name": "非农", "values": [1, 2]})
+    assert cache.get("a") == {"name": "非农", "values": [1, 2]}
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get("a") == {"name": "非农", "values": [1, 2]}
+    reopened.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set("a", 1)
+    clock.now += 60
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_access_does_not_extend_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set("a", 1)
+    clock.now += 50
+    assert cache.get("a") == 1
+    clock.now += 20
+    assert cache.get("a") is None
+
+
+def test_evicts_least_recently_accessed(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1
+    clock.now += 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_evict_removes_expired_entries(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=10)
+    cache.set("a", 1)
+    clock.now += 5
+    cache.set("b", 2)
+    clock.now += 6
+    cache.evict()
+    assert cache.stats()["size"] == 1
+    assert cache.get("b") == 2
+
+
+def test_tables_are_independent(tmp_path):
+    first = make_cache(tmp_path, table="first")
+    second = make_cache(tmp_path, table="second")
+    first.set("a", 1)
+    assert second.get("a") is None
+
+
+def test_rejects_invalid_table_name(tmp_path):
+    with pytest.raises(ValueError):
+        make_cache(tmp_path, table="cache; DROP TABLE x")
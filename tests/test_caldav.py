@@ -0,0 +1,118 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src.core import caldav
+from src.core.caldav import DAV, CalDAVService, CalendarCollection, InvalidSyncToken
+from src.core.ics_writer import CRLF
+
+
+def make_calendar(**events):
+    blocks = [
+        CRLF.join(["BEGIN:VEVENT", f"SUMMARY:{summary}", f"UID:{uid}", "END:VEVENT"])
+        for uid, summary in events.items()
+    ]
+    return CRLF.join(["BEGIN:VCALENDAR", "VERSION:2.0", *blocks, "END:VCALENDAR"])
+
+
+def sync_request(token=""):
+    return (
+        '<?xml version="1.0"?><D:sync-collection xmlns:D="DAV:">'
+        f'<D:sync-token>{token}</D:sync-token><D:sync-level>1</D:sync-level>'
+        '<D:prop><D:getetag/></D:prop></D:sync-collection>'
+    ).encode("utf-8")
+
+
+def parse_sync_response(body):
+    """返回 ({href: 状态}, 新令牌)，状态为 'ok' 或 'deleted'"""
+    root = ET.fromstring(body)
+    results = {}
+    for response in root.findall(f"{{{DAV}}}response"):
+        href = response.find(f"{{{DAV}}}href").text
+        status = response.find(f"{{{DAV}}}status")
+        results[href.rsplit("/", 1)[1]] = "deleted" if status is not None and "404" in status.text else "ok"
+    return results, root.find(f"{{{DAV}}}sync-token").text
+
+
+@pytest.fixture
+def collection():
+    collection = CalendarCollection("events", "财经日历")
+    collection.update(make_calendar(a="CPI", b="GDP"))
+    return collection
+
+
+def test_changes_since_returns_only_later_versions(collection):
+    resources, deleted, first = collection.changes_since(None)
+    assert sorted(resource.uid for resource in resources) == ["a", "b"] and deleted == []
+
+    assert collection.update(make_calendar(a="CPI", b="GDP")) == (0, 0)
+    assert collection.update(make_calendar(a="CPI 修正", c="PPI")) == (2, 1)
+    resources, deleted, second = collection.changes_since(first)
+    assert sorted(resource.uid for resource in resources) == ["a", "c"]
+    assert deleted == ["b"]
+    assert collection.changes_since(second)[:2] == ([], [])
+
+
+def test_readded_event_is_no_longer_deleted(collection):
+    _, _, token = collection.changes_since(None)
+    collection.update(make_calendar(a="CPI"))
+    collection.update(make_calendar(a="CPI", b="GDP"))
+    resources, deleted, _ = collection.changes_since(token)
+    assert [resource.uid for resource in resources] == ["b"] and deleted == []
+
+
+@pytest.mark.parametrize("token", [
+    "http://example.com/other-token",
+    f"{caldav.SYNC_TOKEN_PREFIX}0-1",
+    f"{caldav.SYNC_TOKEN_PREFIX}{caldav._EPOCH}-x",
+    f"{caldav.SYNC_TOKEN_PREFIX}{caldav._EPOCH}-99",
+])
+def test_invalid_tokens(collection, token):
+    with pytest.raises(InvalidSyncToken):
+        collection.changes_since(token)
+
+
+def test_tombstones_older_than_retained_versions_are_pruned(collection, monkeypatch):
+    monkeypatch.setattr(caldav, 'CALDAV_TOMBSTONE_VERSIONS', 2)
+    _, _, old_token = collection.changes_since(None)  # 版本1
+    collection.update(make_calendar(a="CPI"))  # 版本2：删除 b
+    _, _, recent_token = collection.changes_since(None)
+    collection.update(make_calendar(a="CPI", c="PPI"))  # 版本3
+    collection.update(make_calendar(c="PPI"))  # 版本4：删除 a，丢弃版本2之前的墓碑
+
+    assert collection.min_version == 2
+    assert collection.tombstones == {"a": 4}
+    with pytest.raises(InvalidSyncToken):
+        collection.changes_since(old_token)
+    resources, deleted, _ = collection.changes_since(recent_token)
+    assert [resource.uid for resource in resources] == ["c"] and deleted == ["a"]
+
+
+def test_sync_collection_report(collection):
+    service = CalDAVService({"events": collection})
+    status, _, body = service.handle("REPORT", collection.href, "1", sync_request())
+    assert status == 207
+    results, token = parse_sync_response(body)
+    assert results == {"a.ics": "ok", "b.ics": "ok"}
+
+    collection.update(make_calendar(a="CPI"))
+    status, _, body = service.handle("REPORT", collection.href, "1", sync_request(token))
+    assert parse_sync_response(body)[0] == {"b.ics": "deleted"}
+
+
+def test_sync_collection_rejects_expired_token(collection):
+    service = CalDAVService({"events": collection})
+    status, _, body = service.handle("REPORT", collection.href, "1", sync_request(f"{caldav.SYNC_TOKEN_PREFIX}0-1"))
+    assert status == 403
+    assert ET.fromstring(body).find(f"{{{DAV}}}valid-sync-token") is not None
+
+
+def test_get_single_event_and_unknown_paths(collection):
+    service = CalDAVService({"events": collection})
+    status, headers, body = service.handle("GET", collection.resource_href("a"), "0", b"")
+    assert status == 200
+    assert headers["ETag"] == collection.resources["a"].etag
+    assert b"SUMMARY:CPI" in body and body.startswith(b"BEGIN:VCALENDAR")
+
+    assert service.handle("GET", collection.href + "missing.ics", "0", b"")[0] == 404
+    assert service.handle("PROPFIND", collection.href, "0", b"<not xml")[0] == 400
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+
+import pytest
+
+from src.core import common
+
+BODY = b"BEGIN:VCALENDAR\r\nSUMMARY:\xe7\xbe\x8e\xe5\x9b\xbdCPI\r\nEND:VCALENDAR"
+DIGEST = hashlib.sha256(BODY).hexdigest()
+
+
+class FakeCosClient:
+    def __init__(self, objects=None, head_error=None):
+        self.objects = objects or {}
+        self.head_error = head_error
+        self.puts = []
+
+    def head_object(self, Bucket, Key):
+        if self.head_error:
+            raise self.head_error
+        if Key not in self.objects:
+            raise RuntimeError("NoSuchKey")
+        return self.objects[Key]
+
+    def put_object(self, **kwargs):
+        self.puts.append(kwargs)
+
+
+@pytest.fixture
+def calendar_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, "COS_SECRET_ID", "id")
+    monkeypatch.setattr(common, "COS_SECRET_KEY", "key")
+    monkeypatch.setattr(common, "COS_BUCKET", "bucket")
+    monkeypatch.setattr(common, "COS_CONTENT_ENCODING", "identity")
+    monkeypatch.setattr(common, "COS_BROTLI_VARIANT", False)
+    monkeypatch.setattr(common, "COS_CACHE_CONTROL", "")
+    monkeypatch.setattr(common, "COS_EXPIRES_SECONDS", 0)
+    monkeypatch.setattr(common, "is_github_actions", False)
+    path = tmp_path / "wsc_events.ics"
+    path.write_bytes(BODY)
+    return str(path)
+
+
+def use_client(monkeypatch, client):
+    monkeypatch.setattr(common, "get_cos_client", lambda: client)
+    return client
+
+
+def test_gzip_encoding_is_deterministic():
+    encoded = common.encode_body(BODY, 'gzip')
+    assert gzip.decompress(encoded) == BODY
+    assert common.encode_body(BODY, 'gzip') == encoded
+    assert common.encode_body(BODY, 'identity') is BODY
+    with pytest.raises(ValueError):
+        common.encode_body(BODY, 'deflate')
+
+
+def test_object_headers(monkeypatch):
+    assert common.cos_object_headers('identity') == {'ContentType': 'text/calendar; charset=utf-8'}
+    monkeypatch.setattr(common, "COS_CACHE_CONTROL", "public, max-age=3600")
+    monkeypatch.setattr(common, "COS_EXPIRES_SECONDS", 3600)
+    headers = common.cos_object_headers('gzip')
+    assert headers['ContentEncoding'] == 'gzip'
+    assert headers['CacheControl'] == "public, max-age=3600"
+    assert headers['Expires'].endswith(" GMT")
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ('identity', 'identity'),
+    ('gzip', 'gzip'),
+    ('deflate', 'identity'),
+])
+def test_resolve_content_encoding(encoding, expected):
+    assert common._resolve_content_encoding(encoding) == expected
+
+
+def test_brotli_falls_back_to_identity_when_not_installed(monkeypatch):
+    monkeypatch.setattr(common, "_brotli_available", lambda: False)
+    assert common._resolve_content_encoding('br') == 'identity'
+    monkeypatch.setattr(common, "_brotli_available", lambda: True)
+    assert common._resolve_content_encoding('br') == 'br'
+
+
+def test_upload_stores_content_hash_and_headers(calendar_file, monkeypatch):
+    client = use_client(monkeypatch, FakeCosClient())
+    monkeypatch.setattr(common, "COS_CONTENT_ENCODING", "gzip")
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    [put] = client.puts
+    assert put['Key'] == "calendar/wsc_events.ics"
+    assert put['Metadata'] == {common.COS_HASH_METADATA: DIGEST}
+    assert put['ContentType'] == common.ICS_CONTENT_TYPE
+    assert put['ContentEncoding'] == 'gzip'
+    assert gzip.decompress(put['Body']) == BODY
+
+
+def test_upload_skips_unchanged_object(calendar_file, monkeypatch):
+    client = use_client(monkeypatch, FakeCosClient({
+        "calendar/wsc_events.ics": {'Content-Length': '1', 'X-Cos-Meta-Sha256': DIGEST},
+    }))
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert client.puts == []
+
+    # 关闭检查后总是上传
+    monkeypatch.setattr(common, "COS_SKIP_UNCHANGED", False)
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert len(client.puts) == 1
+
+
+@pytest.mark.parametrize("remote, settings", [
+    ({'X-Cos-Meta-Sha256': "0" * 64}, {}),
+    ({'X-Cos-Meta-Sha256': DIGEST}, {'COS_CONTENT_ENCODING': 'gzip'}),
+    ({'X-Cos-Meta-Sha256': DIGEST, 'Content-Encoding': 'gzip'}, {}),
+    ({'X-Cos-Meta-Sha256': DIGEST}, {'COS_CACHE_CONTROL': 'max-age=60'}),
+])
+def test_upload_when_content_or_headers_differ(calendar_file, monkeypatch, remote, settings):
+    for name, value in settings.items():
+        monkeypatch.setattr(common, name, value)
+    client = use_client(monkeypatch, FakeCosClient({"calendar/wsc_events.ics": remote}))
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert len(client.puts) == 1
+
+
+def test_upload_when_remote_object_is_unavailable(calendar_file, monkeypatch):
+    client = use_client(monkeypatch, FakeCosClient(head_error=RuntimeError("timeout")))
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert len(client.puts) == 1
+
+
+def test_brotli_variant_is_skipped_without_brotli(calendar_file, monkeypatch):
+    client = use_client(monkeypatch, FakeCosClient())
+    monkeypatch.setattr(common, "COS_BROTLI_VARIANT", True)
+
+    def encode_body(body, encoding):
+        if encoding == 'br':
+            raise ImportError("No module named 'brotli'")
+        return body
+    monkeypatch.setattr(common, "encode_body", encode_body)
+    assert common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert [put['Key'] for put in client.puts] == ["calendar/wsc_events.ics"]
+
+
+def test_upload_fails_without_file_or_config(calendar_file, tmp_path, monkeypatch):
+    client = use_client(monkeypatch, FakeCosClient())
+    assert not common.upload_to_cos(str(tmp_path / "missing.ics"), "calendar/missing.ics")
+    monkeypatch.setattr(common, "COS_BUCKET", "")
+    assert not common.upload_to_cos(calendar_file, "calendar/wsc_events.ics")
+    assert client.puts == []
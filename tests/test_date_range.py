@@ -0,0 +1,85 @@
+import argparse
+from datetime import datetime
+
+import pytest
+
+from src.core import fetch_report_calendar
+from src.core.date_range import (
+    CHINA_TZ, add_date_range_arguments, current_week_start, date_range_from_args, halve_window,
+    parse_date, resolve_date_range, split_windows
+)
+
+MONDAY = 1755446400  # 2025-08-18 00:00:00 北京时间
+DAY = 86400
+
+
+def make_parser():
+    parser = argparse.ArgumentParser()
+    add_date_range_arguments(parser)
+    return parser
+
+
+def test_parse_date_rejects_invalid_format():
+    assert parse_date("2025-08-18").timestamp() == MONDAY
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_date("2025/08/18")
+
+
+def test_current_week_start():
+    now = CHINA_TZ.localize(datetime(2025, 8, 21, 15, 30))
+    assert current_week_start(now).timestamp() == MONDAY
+
+
+def test_resolve_date_range_by_weeks_and_end():
+    start = parse_date("2025-08-18")
+    assert resolve_date_range(start) == (MONDAY, MONDAY + 7 * DAY - 1)
+    assert resolve_date_range(start, weeks=2) == (MONDAY, MONDAY + 14 * DAY - 1)
+    assert resolve_date_range(start, parse_date("2025-08-20")) == (MONDAY, MONDAY + 3 * DAY - 1)
+
+
+def test_resolve_date_range_defaults_to_current_week():
+    now = CHINA_TZ.localize(datetime(2025, 8, 24, 23, 0))
+    assert resolve_date_range(now=now) == (MONDAY, MONDAY + 7 * DAY - 1)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"end": parse_date("2025-08-17")},
+    {"end": parse_date("2025-08-20"), "weeks": 2},
+    {"weeks": 0},
+    {"weeks": -1},
+])
+def test_resolve_date_range_rejects_invalid_ranges(kwargs):
+    with pytest.raises(ValueError):
+        resolve_date_range(parse_date("2025-08-18"), **kwargs)
+
+
+def test_end_and_weeks_are_mutually_exclusive():
+    with pytest.raises(SystemExit):
+        make_parser().parse_args(["--end", "2025-08-20", "--weeks", "2"])
+
+
+def test_date_range_from_args_reports_errors_through_parser(capsys):
+    parser = make_parser()
+    args = parser.parse_args(["--start", "2025-08-10", "--end", "2025-08-01"])
+    with pytest.raises(ValueError):
+        date_range_from_args(args)
+    with pytest.raises(SystemExit) as exc_info:
+        date_range_from_args(args, parser)
+    assert exc_info.value.code == 2
+    assert "早于开始日期" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv", [["--weeks", "-1"], ["--weeks", "0"], ["--start", "2025-08-10", "--end", "2025-08-01"]])
+def test_fetcher_rejects_invalid_range_before_fetching(argv):
+    with pytest.raises(SystemExit):
+        fetch_report_calendar.parse_args(argv)
+
+
+def test_split_and_halve_windows():
+    windows = split_windows(MONDAY, MONDAY + 7 * DAY - 1, 3)
+    assert [window['date'] for window in windows] == ["2025-08-18~2025-08-20", "2025-08-21~2025-08-23", "2025-08-24"]
+    assert windows[-1]['end'] == MONDAY + 7 * DAY - 1
+
+    left, right = halve_window(windows[0])
+    assert (left['start'], left['end'], right['end']) == (MONDAY, MONDAY + DAY - 1, MONDAY + 3 * DAY - 1)
+    assert halve_window(windows[-1]) is None
@@ -0,0 +1,214 @@
+import re
+import copy
+import json
+import types
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.analysis import event_analyzer
+from src.analysis.cache_store import SQLiteCache
+from src.analysis.event_analyzer import EventAnalyzer, FALLBACK_ANALYSIS, analysis_cache_key
+
+EVENT_DATE = datetime(2025, 8, 1, 20, 30)
+ANALYSIS = {"investment_opportunities": [{"type": "行业", "target": "银行", "rationale": "降息"}]}
+
+
+@pytest.fixture
+def analyzer(monkeypatch, tmp_path):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setattr(event_analyzer, 'load_env', lambda: False)
+    analyzer = EventAnalyzer(cache=SQLiteCache(str(tmp_path / "analysis.sqlite3")))
+    analyzer.calls = []
+
+    def analyze(event_summary, event_date, related_info):
+        analyzer.calls.append(event_summary)
+        return copy.deepcopy(analyzer.result)
+
+    analyzer.result = ANALYSIS
+    monkeypatch.setattr(analyzer, 'search_related_info', lambda event_summary, event_date: [])
+    monkeypatch.setattr(analyzer, 'analyze_investment_opportunity', analyze)
+    return analyzer
+
+
+def test_cache_key_depends_on_content():
+    key = analysis_cache_key(1, "美国非农", EVENT_DATE, "前值 20万")
+    assert key.startswith("1:")
+    assert key == analysis_cache_key(1, "美国非农", EVENT_DATE, "前值 20万")
+    assert key != analysis_cache_key(2, "美国非农", EVENT_DATE, "前值 20万")
+    assert key != analysis_cache_key(1, "美国CPI", EVENT_DATE, "前值 20万")
+    assert key != analysis_cache_key(1, "美国非农", datetime(2025, 8, 2, 20, 30), "前值 20万")
+    assert key != analysis_cache_key(1, "美国非农", EVENT_DATE, "")
+
+
+def test_cache_key_includes_prompt_version(monkeypatch):
+    key = analysis_cache_key(1, "美国非农", EVENT_DATE)
+    monkeypatch.setattr(event_analyzer, 'PROMPT_VERSION', 'next')
+    assert analysis_cache_key(1, "美国非农", EVENT_DATE) != key
+
+
+def test_analyze_event_uses_cache(analyzer):
+    assert analyzer.analyze_event(1, "美国非农", EVENT_DATE) == ANALYSIS
+    assert analyzer.analyze_event(1, "美国非农", EVENT_DATE) == ANALYSIS
+    assert analyzer.calls == ["美国非农"]
+
+
+def test_failed_analysis_is_not_cached(analyzer):
+    analyzer.result = FALLBACK_ANALYSIS
+    analyzer.analyze_event(1, "美国非农", EVENT_DATE)
+    analyzer.result = {}
+    analyzer.analyze_event(1, "美国非农", EVENT_DATE)
+    analyzer.result = ANALYSIS
+    assert analyzer.analyze_event(1, "美国非农", EVENT_DATE) == ANALYSIS
+    assert analyzer.calls == ["美国非农"] * 3
+    assert analyzer.cache.stats()["size"] == 1
+
+
+def make_events(*summaries):
+    return [{'id': index, 'summary': summary, 'date': EVENT_DATE} for index, summary in enumerate(summaries)]
+
+
+@pytest.fixture
+def async_analyzer(analyzer, monkeypatch):
+    """异步分析按标题中的数字延迟返回，标题含“失败”时抛出异常"""
+    analyzer.active = analyzer.peak = 0
+
+    async def analyze(event_summary, event_date, related_info):
+        analyzer.active += 1
+        analyzer.peak = max(analyzer.peak, analyzer.active)
+        try:
+            analyzer.calls.append(event_summary)
+            await asyncio.sleep(int(event_summary[-1]) / 100)
+            if "失败" in event_summary:
+                raise RuntimeError(event_summary)
+            return {"summary": event_summary}
+        finally:
+            analyzer.active -= 1
+
+    monkeypatch.setattr(analyzer, 'analyze_investment_opportunity_async', analyze)
+    return analyzer
+
+
+def test_analyze_many_keeps_input_order(async_analyzer):
+    results = async_analyzer.analyze_many(make_events("事件3", "事件1", "事件2"), concurrency=3)
+    assert results == [{"summary": "事件3"}, {"summary": "事件1"}, {"summary": "事件2"}]
+
+
+def test_analyze_many_isolates_failures(async_analyzer):
+    results = async_analyzer.analyze_many(make_events("事件1", "失败2", "事件1"))
+    assert results == [{"summary": "事件1"}, None, {"summary": "事件1"}]
+
+
+def test_analyze_many_limits_concurrency(async_analyzer):
+    async_analyzer.analyze_many(make_events(*[f"事件{i}" for i in range(1, 7)]), concurrency=2)
+    assert async_analyzer.peak == 2
+    assert len(async_analyzer.calls) == 6
+
+
+def test_analyze_many_reads_cache(async_analyzer):
+    async_analyzer.analyze_many(make_events("事件1"))
+    assert async_analyzer.analyze_many(make_events("事件1", "事件2")) == [{"summary": "事件1"}, {"summary": "事件2"}]
+    assert async_analyzer.calls == ["事件1", "事件2"]
+
+
+def test_analyze_many_without_events(async_analyzer):
+    assert async_analyzer.analyze_many([]) == []
+
+
+class FakeCompletions:
+    """按提示词中的事件返回分析结果的假 chat.completions；reply 决定每次请求返回哪些事件"""
+
+    def __init__(self):
+        self.requests = []
+        self.active = self.peak = 0
+        self.reply = lambda summaries: summaries
+
+    async def create(self, **kwargs):
+        prompt = kwargs['messages'][1]['content']
+        event_ids = re.findall(r"### 事件ID: (\S+)", prompt)
+        summaries = re.findall(r"- 事件：(.+)", prompt)
+        self.requests.append(summaries)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.active -= 1
+
+        answered = self.reply(summaries)
+        if answered is None:
+            content = "not json"
+        elif not event_ids:
+            content = json.dumps(make_analysis(summaries[0]), ensure_ascii=False)
+        else:
+            content = json.dumps([
+                dict(make_analysis(summary), event_id=event_id)
+                for event_id, summary in zip(event_ids, summaries) if summary in answered
+            ], ensure_ascii=False)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def make_analysis(summary):
+    return {
+        "investment_opportunities": [{"type": "行业", "target": summary, "rationale": "测试"}],
+        "potential_risks": [],
+        "potential_returns": {}
+    }
+
+
+@pytest.fixture
+def completions(analyzer, monkeypatch):
+    completions = FakeCompletions()
+
+    async def close():
+        pass
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions), close=close)
+    monkeypatch.setattr(analyzer, '_get_async_client', lambda: client)
+    analyzer._async_client = client
+    return completions
+
+
+def test_batches_events_into_requests(analyzer, completions):
+    events = make_events(*[f"事件{i}" for i in range(5)])
+    results = analyzer.analyze_many(events, batch_size=2)
+    assert results == [make_analysis(f"事件{i}") for i in range(5)]
+    assert sorted(completions.requests) == [["事件0", "事件1"], ["事件2", "事件3"], ["事件4"]]
+
+
+def test_unparsable_batch_is_split_until_single_events(analyzer, completions):
+    completions.reply = lambda summaries: summaries if len(summaries) == 1 else None
+    results = analyzer.analyze_many(make_events("事件0", "事件1", "事件2", "事件3"), batch_size=4)
+    assert results == [make_analysis(f"事件{i}") for i in range(4)]
+    assert sorted(map(len, completions.requests)) == [1, 1, 1, 1, 2, 2, 4]
+
+
+def test_missing_events_are_retried_alone(analyzer, completions):
+    completions.reply = lambda summaries: [summary for summary in summaries if summary != "事件1"]
+    results = analyzer.analyze_many(make_events("事件0", "事件1", "事件2"), batch_size=3)
+    assert results == [make_analysis(f"事件{i}") for i in range(3)]
+    assert completions.requests == [["事件0", "事件1", "事件2"], ["事件1"]]
+
+
+def test_single_event_fallback_is_not_cached(analyzer, completions):
+    completions.reply = lambda summaries: None
+    results = analyzer.analyze_many(make_events("事件0", "事件1"), batch_size=2)
+    assert results == [FALLBACK_ANALYSIS, FALLBACK_ANALYSIS]
+    assert analyzer.cache.stats()["size"] == 0
+
+
+def test_batches_read_and_write_cache(analyzer, completions):
+    analyzer.analyze_many(make_events("事件0"), batch_size=2)
+    results = analyzer.analyze_many(make_events("事件0", "事件1"), batch_size=2)
+    assert results == [make_analysis("事件0"), make_analysis("事件1")]
+    assert completions.requests == [["事件0"], ["事件1"]]
+
+
+def test_split_retries_stay_under_concurrency_limit(analyzer, completions):
+    completions.reply = lambda summaries: summaries if len(summaries) == 1 else None
+    events = make_events(*[f"事件{i}" for i in range(16)])
+    results = analyzer.analyze_many(events, concurrency=2, batch_size=8)
+    assert results == [make_analysis(f"事件{i}") for i in range(16)]
+    assert completions.peak == 2
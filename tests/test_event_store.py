@@ -0,0 +1,71 @@
+import pytest
+
+from src.core.event_store import EventStore
+from src.core.records import EarningsReport, MacroEvent
+
+# 2025-08-18 20:30 / 2025-08-19 10:00 / 2025-08-20 22:00 北京时间
+T1, T2, T3 = 1755520200, 1755568800, 1755698400
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "store" / "events.sqlite3"))
+    yield store
+    store.close()
+
+
+def macro(id, public_date, country="美国", importance=3, title="美国CPI", **kwargs):
+    return MacroEvent(id=id, title=title, country=country, importance=importance, public_date=public_date, **kwargs)
+
+
+def test_upsert_counts_only_new_or_changed_rows(store):
+    events = [macro(1, T1), macro(2, T2, country="中国", title="中国GDP"), macro(3, None)]
+    assert store.upsert_macro_events(events) == 2
+    assert store.upsert_macro_events(events) == 0
+    assert store.upsert_macro_events([macro(1, T1, actual="2.7%")]) == 1
+    assert store.stats() == {'macro_events': 2, 'earnings_reports': 0, 'analyses': 0}
+    assert store.query_macro_events()[0].actual == "2.7%"
+
+
+def test_query_macro_events(store):
+    store.upsert_macro_events([
+        macro(1, T1),
+        macro(2, T2, country="中国", importance=2, title="中国GDP"),
+        macro(3, T3, country="US", importance=1, title="美联储主席讲话"),
+    ])
+    ids = lambda rows: [event.id for event in rows]
+    assert ids(store.query_macro_events()) == [1, 2, 3]
+    assert ids(store.query_macro_events(T2, T3)) == [2, 3]
+    assert ids(store.query_macro_events(countries=["US"])) == [1, 3]
+    assert ids(store.query_macro_events(countries=["中国"], min_importance=2)) == [2]
+    assert ids(store.query_macro_events(keyword="美联储")) == [3]
+    assert ids(store.query_macro_events(limit=1)) == [1]
+
+
+def test_query_reports_by_ticker_and_market(store):
+    store.upsert_reports([
+        EarningsReport(id=1, company_name="特斯拉", code="TSLA", country="美国", public_date=T1),
+        EarningsReport(id=2, company_name="腾讯控股", code="700.HK", country="香港", public_date=T2),
+        EarningsReport(id=3, company_name="贵州茅台", code="600519.SH", country="中国", public_date=T3),
+    ])
+    ids = lambda rows: [report.id for report in rows]
+    assert ids(store.query_reports(tickers=["00700.HK", "tsla.us"])) == [1, 2]
+    assert ids(store.query_reports(markets=["CN"])) == [3]
+    assert ids(store.query_reports(start_timestamp=T2)) == [2, 3]
+
+
+def test_analyses_round_trip(store):
+    store.save_analyses({'a': ('h1', "描述"), 'b': ('h2', '')})
+    assert store.get_analyses(['a', 'b', 'c']) == {'a': ('h1', "描述")}
+    store.save_analyses({'a': ('h3', "新描述")})
+    assert store.get_analyses(['a']) == {'a': ('h3', "新描述")}
+
+
+def test_store_persists_across_connections(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    store = EventStore(path)
+    store.upsert_macro_events([macro(1, T1)])
+    store.close()
+    store = EventStore(path)
+    assert [event.title for event in store.query_macro_events()] == ["美国CPI"]
+    store.close()
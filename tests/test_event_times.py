@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.date_range import CHINA_TZ
+from src.core.event_times import apply_event_time, convert_timestamps
+from src.core.ics_writer import event_sort_key
+
+
+def convert_one(public_date):
+    """此前逐个用 pytz 转换和判断的方式，返回 (begin, end, 日期, 排序键, 是否待定)"""
+    event_datetime = datetime.fromtimestamp(public_date, tz=CHINA_TZ)
+    is_midnight = event_datetime.hour == 0 and event_datetime.minute == 0 and event_datetime.second == 0
+    is_odd_time = event_datetime.minute not in [0, 15, 30, 45]
+    if is_midnight or is_odd_time:
+        begin, end = event_datetime.date(), None
+    else:
+        begin, end = event_datetime, event_datetime + timedelta(hours=2)
+    pending = is_odd_time and not is_midnight
+    return begin, end, event_datetime.strftime('%Y-%m-%d'), event_sort_key(begin, 'uid', CHINA_TZ), pending
+
+
+def make_timestamps(count, base):
+    random.seed(count)
+    minutes = [0, 0, 30, 45, 2, 17]
+    return [
+        base + random.randrange(3650) * 86400 + random.randrange(24) * 3600 + random.choice(minutes) * 60
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("base", [
+    1577808000,  # 2020-01-01 北京时间，固定 UTC+8
+    515520000,   # 1986-05-04，北京时间实行夏令时的年份
+])
+def test_matches_per_row_conversion(base):
+    timestamps = make_timestamps(2000, base)
+    for public_date, event_time in zip(timestamps, convert_timestamps(timestamps)):
+        begin, end, day, sort_key, pending = convert_one(public_date)
+        assert (event_time.begin, event_time.end, event_time.day) == (begin, end, day)
+        assert event_time.sort_key('uid') == sort_key
+        assert event_time.all_day == (end is None)
+        assert event_time.pending == pending
+        assert event_time.local_datetime() == datetime.fromtimestamp(public_date, tz=CHINA_TZ)
+
+
+def test_timed_events_render_same_utc_time():
+    timestamps = [1755088200, 1755106200]
+    for public_date, event_time in zip(timestamps, convert_timestamps(timestamps)):
+        begin, end, _, _, _ = convert_one(public_date)
+        assert event_time.begin.timestamp() == begin.timestamp()
+        assert event_time.end.timestamp() == end.timestamp()
+
+
+def test_invalid_timestamps_become_none():
+    values = [None, 0, '1755088200', True, -1, 10 ** 13, 1755088200]
+    result = convert_timestamps(values)
+    assert result[:6] == [None] * 6
+    assert result[6] is not None
+    assert convert_timestamps([]) == []
+
+
+def test_apply_event_time_marks_pending_events():
+    timed, midnight, odd = convert_timestamps([1755088200, 1755014400, 1755106320])
+
+    event = {'name': 'CPI'}
+    apply_event_time(event, timed)
+    assert event['end'] == timed.end and 'all_day' not in event
+
+    event = {'name': '大会'}
+    apply_event_time(event, midnight)
+    assert event == {'name': '大会', 'begin': midnight.begin, 'all_day': True}
+
+    event = {'name': '讲话'}
+    apply_event_time(event, odd)
+    assert event['name'] == '讲话 (待定)' and event['all_day'] is True
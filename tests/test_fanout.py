@@ -0,0 +1,146 @@
+import json
+import os
+
+import pytest
+
+from src.core import fanout
+from src.core.fanout import FeedDefinition, load_feed_definitions, render_feeds
+from src.core.feed_index import FeedIndex
+from src.core.publisher import PublishResult
+
+
+def write_config(tmp_path, feeds):
+    path = tmp_path / "feeds.json"
+    path.write_text(json.dumps({'feeds': feeds}), encoding="utf-8")
+    return str(path)
+
+
+def make_index(prefix, attributes):
+    chunks = [f"BEGIN:VEVENT\r\nUID:{prefix}{i}\r\nEND:VEVENT\r\n".encode() for i in range(len(attributes))]
+    return FeedIndex(b"BEGIN:VCALENDAR\r\n", chunks, attributes)
+
+
+def test_example_config_is_valid():
+    definitions = load_feed_definitions(os.path.join(os.path.dirname(__file__), "..", "feeds.example.json"))
+    assert [definition.name for definition in definitions] == ['us_macro', 'asia_macro', 'hk_reports', 'combined']
+    assert definitions[2].output == os.path.join("calendar_files", "wsc_hk_reports.ics")
+    assert definitions[2].object_key == "calendar/hk_reports.ics"
+
+
+def test_missing_config_means_no_feeds(tmp_path):
+    assert load_feed_definitions(str(tmp_path / "missing.json")) == []
+
+
+def test_definition_accepts_comma_separated_sources():
+    definition = FeedDefinition.from_dict({'name': 'mixed', 'sources': 'events, reports,events'})
+    assert definition.sources == ['events', 'reports']
+    assert definition.object_key == "calendar/wsc_mixed.ics"
+
+
+@pytest.mark.parametrize("data, message", [
+    ({'name': 'bad name', 'sources': ['events']}, "订阅名称"),
+    ({'name': 'x', 'sources': []}, "来源无效"),
+    ({'name': 'x', 'sources': ['quotes']}, "来源无效"),
+    ({'name': 'x', 'sources': ['reports'], 'filter': 'country=US'}, "不支持按 country"),
+    ({'name': 'x', 'sources': ['events'], 'filter': 'market=HK&importance>=2'}, "不支持按 market"),
+    ({'name': 'x', 'sources': ['events'], 'filter': 'foo=1'}, "foo"),
+])
+def test_invalid_definitions_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        FeedDefinition.from_dict(data)
+
+
+@pytest.mark.parametrize("feed", [
+    {'name': 'events', 'sources': ['events']},
+    {'name': 'events_all', 'sources': ['events']},
+    {'name': 'reports_tech', 'sources': ['reports']},
+    {'name': 'x', 'sources': ['events'], 'output': 'out/wsc_reports.ics'},
+    {'name': 'x', 'sources': ['events'], 'object_key': 'calendar/wsc_events.ics'},
+])
+def test_feeds_cannot_overwrite_builtin_calendars(tmp_path, feed):
+    with pytest.raises(ValueError, match="内置日历冲突"):
+        load_feed_definitions(write_config(tmp_path, [feed]))
+
+
+@pytest.mark.parametrize("feeds, message", [
+    ([{'name': 'a', 'sources': ['events']}, {'name': 'a', 'sources': ['reports']}], "订阅名称重复"),
+    ([{'name': 'a', 'sources': ['events'], 'output': 'out/x.ics'},
+      {'name': 'b', 'sources': ['events'], 'output': 'out/./x.ics'}], "输出文件或对象键重复"),
+    ([{'name': 'a', 'sources': ['events']},
+      {'name': 'b', 'sources': ['events'], 'object_key': 'calendar/wsc_a.ics'}], "输出文件或对象键重复"),
+])
+def test_duplicate_feeds_are_rejected(tmp_path, feeds, message):
+    with pytest.raises(ValueError, match=message):
+        load_feed_definitions(write_config(tmp_path, feeds))
+
+
+def test_render_feeds_filters_each_source_by_its_own_fields():
+    indexes = {
+        'events': make_index('e', [
+            {'country': 'US', 'importance': 3, 'date': '2025-08-18'},
+            {'country': 'CN', 'importance': 1, 'date': '2025-08-19'},
+        ]),
+        'reports': make_index('r', [
+            {'market': 'US', 'date': '2025-08-18'},
+            {'market': 'HK', 'date': '2025-08-20'},
+        ]),
+    }
+    definitions = [
+        FeedDefinition('combined', ['events', 'reports'], 'country=US&importance=3&market=US'),
+        FeedDefinition('late', ['events', 'reports'], 'start=2025-08-19'),
+        FeedDefinition('macro', ['events'], 'country=CN'),
+    ]
+    bodies = render_feeds(definitions, indexes)
+    assert bodies['combined'] == (
+        b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:e0\r\nEND:VEVENT\r\n"
+        b"BEGIN:VEVENT\r\nUID:r0\r\nEND:VEVENT\r\nEND:VCALENDAR"
+    )
+    assert b"UID:e1" in bodies['late'] and b"UID:r1" in bodies['late']
+    assert b"UID:e0" not in bodies['late'] and b"UID:r0" not in bodies['late']
+    assert b"UID:e1" in bodies['macro'] and b"UID:r" not in bodies['macro']
+
+
+def test_render_feeds_skips_feeds_without_generated_sources():
+    indexes = {'events': make_index('e', [{'country': 'US', 'importance': 3, 'date': '2025-08-18'}])}
+    bodies = render_feeds([FeedDefinition('hk', ['reports'], 'market=HK')], indexes)
+    assert bodies == {}
+
+
+def test_publish_feeds_writes_only_changed_feeds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fanout, "FANOUT_STATE_FILE", str(tmp_path / "state.json"))
+    index = make_index('e', [{'country': 'US', 'importance': 3, 'date': '2025-08-18'}])
+    monkeypatch.setattr(fanout.FeedIndex, "from_files", classmethod(lambda cls, path: index))
+    uploads = []
+
+    class FakePublisher:
+        def __init__(self, workers=None):
+            pass
+
+        def publish(self, entries):
+            uploads.extend(key for _, key in entries)
+            return [PublishResult(path, key, PublishResult.UPLOADED) for path, key in entries]
+    monkeypatch.setattr(fanout, "CosPublisher", FakePublisher)
+    config = write_config(tmp_path, [{'name': 'us', 'sources': ['events'], 'filter': 'country=US'}])
+
+    assert fanout.publish_feeds(config)
+    assert uploads == ["calendar/wsc_us.ics"]
+    assert b"UID:e0" in (tmp_path / "calendar_files" / "wsc_us.ics").read_bytes()
+
+    # 内容没有变化时不重新写入或上传
+    assert fanout.publish_feeds(config)
+    assert uploads == ["calendar/wsc_us.ics"]
+
+
+def test_publish_feeds_reports_invalid_config(tmp_path):
+    config = write_config(tmp_path, [{'name': 'events', 'sources': ['events']}])
+    assert fanout.publish_feeds(config) is False
+
+
+def test_render_feeds_merges_sources_by_start_time():
+    events = FeedIndex(b"BEGIN:VCALENDAR\r\n", [b"e0\r\n", b"e1\r\n"], [{'date': '2025-08-18'}, {'date': '2025-08-20'}],
+                       sort_keys=[(100, 'e0'), (300, 'e1')])
+    reports = FeedIndex(b"BEGIN:VCALENDAR\r\n", [b"r0\r\n", b"r1\r\n"], [{'date': '2025-08-19'}, {'date': '2025-08-21'}],
+                        sort_keys=[(200, 'r0'), (300, 'a')])
+    bodies = render_feeds([FeedDefinition('all', ['events', 'reports'])], {'events': events, 'reports': reports})
+    assert bodies['all'] == b"BEGIN:VCALENDAR\r\ne0\r\nr0\r\nr1\r\ne1\r\nEND:VCALENDAR"
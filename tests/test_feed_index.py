@@ -0,0 +1,121 @@
+import json
+from datetime import date
+
+import pytest
+
+from src.core.feed_index import FeedIndex, index_path_for, parse_query, write_catalog
+
+
+def make_index(attributes, fields=None):
+    chunks = [f"BEGIN:VEVENT\r\nUID:{i}\r\nEND:VEVENT\r\n".encode() for i in range(len(attributes))]
+    return FeedIndex(b"BEGIN:VCALENDAR\r\n", chunks, attributes, fields=fields)
+
+
+ATTRIBUTES = [
+    {'country': 'US', 'importance': 3, 'date': '2025-08-18'},
+    {'country': 'CN', 'importance': 2, 'date': '2025-08-19'},
+    {'country': 'JP', 'importance': 1, 'date': '2025-08-20'},
+    {'market': 'HK', 'date': '2025-08-21'},
+    {'country': 'US', 'importance': 1},
+]
+
+
+def test_parse_query_normalizes_conditions():
+    conditions = parse_query("country=美国, cn & importance>=2&start=2025-08-18&&")
+    assert conditions == (
+        ('country', '=', ('CN', 'US')),
+        ('date', '>=', '2025-08-18'),
+        ('importance', '>=', 2),
+    )
+    # 条件顺序不同时得到相同的缓存键
+    assert parse_query("importance>=2&start=2025-08-18&country=US,CN") == conditions
+    assert parse_query("end=2025-08-24") == (('date', '<=', '2025-08-24'),)
+    assert parse_query("") == ()
+
+
+@pytest.mark.parametrize("query", [
+    "foo=1",
+    "country",
+    "country>=US",
+    "importance=x",
+    "importance>=1,2",
+    "date=2025/08/18",
+    "market=",
+])
+def test_parse_query_rejects_invalid_conditions(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", [0, 1, 2, 3, 4]),
+    ("country=US", [0, 4]),
+    ("country!=US", [1, 2]),
+    ("importance>=2", [0, 1]),
+    ("importance<2", [2, 4]),
+    ("market=HK", [3]),
+    ("market!=HK", []),
+    ("start=2025-08-19&end=2025-08-20", [1, 2]),
+    ("date=2025-08-18,2025-08-21", [0, 3]),
+    ("date!=2025-08-18", [1, 2, 3]),
+    ("date>2025-08-19", [2, 3]),
+    ("date<2025-08-19", [0]),
+    ("country=US&importance=3", [0]),
+    ("country=DE", []),
+])
+def test_select_excludes_events_without_the_field(query, expected):
+    assert make_index(ATTRIBUTES).select(parse_query(query)) == expected
+
+
+def test_select_rejects_fields_the_catalog_does_not_index():
+    index = make_index([{'market': 'HK', 'date': '2025-08-21'}])
+    assert index.fields == {'market', 'date'}
+    with pytest.raises(ValueError, match="country, importance"):
+        index.select(parse_query("importance>=2&country=US&market=HK"))
+
+    # 明确声明的字段即使没有事件带有该属性也可以筛选
+    index = make_index([{'date': '2025-08-21'}], fields=['market', 'date', 'unknown'])
+    assert index.fields == {'market', 'date'}
+    assert index.select(parse_query("market=HK")) == []
+
+
+def test_render_concatenates_selected_chunks():
+    index = make_index(ATTRIBUTES)
+    body, count = index.render(parse_query("country=CN,JP"))
+    assert count == 2
+    assert body == b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:1\r\nEND:VEVENT\r\nBEGIN:VEVENT\r\nUID:2\r\nEND:VEVENT\r\nEND:VCALENDAR"
+
+
+def test_catalog_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.ics")
+    events = [
+        ({'uid': 'a', 'name': '美国CPI', 'begin': date(2025, 8, 18), 'all_day': True},
+         {'country': 'US', 'importance': 3, 'date': '2025-08-18'}),
+        ({'uid': 'b', 'name': '中国GDP', 'begin': date(2025, 8, 19), 'all_day': True},
+         {'country': 'CN', 'importance': 2, 'date': '2025-08-19'}),
+        ({'uid': 'c', 'name': '未知国家事件', 'begin': date(2025, 8, 20), 'all_day': True},
+         {'country': '', 'importance': 3, 'date': '2025-08-20'}),
+    ]
+    assert write_catalog(path, events) == 3
+
+    with open(index_path_for(path), encoding="utf-8") as f:
+        data = json.load(f)
+    assert data['fields'] == ['country', 'date', 'importance']
+    assert data['events']['c'] == {'importance': 3, 'date': '2025-08-20'}
+
+    index = FeedIndex.from_files(path)
+    assert len(index) == 3
+    assert index.select(parse_query("country=US")) == [0]
+    body, count = index.render(parse_query("importance>=3"))
+    assert count == 2
+    assert b"UID:a" in body and b"UID:c" in body and b"UID:b" not in body
+    assert body.startswith(b"BEGIN:VCALENDAR") and body.endswith(b"END:VCALENDAR")
+    with pytest.raises(ValueError):
+        index.select(parse_query("market=HK"))
+
+
+def test_applicable_keeps_only_indexed_fields():
+    index = make_index([{'market': 'HK', 'date': '2025-08-21'}])
+    conditions = parse_query("country=US&market=HK&start=2025-08-18")
+    assert index.applicable(conditions) == (('date', '>=', '2025-08-18'), ('market', '=', ('HK',)))
+    assert index.select(index.applicable(conditions)) == [0]
@@ -0,0 +1,164 @@
+import gzip
+import http.client
+import os
+import threading
+from datetime import date
+
+import pytest
+
+from src.core import feed_server
+from src.core.feed_index import write_catalog
+from src.core.feed_server import FeedStore, _accepts_gzip, create_server
+
+CALENDAR = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + "BEGIN:VEVENT\r\nSUMMARY:财报\r\nEND:VEVENT\r\n" * 50 + "END:VCALENDAR"
+
+
+@pytest.fixture
+def feed(tmp_path):
+    """在随机端口启动订阅服务，返回 request(方法, 路径, 请求头) -> (响应, 正文)"""
+    path = tmp_path / "events.ics"
+    path.write_text(CALENDAR, encoding="utf-8")
+    catalog = str(tmp_path / "reports.ics")
+    write_catalog(catalog, [
+        ({'uid': 'hk', 'name': '腾讯控股', 'begin': date(2025, 8, 13), 'all_day': True},
+         {'market': 'HK', 'date': '2025-08-13'}),
+        ({'uid': 'us', 'name': '苹果', 'begin': date(2025, 8, 14), 'all_day': True},
+         {'market': 'US', 'date': '2025-08-14'}),
+        ({'uid': 'unknown', 'name': '未知市场', 'begin': date(2025, 8, 14), 'all_day': True},
+         {'market': None, 'date': '2025-08-14'}),
+    ])
+    store = FeedStore({'/events.ics': str(path), '/reports.ics': catalog}, {'/reports.ics': catalog})
+    store.reload()
+    server = create_server(store, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method="GET", route="/events.ics", headers=None, body=None):
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        try:
+            connection.request(method, route, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            connection.close()
+
+    request.path = path
+    request.store = store
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_serves_calendar_with_cache_headers(feed):
+    response, body = feed()
+    assert response.status == 200
+    assert body.decode("utf-8") == CALENDAR
+    assert response.getheader("Content-Type") == "text/calendar; charset=utf-8"
+    assert response.getheader("ETag").startswith('"')
+    assert response.getheader("Last-Modified")
+    assert response.getheader("Vary") == "Accept-Encoding"
+    assert response.getheader("Content-Encoding") is None
+
+
+def test_gzip_has_its_own_etag(feed):
+    plain, _ = feed()
+    response, body = feed(headers={"Accept-Encoding": "gzip"})
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body).decode("utf-8") == CALENDAR
+    assert len(body) < len(CALENDAR.encode("utf-8"))
+    assert response.getheader("ETag") != plain.getheader("ETag")
+
+    response, _ = feed(headers={"Accept-Encoding": "gzip;q=0"})
+    assert response.getheader("Content-Encoding") is None
+
+
+def test_conditional_requests(feed):
+    response, _ = feed()
+    etag, last_modified = response.getheader("ETag"), response.getheader("Last-Modified")
+
+    response, body = feed(headers={"If-None-Match": f'W/{etag}'})
+    assert response.status == 304 and body == b""
+    assert response.getheader("ETag") == etag
+
+    response, _ = feed(headers={"If-Modified-Since": last_modified})
+    assert response.status == 304
+    # If-None-Match 优先于 If-Modified-Since
+    response, _ = feed(headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status == 200
+
+
+def test_reload_picks_up_new_file(feed):
+    response, _ = feed()
+    etag = response.getheader("ETag")
+
+    feed.path.write_text(CALENDAR.replace("财报", "宏观"), encoding="utf-8")
+    stat = feed.path.stat()
+    os.utime(feed.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    feed.store.reload()
+
+    response, body = feed(headers={"If-None-Match": etag})
+    assert response.status == 200
+    assert "宏观".encode("utf-8") in body
+
+
+def test_head_and_unknown_route(feed):
+    response, body = feed("HEAD")
+    assert response.status == 200 and body == b""
+    assert int(response.getheader("Content-Length")) == len(CALENDAR.encode("utf-8"))
+
+    response, _ = feed(route="/missing.ics")
+    assert response.status == 404
+
+
+@pytest.mark.parametrize("header, accepted", [
+    ("gzip, deflate", True),
+    ("br;q=1.0, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip(header, accepted):
+    assert _accepts_gzip(header) is accepted
+
+
+def test_caldav_propfind(feed):
+    body = b'<?xml version="1.0"?><D:propfind xmlns:D="DAV:"><D:prop><D:displayname/></D:prop></D:propfind>'
+    response, content = feed("PROPFIND", "/caldav/events/", {"Depth": "0"}, body)
+    assert response.status == 207
+    assert b"<D:displayname>events.ics</D:displayname>" in content
+
+
+def test_caldav_rejects_oversized_request_body(feed, monkeypatch):
+    monkeypatch.setattr(feed_server, 'CALDAV_MAX_REQUEST_BYTES', 16)
+    response, _ = feed("REPORT", "/caldav/events/", body=b"<x/>" * 10)
+    assert response.status == 413
+    assert response.getheader("Connection") == "close"
+
+    response, _ = feed("PROPFIND", "/caldav/events/", {"Content-Length": "-5"})
+    assert response.status == 400
+
+
+def test_filtered_subscription(feed):
+    response, body = feed(route="/reports.ics?market=HK")
+    assert response.status == 200
+    assert b"UID:hk" in body and b"UID:us" not in body and b"UID:unknown" not in body
+    etag = response.getheader("ETag")
+
+    response, body = feed(route="/reports.ics?market!=HK")
+    assert b"UID:us" in body and b"UID:unknown" not in body
+
+    response, _ = feed(route="/reports.ics?market=HK", headers={"If-None-Match": etag})
+    assert response.status == 304
+
+
+@pytest.mark.parametrize("route", ["/reports.ics?country=US", "/reports.ics?foo=1"])
+def test_filtered_subscription_rejects_unsupported_conditions(feed, route):
+    response, body = feed(route=route)
+    assert response.status == 400
+    assert body
+
+
+def test_filter_on_route_without_catalog(feed):
+    response, _ = feed(route="/events.ics?country=US")
+    assert response.status == 404
@@ -0,0 +1,153 @@
+import copy
+
+import pytest
+
+from src.analysis.event_analyzer import FALLBACK_ANALYSIS, EventAnalyzer
+from src.analysis.surprise import SURPRISE_PREFIX
+from src.core import event_store
+from src.core import fetch_event_calendar as events
+from src.core.records import decode_macro_events
+from src.core.sync_state import SyncState
+
+MACRO = [
+    {"id": 1001, "title": "美国7月CPI年率", "country": "美国", "importance": 3, "public_date": 1755088200,
+     "event": "CPI", "quantity": "2.7", "unit": "%", "foresight": "前瞻", "forecast": "2.8", "previous": "2.7"},
+    {"id": 1002, "title": "中国具身智能大会", "country": "中国", "importance": 3, "public_date": 1755014400},
+    {"id": 1003, "title": "美联储讲话", "country": "美国", "importance": 3, "public_date": 1755106320},
+    {"id": 1004, "title": "欧元区GDP", "country": "欧元区", "importance": 3, "public_date": 1755106200},
+    {"id": 1005, "title": "美国PPI", "country": "美国", "importance": 2, "public_date": 1755106200},
+]
+
+ANALYSIS = {
+    "related_sectors": {"companies": ["特斯拉(US:TSLA)"]},
+    "investment_opportunities": [{"type": "个股", "target": "特斯拉", "rationale": "降息预期"}],
+    "potential_risks": [],
+    "potential_returns": {"catalysts": ["通胀回落"]},
+}
+
+TRACKED = {'1001_wscn_macro', '1002_wscn_macro', '1003_wscn_macro'}
+
+
+class FakeAnalyzer:
+    """按预设结果返回分析的分析器，记录每次分析的事件"""
+
+    format_analysis_for_calendar = EventAnalyzer.format_analysis_for_calendar
+
+    def __init__(self, calls, result):
+        self.calls = calls
+        self.result = result
+
+    def analyze_many(self, items):
+        self.calls.extend(item['summary'] for item in items)
+        return [copy.deepcopy(self.result) for _ in items]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """在临时目录中运行 pycreate_ics_file，返回 run(事件, 分析结果) -> (返回值, 本次分析的事件)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(event_store, 'EVENT_STORE_FILE', str(tmp_path / "events.sqlite3"))
+    monkeypatch.setattr(event_store, '_store', None)
+    state_path = str(tmp_path / "sync_state.json")
+
+    def run(items, result=ANALYSIS):
+        calls = []
+        monkeypatch.setattr(events, 'create_event_analyzer', lambda: FakeAnalyzer(calls, result))
+        monkeypatch.setattr(events, 'close_event_analyzer', lambda analyzer: None)
+        sync_state = SyncState.load(state_path)
+        created = events.pycreate_ics_file(decode_macro_events(items), sync_state)
+        sync_state.save()
+        return created, calls
+
+    run.state_path = state_path
+    yield run
+    store = event_store._store
+    if store is not None:
+        store.close()
+
+
+def read_calendar():
+    with open(events.ICS_FILE, encoding="utf-8") as f:
+        return f.read()
+
+
+def stored_descriptions(state_path):
+    entries = SyncState.load(state_path).entries
+    return {uid for uid, entry in entries.items() if entry.get('description')}
+
+
+def test_analyzes_tracked_events_and_skips_unchanged_runs(pipeline):
+    created, calls = pipeline(MACRO)
+    assert created is True
+    assert sorted(calls) == ['🇨🇳 中国具身智能大会', '🇺🇸 美国7月CPI年率', '🇺🇸 美联储讲话 (待定)']
+    assert read_calendar().count("降息预期") == 3
+    assert stored_descriptions(pipeline.state_path) == TRACKED
+    assert set(event_store.get_event_store().get_analyses(TRACKED)) == TRACKED
+
+    # 事件没有变化时不分析也不写文件
+    created, calls = pipeline(MACRO)
+    assert created is None and calls == []
+
+
+def test_reuses_descriptions_of_unchanged_events(pipeline):
+    pipeline(MACRO)
+    changed = copy.deepcopy(MACRO)
+    changed[2]['foresight'] = "新的前瞻"
+
+    created, calls = pipeline(changed)
+    assert created is True
+    assert calls == ['🇺🇸 美联储讲话 (待定)']
+    assert read_calendar().count("降息预期") == 3
+
+
+def test_reuses_stored_analyses_without_state_file(pipeline):
+    pipeline(MACRO)
+    SyncState(pipeline.state_path).save()
+
+    created, calls = pipeline(MACRO)
+    assert created is True and calls == []
+    assert read_calendar().count("降息预期") == 3
+
+
+@pytest.mark.parametrize("result", [{}, None, FALLBACK_ANALYSIS])
+def test_failed_analyses_are_not_reused(pipeline, result):
+    created, calls = pipeline(MACRO, result)
+    assert created is True and len(calls) == 3
+    calendar = read_calendar()
+    assert "投资机会" not in calendar and "无法解析" not in calendar
+    # 分析失败时使用基本描述
+    assert "📊 CPI" in calendar
+    assert stored_descriptions(pipeline.state_path) == set()
+    assert event_store.get_event_store().get_analyses(TRACKED) == {}
+
+    # 事件没有变化也会重新分析失败的事件
+    created, calls = pipeline(MACRO)
+    assert created is True and len(calls) == 3
+    assert read_calendar().count("降息预期") == 3
+    assert stored_descriptions(pipeline.state_path) == TRACKED
+
+
+def test_regenerates_from_event_store(pipeline):
+    events.save_to_event_store(decode_macro_events(MACRO))
+    stored = events.load_from_event_store(1755014400, 1755088200)
+    assert [event.id for event in stored] == [1002, 1001]
+    assert stored == decode_macro_events([MACRO[1], MACRO[0]])
+
+
+def test_surprise_line_is_replaced_once_actual_is_published(pipeline):
+    history = [
+        dict(MACRO[0], id=900 + month, title=f"美国{month}月CPI年率", public_date=1755088200 - (7 - month) * 2629800,
+             actual=f"{2.5 + month / 10:.1f}")
+        for month in range(2, 7)
+    ]
+    events.save_to_event_store(decode_macro_events(history))
+    upcoming = [MACRO[0]]
+
+    pipeline(upcoming)
+    calendar = read_calendar()
+    assert f"DESCRIPTION:{SURPRISE_PREFIX}: 近5次" in calendar
+
+    description = events.add_surprise_line("分析", decode_macro_events(upcoming)[0],
+                                           events.load_event_surprise_profiles())
+    published = decode_macro_events([dict(MACRO[0], actual="2.9")])[0]
+    assert events.add_actual_line(description, published) == f"{events.ACTUAL_PREFIX}: 2.9%  预期 2.8%  前值 2.7%\n分析"
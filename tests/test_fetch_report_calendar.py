@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytz
+
+from src.core import fetch_report_calendar
+from src.core.records import EarningsReport
+from src.core.watchlist import WatchlistIndex
+
+SHANGHAI = pytz.timezone("Asia/Shanghai")
+
+
+def report(id, code, hour, day=18, minute=0):
+    public_date = int(SHANGHAI.localize(datetime(2025, 8, day, hour, minute)).timestamp())
+    return EarningsReport(id=id, company_name=f"公司{id}", code=code, country="美国", public_date=public_date)
+
+
+REPORTS = [
+    report(3, "TSLA.US", 21),
+    report(1, "AAPL.US", 0, day=19),
+    report(2, "00700.HK", 16),
+    report(4, "NVDA.US", 0),
+]
+
+
+def test_report_events_are_sorted_by_start_then_uid():
+    uids = [cal_event['uid'] for cal_event, _ in fetch_report_calendar.iter_report_events(REPORTS)]
+    # 全天事件按北京时间当天 00:00 排序
+    assert uids == ["4_wscn_report", "2_wscn_report", "3_wscn_report", "1_wscn_report"]
+    assert uids == [cal_event['uid'] for cal_event, _ in fetch_report_calendar.iter_report_events(REPORTS[::-1])]
+
+
+def test_watchlist_calendars_are_sorted_and_identical_across_runs(tmp_path):
+    watchlists = WatchlistIndex()
+    watchlists.add("tech", ["TSLA.US", "AAPL.US", "NVDA.US"])
+    path = str(tmp_path / "wsc_reports_tech.ics")
+
+    assert fetch_report_calendar.create_watchlist_ics_files(REPORTS, watchlists, {"tech": path}) == {"tech": 3}
+    with open(path, "rb") as f:
+        first = f.read()
+    text = first.decode("utf-8")
+    positions = [text.index(f"UID:{id}_wscn_report") for id in (4, 3, 1)]
+    assert positions == sorted(positions)
+
+    fetch_report_calendar.create_watchlist_ics_files(REPORTS[::-1], watchlists, {"tech": path})
+    with open(path, "rb") as f:
+        assert f.read() == first
@@ -0,0 +1,88 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from urllib3.util.retry import RequestHistory
+
+from src.core import http_client
+from src.core.http_client import JitteredRetry
+
+
+@pytest.fixture
+def server():
+    """依次返回预设状态码的本地HTTP服务，记录收到的请求方法"""
+    state = {'statuses': [], 'methods': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            state['methods'].append(self.command)
+            status = state['statuses'].pop(0) if state['statuses'] else 200
+            body = b'{"ok": true}'
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    state['url'] = f"http://127.0.0.1:{httpd.server_port}/"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_BACKOFF_FACTOR', 0.001)
+    session = http_client._build_session()
+    yield session
+    session.close()
+
+
+def test_get_retries_temporary_errors(server, session):
+    server['statuses'] = [503, 429, 502]
+    response = session.get(server['url'], timeout=5)
+    assert response.status_code == 200
+    assert server['methods'] == ['GET'] * 4
+
+
+def test_get_returns_last_response_when_retries_are_exhausted(server, session):
+    server['statuses'] = [503] * 10
+    response = session.get(server['url'], timeout=5)
+    assert response.status_code == 503
+    assert len(server['methods']) == http_client.HTTP_MAX_RETRIES + 1
+
+
+def test_post_is_not_retried(server, session):
+    server['statuses'] = [503]
+    assert session.post(server['url'], data=b"x", timeout=5).status_code == 503
+    assert server['methods'] == ['POST']
+
+
+def test_backoff_adds_jitter_and_is_capped(monkeypatch):
+    def retry_after(errors):
+        history = tuple(RequestHistory('GET', '/', None, 503, None) for _ in range(errors))
+        return JitteredRetry(total=20, backoff_factor=1, history=history)
+
+    assert retry_after(0).get_backoff_time() == 0
+    # 第3次连续失败的基础退避为4秒，抖动后落在 [2, 6] 秒
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: low)
+    assert retry_after(3).get_backoff_time() == 2
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: high)
+    assert retry_after(3).get_backoff_time() == 6
+    assert retry_after(12).get_backoff_time() == http_client.HTTP_BACKOFF_MAX
+
+
+def test_shared_session_is_reused():
+    http_client.close_session()
+    try:
+        assert http_client.get_session() is http_client.get_session()
+    finally:
+        http_client.close_session()
@@ -0,0 +1,147 @@
+import os
+from datetime import date, datetime
+
+import pytest
+import pytz
+
+from src.core.ics_writer import (
+    StreamingCalendarWriter, block_sort_key, escape_text, event_sort_key, fold_line, format_utc,
+    patch_event_descriptions, render_event, unescape_text, write_calendar
+)
+
+SHANGHAI = pytz.timezone("Asia/Shanghai")
+
+
+def test_escape_text_round_trip():
+    value = "数据;预期,前值\\备注\n下一行"
+    escaped = escape_text(value)
+    assert escaped == "数据\\;预期\\,前值\\\\备注\\n下一行"
+    assert unescape_text(escaped) == value
+
+
+def test_escape_text_normalizes_carriage_returns():
+    assert escape_text("a\r\nb\rc\nd") == "a\\nb\\nc\\nd"
+    assert "\\r" not in escape_text("line\r")
+
+
+def test_fold_line_keeps_multibyte_characters():
+    line = "DESCRIPTION:" + "投资分析" * 30
+    parts = fold_line(line).split("\r\n")
+    assert len(parts) > 1
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert all(part.startswith(" ") for part in parts[1:])
+    assert parts[0] + "".join(part[1:] for part in parts[1:]) == line
+
+
+def test_short_lines_are_not_folded():
+    assert fold_line("SUMMARY:CPI") == "SUMMARY:CPI"
+
+
+def test_format_utc_converts_timezone():
+    assert format_utc(SHANGHAI.localize(datetime(2025, 8, 13, 20, 30))) == "20250813T123000Z"
+
+
+def test_render_timed_event():
+    begin = SHANGHAI.localize(datetime(2025, 8, 13, 20, 30))
+    end = SHANGHAI.localize(datetime(2025, 8, 13, 21, 0))
+    assert render_event("uid-1", "美国CPI", begin, end, description="预期 3.0%").split("\r\n") == [
+        "BEGIN:VEVENT",
+        "DESCRIPTION:预期 3.0%",
+        "DTEND:20250813T130000Z",
+        "DTSTART:20250813T123000Z",
+        "SUMMARY:美国CPI",
+        "UID:uid-1",
+        "END:VEVENT",
+    ]
+
+
+def test_render_all_day_event():
+    single = render_event("uid-2", "财报", date(2025, 8, 13), date(2025, 8, 14), all_day=True)
+    assert "DTSTART;VALUE=DATE:20250813" in single
+    assert "DTEND" not in single
+
+    spanning = render_event("uid-3", "会议", date(2025, 8, 13), date(2025, 8, 16), all_day=True)
+    assert "DTEND;VALUE=DATE:20250816" in spanning
+
+
+def test_all_day_events_sort_as_local_midnight():
+    midnight = SHANGHAI.localize(datetime(2025, 8, 13))
+    assert event_sort_key(date(2025, 8, 13), "b", SHANGHAI) == (int(midnight.timestamp()), "b")
+    keys = sorted([
+        event_sort_key(SHANGHAI.localize(datetime(2025, 8, 13, 8, 0)), "timed", SHANGHAI),
+        event_sort_key(date(2025, 8, 13), "b", SHANGHAI),
+        event_sort_key(date(2025, 8, 13), "a", SHANGHAI),
+    ])
+    assert [uid for _, uid in keys] == ["a", "b", "timed"]
+
+
+@pytest.mark.parametrize("begin, all_day", [
+    (SHANGHAI.localize(datetime(2025, 8, 13, 20, 30)), False),
+    (date(2025, 8, 13), True),
+])
+def test_block_sort_key_matches_event_sort_key(begin, all_day):
+    block = render_event("uid-1", "事件", begin, begin, all_day=all_day)
+    assert block_sort_key(block, SHANGHAI) == event_sort_key(begin, "uid-1", SHANGHAI)
+
+
+def test_write_calendar_replaces_file_atomically(tmp_path):
+    path = str(tmp_path / "calendar.ics")
+    events = [{"uid": "uid-1", "name": "财报", "begin": date(2025, 8, 13), "all_day": True}]
+    assert write_calendar(path, events) == 1
+
+    with open(path, encoding="utf-8", newline="") as f:
+        content = f.read()
+    assert content.startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+    assert content.endswith("END:VEVENT\r\nEND:VCALENDAR")
+    assert os.listdir(tmp_path) == ["calendar.ics"]
+
+
+def test_write_calendar_without_events_keeps_existing_file(tmp_path):
+    path = tmp_path / "calendar.ics"
+    path.write_text("old")
+    assert write_calendar(str(path), []) == 0
+    assert path.read_text() == "old"
+
+
+def test_writer_aborts_on_error(tmp_path):
+    path = tmp_path / "calendar.ics"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with StreamingCalendarWriter(str(path)) as writer:
+            writer.write_event("uid-1", "财报", date(2025, 8, 13), all_day=True)
+            raise RuntimeError("中断")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["calendar.ics"]
+
+
+def test_patch_event_descriptions_only_touches_selected_events(tmp_path):
+    path = str(tmp_path / "calendar.ics")
+    begin = SHANGHAI.localize(datetime(2025, 8, 13, 20, 30))
+    write_calendar(path, [
+        {"uid": "a", "name": "CPI", "begin": begin, "description": "分析;" + "长描述" * 30},
+        {"uid": "b", "name": "GDP", "begin": begin},
+        {"uid": "c", "name": "PPI", "begin": begin, "description": "不变"},
+    ], fold=True)
+
+    patched = patch_event_descriptions(path, {
+        "a": lambda description: "公布值\n" + description,
+        "b": lambda description: description + "新描述",
+        "c": lambda description: description,
+    })
+    assert patched == ["a", "b"]
+
+    with open(path, encoding="utf-8", newline="") as f:
+        lines = f.read().split("\r\n")
+    assert "DESCRIPTION:公布值\\n分析\\;" + "长描述" * 30 in lines
+    # 没有描述的事件按 render_event 的属性顺序插入 DESCRIPTION
+    b_start = lines.index("UID:b") - 3
+    assert lines[b_start:b_start + 4] == ["DESCRIPTION:新描述", "DTSTART:20250813T123000Z", "SUMMARY:GDP", "UID:b"]
+    assert "DESCRIPTION:不变" in lines
+
+
+def test_patch_without_changes_keeps_file(tmp_path):
+    path = tmp_path / "calendar.ics"
+    write_calendar(str(path), [{"uid": "a", "name": "CPI", "begin": date(2025, 8, 13), "all_day": True}])
+    before = path.stat().st_mtime_ns
+    assert patch_event_descriptions(str(path), {"missing": lambda description: "x"}) == []
+    assert path.stat().st_mtime_ns == before
@@ -0,0 +1,126 @@
+import hashlib
+import json
+
+import pytest
+
+from src.core import common, publisher
+from src.core.publisher import CosPublisher, PublishResult, load_manifest
+
+
+class FakeCosClient:
+    """保存 put_object 写入的对象，head_object 返回与COS相同格式的头"""
+
+    def __init__(self, corrupt=()):
+        self.objects = {}
+        self.corrupt = set(corrupt)
+        self.puts = []
+
+    def put_object(self, Bucket, Body, Key, Metadata, **headers):
+        self.puts.append(Key)
+        if Key in self.corrupt:
+            Metadata = {name: "0" * 64 for name in Metadata}
+        self.objects[Key] = {'Content-Length': str(len(Body)), **Metadata}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise RuntimeError("NoSuchKey")
+        return self.objects[Key]
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, "COS_SECRET_ID", "id")
+    monkeypatch.setattr(common, "COS_SECRET_KEY", "key")
+    monkeypatch.setattr(common, "COS_BUCKET", "bucket")
+    monkeypatch.setattr(common, "COS_CONTENT_ENCODING", "identity")
+    monkeypatch.setattr(common, "COS_BROTLI_VARIANT", False)
+    monkeypatch.setattr(common, "COS_SKIP_UNCHANGED", True)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"wsc_{name}.ics"
+        path.write_bytes(f"BEGIN:VCALENDAR\r\nX-NAME:{name}\r\nEND:VCALENDAR".encode())
+        paths.append((str(path), f"calendar/wsc_{name}.ics"))
+    return paths
+
+
+def test_publish_uploads_and_verifies_every_object(files):
+    client = FakeCosClient()
+    results = CosPublisher(client, workers=3).publish(files)
+    assert [(result.object_key, result.status) for result in results] == [
+        (key, PublishResult.UPLOADED) for _, key in files
+    ]
+    with open(files[0][0], "rb") as f:
+        body = f.read()
+    assert results[0].size == len(body)
+    assert client.objects[files[0][1]][common.COS_HASH_METADATA] == hashlib.sha256(body).hexdigest()
+
+
+def test_publish_skips_unchanged_objects(files):
+    client = FakeCosClient()
+    CosPublisher(client).publish(files[:1])
+    results = CosPublisher(client).publish(files)
+    assert [result.status for result in results] == [PublishResult.SKIPPED, PublishResult.UPLOADED, PublishResult.UPLOADED]
+    assert client.puts.count(files[0][1]) == 1
+
+
+def test_publish_deduplicates_entries(files):
+    client = FakeCosClient()
+    results = CosPublisher(client).publish([files[0], files[0]])
+    assert len(results) == 1 and client.puts == [files[0][1]]
+
+
+def test_verification_failure_is_reported(files):
+    client = FakeCosClient(corrupt=[files[1][1]])
+    results = CosPublisher(client).publish(files)
+    assert [result.ok for result in results] == [True, False, True]
+    assert "内容哈希不一致" in results[1].error
+
+    # 不确认时只要上传成功就算成功
+    client = FakeCosClient(corrupt=[files[1][1]])
+    assert all(result.ok for result in CosPublisher(client, verify=False).publish(files))
+
+
+def test_missing_files_and_errors_do_not_stop_other_uploads(files, tmp_path):
+    class FailingClient(FakeCosClient):
+        def put_object(self, Key, **kwargs):
+            if Key == files[2][1]:
+                raise ConnectionError("reset")
+            super().put_object(Key=Key, **kwargs)
+
+    client = FailingClient()
+    entries = [(str(tmp_path / "missing.ics"), "calendar/missing.ics")] + files
+    results = CosPublisher(client).publish(entries)
+    assert [result.status for result in results] == [
+        PublishResult.FAILED, PublishResult.UPLOADED, PublishResult.UPLOADED, PublishResult.FAILED
+    ]
+    assert results[0].error == "文件不存在"
+    assert results[3].error == "reset"
+
+
+def test_brotli_variant_is_published_and_verified(files, monkeypatch):
+    monkeypatch.setattr(common, "COS_BROTLI_VARIANT", True)
+    monkeypatch.setattr(common, "encode_body", lambda body, encoding: body[::-1] if encoding == 'br' else body)
+    client = FakeCosClient()
+    results = CosPublisher(client).publish(files[:1])
+    assert [result.object_key for result in results] == [files[0][1], f"{files[0][1]}.br"]
+    assert all(result.status == PublishResult.UPLOADED for result in results)
+
+
+@pytest.mark.parametrize("github_actions, status", [(False, PublishResult.FAILED), (True, PublishResult.SKIPPED)])
+def test_publish_without_cos_config(files, monkeypatch, github_actions, status):
+    monkeypatch.setattr(common, "COS_BUCKET", "")
+    monkeypatch.setattr(publisher, "is_github_actions", github_actions)
+    client = FakeCosClient()
+    assert [result.status for result in CosPublisher(client).publish(files)] == [status] * 3
+    assert client.puts == []
+
+
+def test_load_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps([{'file': 'a.ics', 'key': 'calendar/a.ics'}]), encoding="utf-8")
+    assert load_manifest(str(path)) == [('a.ics', 'calendar/a.ics')]
+    path.write_text(json.dumps({'objects': [{'file': 'b.ics', 'key': 'calendar/b.ics'}]}), encoding="utf-8")
+    assert load_manifest(str(path)) == [('b.ics', 'calendar/b.ics')]
+    path.write_text(json.dumps([{'file': 'a.ics'}]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_manifest(str(path))
@@ -0,0 +1,52 @@
+import pytest
+
+from src.core.records import EarningsReport, MacroEvent, decode_macro_events, decode_report_rows
+
+REPORT_FIELDS = [
+    'id', 'company_name', 'code', 'country', 'calendar_type',
+    'observation_date', 'public_date', 'eps_estimate', 'earnings_estimate', 'unused'
+]
+
+
+def test_decode_macro_events_ignores_unused_fields():
+    events = decode_macro_events([
+        {'id': 1, 'title': '美国CPI', 'country': '美国', 'importance': 3, 'extra': 'x'},
+        'invalid',
+    ])
+    assert len(events) == 1
+    assert events[0].title == '美国CPI'
+    assert events[0].actual is None
+    assert events[0].to_dict() == {**dict.fromkeys(MacroEvent.__slots__), 'id': 1, 'title': '美国CPI',
+                                   'country': '美国', 'importance': 3}
+
+
+def test_records_have_no_instance_dict():
+    with pytest.raises(AttributeError):
+        MacroEvent(id=1).extra = 'x'
+
+
+def test_record_equality():
+    assert MacroEvent(id=1, title='CPI') == MacroEvent(id=1, title='CPI')
+    assert MacroEvent(id=1, title='CPI') != MacroEvent(id=1, title='PPI')
+    assert MacroEvent(id=1) != EarningsReport(id=1)
+
+
+def test_decode_report_rows_by_column_name():
+    rows = [
+        [7, '腾讯控股', '00700', '中国', 1, '2025-06-30', 1755100800, 1.2, 1000, 'x'],
+        [8, '短行'],
+    ]
+    reports = decode_report_rows(REPORT_FIELDS, rows)
+    assert reports == [EarningsReport(7, '腾讯控股', '00700', '中国', 1, '2025-06-30', 1755100800, 1.2, 1000)]
+
+
+def test_decode_report_rows_with_missing_columns():
+    fields = ['code', 'id', 'company_name']
+    reports = decode_report_rows(fields, [['AAPL', 9, '苹果']])
+    assert reports[0].to_dict() == {**dict.fromkeys(EarningsReport.__slots__), 'id': 9,
+                                    'company_name': '苹果', 'code': 'AAPL'}
+
+
+def test_earnings_report_round_trip():
+    report = EarningsReport(7, '腾讯控股', '00700')
+    assert EarningsReport.from_api(report.to_dict()) == report
@@ -0,0 +1,37 @@
+import argparse
+
+import pytest
+
+from src.core import run
+
+
+def test_parse_calendars():
+    assert run.parse_calendars("reports, events,reports") == ["reports", "events"]
+    with pytest.raises(argparse.ArgumentTypeError):
+        run.parse_calendars("events,unknown")
+    with pytest.raises(argparse.ArgumentTypeError):
+        run.parse_calendars(" , ")
+
+
+def test_parse_args_rejects_invalid_date_range():
+    with pytest.raises(SystemExit):
+        run.parse_args(["--weeks", "0"])
+    with pytest.raises(SystemExit):
+        run.parse_args(["--serve"])
+    with pytest.raises(SystemExit):
+        run.parse_args(["--daemon", "--from-store"])
+    assert run.parse_args(["--calendars", "reports"]).calendars == ["reports"]
+
+
+def test_main_runs_calendars_and_reports_failures(monkeypatch):
+    calls = []
+
+    def run_calendar(name, start_timestamp, end_timestamp, from_store=False):
+        calls.append((name, start_timestamp, end_timestamp, from_store))
+        return name == "events", 0.0
+
+    monkeypatch.setattr(run, 'run_calendar', run_calendar)
+    assert run.main(["--start", "2025-08-18"]) == 1
+    assert sorted(calls) == [("events", 1755446400, 1756051199, False), ("reports", 1755446400, 1756051199, False)]
+    assert run.main(["--calendars", "events", "--start", "2025-08-18", "--from-store"]) == 0
+    assert calls[-1] == ("events", 1755446400, 1756051199, True)
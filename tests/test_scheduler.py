@@ -0,0 +1,86 @@
+import threading
+
+from src.core.scheduler import RefreshScheduler
+
+NOW = 1755088200.0
+
+
+def make_scheduler(jobs=None, **kwargs):
+    options = dict(fast_interval=60, slow_interval=1800, retry_interval=300, proximity=600, jitter=0)
+    options.update(kwargs)
+    return RefreshScheduler(jobs or {}, **options)
+
+
+def test_fast_refresh_near_events():
+    scheduler = make_scheduler()
+    assert scheduler.next_delay([NOW + 600], NOW) == 60
+    assert scheduler.next_delay([NOW - 600], NOW) == 60
+
+
+def test_slow_refresh_without_upcoming_events():
+    scheduler = make_scheduler()
+    assert scheduler.next_delay([], NOW) == 1800
+    assert scheduler.next_delay([NOW - 3600, NOW + 7200], NOW) == 1800
+
+
+def test_wakes_up_when_next_event_enters_proximity_window():
+    scheduler = make_scheduler()
+    assert scheduler.next_delay([NOW + 1000, NOW + 5000], NOW) == 400
+    assert scheduler.next_delay([NOW + 600.5], NOW) == 1.0
+
+
+def test_jitter_stays_within_bounds():
+    scheduler = make_scheduler(jitter=0.1)
+    delays = [scheduler.next_delay([], NOW) for _ in range(200)]
+    assert all(1620 <= delay <= 1980 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_run_forever_retries_failed_jobs_until_stopped():
+    calls = {'ok': 0, 'failing': 0}
+    done = threading.Event()
+
+    def ok():
+        calls['ok'] += 1
+        return []
+
+    def failing():
+        calls['failing'] += 1
+        if calls['failing'] >= 3:
+            done.set()
+        raise RuntimeError("刷新失败")
+
+    scheduler = make_scheduler({'ok': ok, 'failing': failing}, slow_interval=60, retry_interval=0.01)
+    thread = threading.Thread(target=scheduler.run_forever)
+    thread.start()
+    try:
+        assert done.wait(5)
+    finally:
+        scheduler.stop()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert calls['ok'] == 1
+    assert calls['failing'] >= 3
+
+
+
+def test_jobs_can_choose_their_own_delay():
+    done = threading.Event()
+    runs = []
+
+    def poll():
+        runs.append(1)
+        if len(runs) == 3:
+            done.set()
+        return 0.01
+
+    scheduler = make_scheduler({'poll': poll})
+    thread = threading.Thread(target=scheduler.run_forever)
+    thread.start()
+    try:
+        assert done.wait(5)
+    finally:
+        scheduler.stop()
+        thread.join(5)
+    assert len(runs) >= 3
@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.analysis.cache_store import SQLiteCache
+from src.analysis.search_cache import SearchCache, normalize_query
+
+
+@pytest.mark.parametrize("title, query", [
+    ("美国7月非农就业人数(待定)", "美国 非农就业人数"),
+    ("20:30 美国第二季度GDP年化季率", "美国 gdp年化季率"),
+    ("🇺🇸 美国2025年度Q2 CPI", "美国 cpi"),
+    ("中国1-7月规模以上工业增加值", "中国 规模以上工业增加值"),
+    ("", ""),
+])
+def test_normalize_query(title, query):
+    assert normalize_query(title) == query
+
+
+def test_periods_of_same_indicator_share_query():
+    assert normalize_query("美国6月CPI月率") == normalize_query("美国7月CPI月率（待定）")
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    cache = SearchCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [{"title": "研报"}]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        owner = executor.submit(cache.get_or_fetch, "cpi", fetch)
+        started.wait(5)
+        waiters = [executor.submit(cache.get_or_fetch, "cpi", fetch) for _ in range(3)]
+        while cache.stats()["coalesced"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        results = [owner.result()] + [waiter.result() for waiter in waiters]
+
+    assert calls == [1]
+    assert all(result == [{"title": "研报"}] for result in results)
+    assert cache.stats() == {"memory_hits": 0, "coalesced": 3, "store_hits": 0, "misses": 1}
+    assert cache.get_or_fetch("cpi", fetch) == [{"title": "研报"}]
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_fetch_errors_reach_waiters_and_are_not_cached():
+    cache = SearchCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_fetch():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("搜索失败")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = executor.submit(cache.get_or_fetch, "cpi", failing_fetch)
+        started.wait(5)
+        waiter = executor.submit(cache.get_or_fetch, "cpi", failing_fetch)
+        while cache.stats()["coalesced"] < 1:
+            threading.Event().wait(0.001)
+        release.set()
+        for future in (owner, waiter):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    assert cache.get_or_fetch("cpi", lambda: []) == []
+
+
+def test_results_persist_in_store(tmp_path):
+    path = str(tmp_path / "search.sqlite3")
+    SearchCache(SQLiteCache(path)).get_or_fetch("cpi", lambda: [{"title": "研报"}])
+
+    cache = SearchCache(SQLiteCache(path))
+    assert cache.get_or_fetch("cpi", lambda: pytest.fail("不应重新搜索")) == [{"title": "研报"}]
+    assert cache.stats()["store_hits"] == 1
@@ -0,0 +1,111 @@
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from src.analysis.surprise import SURPRISE_PREFIX, SurpriseProfiles, indicator_key, load_surprise_profiles
+from src.core.event_store import EventStore, _number
+from src.core.records import MacroEvent
+
+
+def reference_profile(surprises, window):
+    """逐行计算的参考实现"""
+    recent = surprises[-window:]
+    std = statistics.stdev(surprises) if len(surprises) > 1 else 0.0
+    mean = statistics.fmean(surprises)
+    return {
+        'count': len(surprises),
+        'window': len(recent),
+        'above': sum(1 for value in recent if value > 0),
+        'below': sum(1 for value in recent if value < 0),
+        'mean_abs': statistics.fmean(abs(value) for value in surprises),
+        'std': std,
+        'last': surprises[-1],
+        'last_z': (surprises[-1] - mean) / std if std > 0 else math.nan,
+    }
+
+
+def assert_profile_close(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name, value in expected.items():
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(actual[name]), name
+        else:
+            assert actual[name] == pytest.approx(value), name
+
+
+def test_indicator_key_ignores_period():
+    assert indicator_key("US", "美国7月CPI年率") == indicator_key("US", "美国8月CPI年率")
+    assert indicator_key("US", "美国7月CPI年率") != indicator_key("CN", "中国7月CPI年率")
+
+
+def test_profiles_match_reference_implementation():
+    rng = np.random.default_rng(7)
+    history = {}
+    names, rows = [], []
+    for group, (country, title) in enumerate([("US", "美国CPI年率"), ("CN", "中国GDP年率"), ("US", "美国非农")]):
+        size = [30, 3, 1][group]
+        timestamps = sorted(rng.choice(10 ** 6, size=size, replace=False).tolist())
+        actual = np.round(rng.normal(2, 1, size), 1)
+        forecast = np.round(rng.normal(2, 1, size), 1)
+        names.append((country, title, size))
+        rows.extend(zip(timestamps, actual.tolist(), forecast.tolist()))
+        history[(country, title)] = (actual - forecast).tolist()
+
+    profiles = SurpriseProfiles.from_history(names, rows, window=12)
+    assert len(profiles) == 3
+    for (country, title), surprises in history.items():
+        assert_profile_close(profiles.profile(country, title), reference_profile(surprises, 12))
+    assert profiles.profile("JP", "日本CPI") is None
+
+
+def test_different_periods_are_merged_in_time_order():
+    names = [("US", "美国7月CPI年率", 2), ("US", "美国8月CPI年率", 1)]
+    rows = [(100, 3.0, 2.0), (300, 1.0, 2.0), (200, 2.0, 2.0)]
+    profile = SurpriseProfiles.from_history(names, rows, window=2).profile("US", "美国9月CPI年率")
+    assert profile['count'] == 3
+    # 按时间排序后最近两次为 0 和 -1
+    assert (profile['window'], profile['above'], profile['below'], profile['last']) == (2, 0, 1, -1.0)
+
+
+def test_describe_requires_min_samples():
+    names = [("US", "美国CPI年率", 4)]
+    rows = [(1, 3.0, 2.9), (2, 3.1, 3.0), (3, 2.9, 3.0), (4, 3.2, 3.0)]
+    profiles = SurpriseProfiles.from_history(names, rows, window=12)
+    line = profiles.describe("US", "美国CPI年率", "%", min_samples=4)
+    assert line.startswith(f"{SURPRISE_PREFIX}: 近4次 高于预期3次/低于1次, 平均偏差±0.125%")
+    assert "上次 +0.2%" in line and "(z " in line
+    assert profiles.describe("US", "美国CPI年率", min_samples=5) is None
+
+
+def test_empty_history():
+    profiles = SurpriseProfiles.from_history([], [])
+    assert len(profiles) == 0
+    assert profiles.describe("US", "美国CPI年率") is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2.7%", 2.7), ("1,234K", 1234.0), ("-0.5", -0.5), (".5", 0.5), ("", None), (None, None), ("--", None),
+])
+def test_number(value, expected):
+    assert _number(value) == expected
+
+
+def test_load_profiles_from_store(tmp_path):
+    store = EventStore(str(tmp_path / "events.sqlite3"))
+    store.upsert_macro_events([
+        MacroEvent(id=1, title="美国6月CPI年率", country="美国", public_date=100, actual="3.0%", forecast="2.9%"),
+        MacroEvent(id=2, title="美国7月CPI年率", country="美国", public_date=200, actual="2.7%", forecast="2.8%"),
+        MacroEvent(id=3, title="美国8月CPI年率", country="美国", public_date=300, forecast="2.8%"),
+        MacroEvent(id=4, title="中国GDP年率", country="中国", public_date=150, actual="5.2", forecast="5.1"),
+    ])
+    names, rows = store.macro_history()
+    assert names == [("CN", "中国GDP年率", 1), ("US", "美国6月CPI年率", 1), ("US", "美国7月CPI年率", 1)]
+    assert rows == [(150, 5.2, 5.1), (100, 3.0, 2.9), (200, 2.7, 2.8)]
+    assert store.macro_history(end_timestamp=150)[0] == [("CN", "中国GDP年率", 1), ("US", "美国6月CPI年率", 1)]
+
+    profile = load_surprise_profiles(store, window=12).profile("US", "美国8月CPI年率")
+    assert profile['count'] == 2 and profile['above'] == 1 and profile['below'] == 1
+    assert profile['last'] == pytest.approx(-0.1)
+    store.close()
@@ -0,0 +1,43 @@
+import json
+
+from src.core import sync_state
+from src.core.sync_state import SyncState, payload_hash
+
+
+def test_payload_hash_ignores_key_order():
+    assert payload_hash({"a": 1, "b": "二"}) == payload_hash({"b": "二", "a": 1})
+    assert payload_hash({"a": 1}) != payload_hash({"a": 2})
+
+
+def test_diff_reports_added_changed_and_removed():
+    state = SyncState("unused", {"a": {"hash": "1"}, "b": {"hash": "2"}, "c": {"hash": "3"}})
+    delta = state.diff({"a": "1", "b": "changed", "d": "4"})
+    assert (delta.added, delta.changed, delta.removed) == (["d"], ["b"], ["c"])
+    assert delta.has_changes
+    assert delta.is_dirty("b") and delta.is_dirty("d") and not delta.is_dirty("a")
+    assert not state.diff({"a": "1", "b": "2", "c": "3"}).has_changes
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "sync_state.json")
+    state = SyncState.load(path)
+    assert state.entries == {} and not state.pending_upload
+
+    state.replace({"a": {"hash": "1", "description": "描述"}})
+    state.save()
+    loaded = SyncState.load(path)
+    assert loaded.get("a") == {"hash": "1", "description": "描述"}
+    assert loaded.pending_upload
+
+    loaded.mark_uploaded()
+    loaded.save()
+    assert not SyncState.load(path).pending_upload
+
+
+def test_corrupt_or_outdated_state_is_ignored(tmp_path):
+    path = tmp_path / "sync_state.json"
+    path.write_text("{not json")
+    assert SyncState.load(str(path)).entries == {}
+
+    path.write_text(json.dumps({"version": sync_state.STATE_VERSION + 1, "entries": {"a": {"hash": "1"}}}))
+    assert SyncState.load(str(path)).entries == {}
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from src.core.watchlist import WatchlistIndex, list_watchlists, normalize_company_name, normalize_ticker
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("TSLA.US", "TSLA.US"),
+    ("tsla", "TSLA.US"),
+    ("US:TSLA", "TSLA.US"),
+    ("BRK-B", "BRK.B.US"),
+    ("BRK/B.N", "BRK.B.US"),
+    ("00700.HK", "00700.HK"),
+    ("700.HK", "00700.HK"),
+    ("00700", "00700.HK"),
+    ("HK:9988", "09988.HK"),
+    ("000333.SZ", "000333.SZ"),
+    ("SZ:002594", "002594.SZ"),
+    ("600519.SS", "600519.SH"),
+    ("600519", "600519.SH"),
+    ("300750", "300750.SZ"),
+    ("830799", "830799.BJ"),
+    (" 600519.sh ", "600519.SH"),
+])
+def test_normalize_ticker(value, expected):
+    assert normalize_ticker(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", None, "123456.HK", "ABC.HK", "12345.SZ", "1234567", "贵州茅台", "TOO-LONG-SYMBOL"])
+def test_normalize_ticker_rejects_unknown_formats(value):
+    assert normalize_ticker(value) is None
+
+
+def test_normalize_company_name():
+    assert normalize_company_name("小米集团-W") == normalize_company_name("小米集团")
+    assert normalize_company_name("Tesla, Inc.") == normalize_company_name("tesla inc")
+
+
+def test_index_matches_codes_and_names():
+    index = WatchlistIndex()
+    index.add("tech", ["TSLA", "700.HK", "贵州茅台", "name:Apple"])
+    index.add("china", ["00700", "600519"])
+
+    assert index.match("US:TSLA") == {"tech"}
+    assert index.match("00700.HK") == {"tech", "china"}
+    assert index.match("600519.SS", "贵州茅台") == {"tech", "china"}
+    assert index.match("AAPL", "Apple") == {"tech"}
+    assert index.match("MSFT", "Microsoft") == frozenset()
+    assert index.match(None) == frozenset()
+
+
+def test_load_watchlists_from_directory(tmp_path):
+    (tmp_path / "tech.txt").write_text("﻿# 科技股\nTSLA, AAPL\t00700 # 腾讯\n", encoding="utf-8")
+    (tmp_path / "bad name.txt").write_text("MSFT", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("NVDA", encoding="utf-8")
+
+    assert list(list_watchlists(str(tmp_path))) == ["tech"]
+    index = WatchlistIndex.load(str(tmp_path))
+    assert list(index) == ["tech"]
+    assert index.match("AAPL.US") == {"tech"} and index.match("00700.HK") == {"tech"}
+    assert list_watchlists(str(tmp_path / "missing")) == {}
+
+
+def test_is_stale(tmp_path):
+    source = tmp_path / "tech.txt"
+    source.write_text("TSLA", encoding="utf-8")
+    index = WatchlistIndex.load(str(tmp_path))
+    output = tmp_path / "wsc_reports_tech.ics"
+    assert index.is_stale("tech", str(output))
+
+    output.write_text("", encoding="utf-8")
+    mtime = os.path.getmtime(source)
+    os.utime(output, (mtime + 10, mtime + 10))
+    assert not index.is_stale("tech", str(output))
+    os.utime(source, (mtime + 20, mtime + 20))
+    assert index.is_stale("tech", str(output))